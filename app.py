@@ -1,23 +1,57 @@
 from flask import Flask
-from config import Config
-from models import db, User
+from config import configs
+from models import db
 from flask_login import LoginManager
 from flask_migrate import Migrate
-from routes import main_bp, auth_bp, clinic_bp, mother_bp, admin_bp, admin_auth_bp
+from routes import main_bp, auth_bp, clinic_bp, mother_bp, admin_bp, admin_auth_bp, health_bp
+from services import (
+    tip_feed_cache, answer_cache, ask_mobi_providers, user_cache, database, instrumentation,
+    translations, page_cache, lifecycle, reminder_scheduler, clinic_index,
+    purge_runner, appointment_archiver,
+)
+from cli import register_commands
 import os
 
 
-def create_app():
+def create_app(config_class=None):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    # MOBI_ENV=production selects the WAL/pool-tuned database profile
+    app.config.from_object(config_class or configs[os.environ.get("MOBI_ENV") or "development"])
 
-    # Initialize database and migration
+    # Initialize database and migration. Schema changes go through "flask db
+    # upgrade" (or "flask schema create" on a fresh development database), so
+    # booting a worker never issues DDL.
     db.init_app(app)
-    migrate = Migrate(app, db)
+    database.init_app(app)
+    Migrate(app, db)
 
-    # Create tables automatically (only if they don't exist)
-    with app.app_context():
-        db.create_all()
+    # Request timing, SQL statement accounting and the slow-query log
+    instrumentation.init_app(app)
+
+    # Initialize the public tip feed and Ask Mobi answer caches
+    tip_feed_cache.init_app(app)
+    answer_cache.init_app(app)
+
+    # Rendered anonymous pages and fragments (backend per PAGE_CACHE_BACKEND)
+    page_cache.init_app(app)
+
+    # Compile the interface message catalogs (other languages load on first use)
+    translations.init_app(app)
+
+    # Initialize the Ask Mobi provider pool (clients are built on first use)
+    ask_mobi_providers.init_app(app)
+
+    # SMS appointment reminders; sent by "flask reminders worker", not by web workers
+    reminder_scheduler.init_app(app)
+
+    # "Clinics near me" grid, built on first lookup
+    clinic_index.init_app(app)
+
+    # Clinic and user deletes run as batched background jobs
+    purge_runner.init_app(app)
+
+    # Past visits move to monthly archive files ("flask archive run")
+    appointment_archiver.init_app(app)
 
     # Initialize Flask-Login
     login_manager = LoginManager()
@@ -26,9 +60,12 @@ def create_app():
     login_manager.login_message_category = "warning"
     login_manager.login_message = "Please log in to access this page."
 
+    # Identities come from a short-TTL cache, so most requests skip the users query
+    user_cache.init_app(app)
+
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.get(int(user_id))
 
     # Register blueprints
     app.register_blueprint(main_bp)
@@ -37,11 +74,22 @@ def create_app():
     app.register_blueprint(mother_bp, url_prefix="/mother")
     app.register_blueprint(admin_bp)
     app.register_blueprint(admin_auth_bp, url_prefix="/mobi-panel-888x")
+    app.register_blueprint(health_bp)
+
+    # Worker warmup and readiness (driven by gunicorn.conf.py in production)
+    lifecycle.init_app(app)
+
+    # CLI commands (flask stats rebuild, ...)
+    register_commands(app)
 
     return app
 
 
 if __name__ == "__main__":
     app = create_app()
+    # The development server creates a fresh database's tables itself
+    with app.app_context():
+        database.create_schema()
+    lifecycle.warmup(app)
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True)
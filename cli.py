@@ -0,0 +1,187 @@
+import click
+from flask.cli import AppGroup
+
+stats_cli = AppGroup("stats", help="Dashboard counters.")
+
+
+@stats_cli.command("rebuild")
+def rebuild_stats():
+    """Recount the stat_counters table from scratch."""
+    from services import counters
+
+    rows = counters.rebuild()
+    click.echo(f"Rebuilt {rows} counter rows.")
+
+
+search_cli = AppGroup("search", help="Tip full-text search index.")
+
+
+@search_cli.command("rebuild")
+def rebuild_search():
+    """Create the tip search index if needed and re-index every tip."""
+    from models import db
+    from services import tip_search
+
+    with db.engine.begin() as connection:
+        if not tip_search.ensure_index(connection):
+            click.echo("Full-text index needs SQLite; other databases search with LIKE.")
+            return
+        tip_search.rebuild(connection)
+    click.echo("Rebuilt the tip search index.")
+
+
+schema_cli = AppGroup("schema", help="Database schema for fresh development databases.")
+
+
+@schema_cli.command("create")
+def create_schema():
+    """Create missing tables and the search index (deployments use "flask db upgrade")."""
+    from flask_migrate import stamp
+    from sqlalchemy import inspect
+
+    from models import db
+    from services import database
+
+    fresh = not inspect(db.engine).get_table_names()
+    database.create_schema()
+    if fresh:
+        # Tables now match the latest migration; record that so "db upgrade" starts from here
+        stamp()
+        click.echo("Created the schema and stamped it at the latest migration.")
+    else:
+        click.echo("Created any missing tables; run \"flask db upgrade\" for column changes.")
+
+
+reminders_cli = AppGroup("reminders", help="SMS appointment reminders.")
+
+
+@reminders_cli.command("run")
+def run_reminders():
+    """Queue reminders for upcoming appointments and send those due, once."""
+    from services import reminder_scheduler
+
+    summary = reminder_scheduler.run_once()
+    click.echo(
+        f"Planned {summary['planned']}, sent {summary['sent']}, already sent {summary['duplicate']}, "
+        f"retrying {summary['retry']}, failed {summary['failed']}, cancelled {summary['cancelled']} "
+        f"in {summary['seconds']}s."
+    )
+
+
+@reminders_cli.command("worker")
+@click.option("--interval", type=int, help="Seconds between runs (default REMINDER_INTERVAL).")
+def reminders_worker(interval):
+    """Run the reminder scheduler until interrupted (one process per deployment)."""
+    from flask import current_app
+
+    from services import reminder_scheduler
+
+    app = current_app._get_current_object()
+    interval = interval or app.config.get("REMINDER_INTERVAL", 300)
+    click.echo(f"Sending reminders through {reminder_scheduler.gateway.name} every {interval}s.")
+    try:
+        reminder_scheduler.serve(app, interval)
+    except KeyboardInterrupt:
+        pass
+
+
+@reminders_cli.command("status")
+def reminders_status():
+    """Reminder counts by status and the last run in this process."""
+    import json
+
+    from services import reminder_scheduler
+
+    click.echo(json.dumps(reminder_scheduler.snapshot(), indent=2, default=str))
+
+
+purge_cli = AppGroup("purge", help="Background deletes of clinics and users.")
+
+
+@purge_cli.command("run")
+@click.option("--job", "job_id", type=int, help="Work only this job.")
+def run_purges(job_id):
+    """Work pending jobs and those whose runner went away, in this process."""
+    from models import PurgeJob
+    from services import purge_runner
+
+    if job_id:
+        job_ids = [job_id]
+    else:
+        job_ids = [job.id for job in PurgeJob.query.filter(PurgeJob.status.in_(("pending", "running"))).order_by(PurgeJob.id)]
+    for job_id in job_ids:
+        job = purge_runner.run(job_id)
+        if job is None:
+            click.echo(f"Job {job_id}: held by another runner or not resumable yet.")
+        else:
+            click.echo(f"Job {job_id}: deleted {job.kind} {job.label!r} and {job.deleted} appointment(s) "
+                       f"in {job.batches} batch(es).")
+
+
+@purge_cli.command("status")
+def purge_status():
+    """The most recent purge jobs and their progress."""
+    import json
+
+    from models import PurgeJob
+    from services import purge_runner
+
+    jobs = PurgeJob.query.order_by(PurgeJob.id.desc()).limit(20)
+    click.echo(json.dumps([purge_runner.progress(job) for job in jobs], indent=2))
+
+
+archive_cli = AppGroup("archive", help="Monthly archive files of past appointments.")
+
+
+@archive_cli.command("run")
+@click.option("--days", type=int, help="Archive visits older than this many days (default ARCHIVE_AFTER_DAYS).")
+def run_archive(days):
+    """Move visits past the horizon into the archive, once (run daily from cron)."""
+    from services import appointment_archiver
+
+    summary = appointment_archiver.run(after_days=days)
+    if summary is None:
+        click.echo("Another archive run is in progress.")
+        return
+    click.echo(f"Archived {summary['archived']} appointment(s) scheduled before {summary['cutoff']} "
+               f"in {summary['batches']} batch(es), {summary['seconds']}s.")
+
+
+@archive_cli.command("status")
+def archive_status():
+    """Archived months, rows and file sizes."""
+    import json
+
+    from services import appointment_archiver
+
+    snapshot = appointment_archiver.snapshot()
+    snapshot["by_month"] = [
+        {"month": month.month, "rows": month.rows, "bytes": month.bytes, "segments": month.segments}
+        for month in appointment_archiver.months()
+    ]
+    click.echo(json.dumps(snapshot, indent=2, default=str))
+
+
+slots_cli = AppGroup("slots", help="Dated clinic slots.")
+
+
+@slots_cli.command("materialize")
+@click.option("--all", "everything", is_flag=True, help="Fill in every clinic, not just those behind the horizon.")
+def materialize_slots(everything):
+    """Create dated slots through SLOT_HORIZON_DAYS from the weekly templates (run daily from cron)."""
+    from models import db
+    from services import slots
+
+    with db.engine.begin() as connection:
+        created = slots.materialize(connection) if everything else slots.extend_horizon(connection)
+    click.echo(f"Created {created} slot(s) through {slots.horizon_end().isoformat()}.")
+
+
+def register_commands(app):
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(reminders_cli)
+    app.cli.add_command(purge_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(slots_cli)
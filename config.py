@@ -9,3 +9,210 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(basedir, "static", "audio")
+
+    # Public tip feed cache (per language)
+    TIP_CACHE_TTL = int(os.environ.get("TIP_CACHE_TTL", 300))
+    TIP_CACHE_MAX_LANGUAGES = int(os.environ.get("TIP_CACHE_MAX_LANGUAGES", 16))
+
+    # Logged-in user identities (id, username, role) cached per process
+    USER_CACHE_ENABLED = os.environ.get("USER_CACHE_ENABLED", "1") != "0"
+    USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 4096))
+    USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", 30))
+
+    # Keyset pagination for listings
+    PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 50))
+    PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", 200))
+
+    # Ask Mobi providers in failover order: "gemini", "openai", "fake" (local stand-in)
+    ASK_MOBI_PROVIDERS = tuple(
+        name.strip() for name in os.environ.get("ASK_MOBI_PROVIDERS", "gemini,openai").split(",") if name.strip()
+    )
+    ASK_MOBI_TIMEOUT = float(os.environ.get("ASK_MOBI_TIMEOUT", 20))
+    ASK_MOBI_CONNECT_TIMEOUT = float(os.environ.get("ASK_MOBI_CONNECT_TIMEOUT", 5))
+    ASK_MOBI_STREAM_DEADLINE = float(os.environ.get("ASK_MOBI_STREAM_DEADLINE", 60))
+    # Provider calls in flight per worker. Below the worker's thread count
+    # (WEB_THREADS, see gunicorn.conf.py) so slow providers can never hold
+    # every thread and stall the other pages; by default one thread is kept free
+    ASK_MOBI_MAX_IN_FLIGHT = int(
+        os.environ.get("ASK_MOBI_MAX_IN_FLIGHT", max(1, int(os.environ.get("WEB_THREADS", 4)) - 1))
+    )
+    ASK_MOBI_ACQUIRE_TIMEOUT = float(os.environ.get("ASK_MOBI_ACQUIRE_TIMEOUT", 2))
+    ASK_MOBI_POOL_SIZE = int(os.environ.get("ASK_MOBI_POOL_SIZE", 10))
+    ASK_MOBI_BREAKER_WINDOW = int(os.environ.get("ASK_MOBI_BREAKER_WINDOW", 20))
+    ASK_MOBI_BREAKER_ERROR_RATE = float(os.environ.get("ASK_MOBI_BREAKER_ERROR_RATE", 0.5))
+    ASK_MOBI_BREAKER_SLOW_SECONDS = float(os.environ.get("ASK_MOBI_BREAKER_SLOW_SECONDS", 10))
+    ASK_MOBI_BREAKER_COOLDOWN = float(os.environ.get("ASK_MOBI_BREAKER_COOLDOWN", 30))
+    ASK_MOBI_BREAKER_MAX_COOLDOWN = float(os.environ.get("ASK_MOBI_BREAKER_MAX_COOLDOWN", 300))
+    ASK_MOBI_FAKE_FIRST_TOKEN_DELAY = float(os.environ.get("ASK_MOBI_FAKE_FIRST_TOKEN_DELAY", 0.5))
+    ASK_MOBI_FAKE_TOKEN_DELAY = float(os.environ.get("ASK_MOBI_FAKE_TOKEN_DELAY", 0.05))
+    ASK_MOBI_FAKE_ERROR_RATE = float(os.environ.get("ASK_MOBI_FAKE_ERROR_RATE", 0))
+
+    # Ask Mobi answer cache: SQLite rows with an in-process LRU in front
+    ASK_MOBI_CACHE_TTL = int(os.environ.get("ASK_MOBI_CACHE_TTL", 7 * 24 * 3600))
+    ASK_MOBI_CACHE_MEMORY_SIZE = int(os.environ.get("ASK_MOBI_CACHE_MEMORY_SIZE", 512))
+    ASK_MOBI_CACHE_MEMORY_TTL = int(os.environ.get("ASK_MOBI_CACHE_MEMORY_TTL", 600))
+
+    # HTTP caching (seconds)
+    HTTP_CACHE_ANON_MAX_AGE = int(os.environ.get("HTTP_CACHE_ANON_MAX_AGE", 60))
+    HTTP_CACHE_AUDIO_MAX_AGE = int(os.environ.get("HTTP_CACHE_AUDIO_MAX_AGE", 7 * 24 * 3600))
+
+    # Rendered anonymous pages and shared fragments, cleared on Tip writes.
+    # Backends: "memory" (per worker), "mmap" (file shared by every worker on
+    # the host), "resp" (Redis or scripts/resp_server.py) or "none".
+    PAGE_CACHE_BACKEND = os.environ.get("PAGE_CACHE_BACKEND", "memory")
+    PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", 300))
+    PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", 512))
+    PAGE_CACHE_MMAP_PATH = os.environ.get(
+        "PAGE_CACHE_MMAP_PATH", os.path.join(basedir, "instance", "page_cache.mmap")
+    )
+    PAGE_CACHE_MMAP_SLOTS = int(os.environ.get("PAGE_CACHE_MMAP_SLOTS", 512))
+    PAGE_CACHE_MMAP_SLOT_SIZE = int(os.environ.get("PAGE_CACHE_MMAP_SLOT_SIZE", 128 * 1024))
+    PAGE_CACHE_URL = os.environ.get("PAGE_CACHE_URL", "redis://127.0.0.1:6379/0")
+
+    # Per-worker warmup before /readyz reports ready (see gunicorn.conf.py)
+    WARMUP_PATHS = ("/",)  # fetched once per language
+    WARMUP_DB_CONNECTIONS = int(os.environ.get("WARMUP_DB_CONNECTIONS", os.environ.get("WEB_THREADS", 1)))
+    # Importing the AI SDKs costs each worker ~1.5 s and ~70 MB; off by default
+    ASK_MOBI_WARMUP = os.environ.get("ASK_MOBI_WARMUP", "0") != "0"
+
+    # Clinic slots (services/slots.py). New clinics get the default weekly
+    # template; dated slots are kept SLOT_HORIZON_DAYS ahead by
+    # "flask slots materialize" (daily) and worker warmup.
+    SLOT_HORIZON_DAYS = int(os.environ.get("SLOT_HORIZON_DAYS", 28))
+    SLOT_CHOICES = int(os.environ.get("SLOT_CHOICES", 12))  # free slots offered when booking
+    SLOT_DEFAULT_WEEKDAYS = tuple(
+        int(day) for day in os.environ.get("SLOT_DEFAULT_WEEKDAYS", "0,1,2,3,4").split(",") if day.strip()
+    )
+    SLOT_DEFAULT_TIMES = tuple(
+        t.strip() for t in os.environ.get("SLOT_DEFAULT_TIMES", "08:00,09:00,10:00,11:00,13:00,14:00,15:00").split(",")
+        if t.strip()
+    )
+    SLOT_DEFAULT_MINUTES = int(os.environ.get("SLOT_DEFAULT_MINUTES", 60))
+    SLOT_DEFAULT_CAPACITY = int(os.environ.get("SLOT_DEFAULT_CAPACITY", 6))
+
+    # "Clinics near me" (services/clinic_index.py). Each worker keeps a grid of
+    # clinic coordinates; it is rebuilt after a clinic write in that worker, and
+    # other workers pick the change up within CLINIC_INDEX_TTL seconds.
+    CLINIC_INDEX_TTL = int(os.environ.get("CLINIC_INDEX_TTL", 60))
+    CLINIC_INDEX_PER_CELL = int(os.environ.get("CLINIC_INDEX_PER_CELL", 8))  # sizes the grid cells
+    CLINIC_NEARBY_LIMIT = int(os.environ.get("CLINIC_NEARBY_LIMIT", 5))  # default k
+    CLINIC_NEARBY_MAX = int(os.environ.get("CLINIC_NEARBY_MAX", 50))
+    CLINIC_NEARBY_MAX_RADIUS_KM = float(os.environ.get("CLINIC_NEARBY_MAX_RADIUS_KM", 200))
+
+    # Clinic and user deletes (services/purge.py). Appointments go PURGE_BATCH_SIZE
+    # at a time, one short transaction each, with PURGE_PAUSE seconds between
+    # batches so bookings get the write lock. Jobs run on a thread in the web
+    # worker that queued them; "flask purge run" resumes any left behind.
+    PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", 500))
+    PURGE_PAUSE = float(os.environ.get("PURGE_PAUSE", 0.02))
+    PURGE_STALE_AFTER = int(os.environ.get("PURGE_STALE_AFTER", 60))  # seconds without a batch before another runner takes over
+    PURGE_IN_PROCESS = os.environ.get("PURGE_IN_PROCESS", "1") != "0"
+
+    # Appointment archival (services/archive.py, "flask archive run" daily from
+    # cron). Visits scheduled more than ARCHIVE_AFTER_DAYS ago move out of the
+    # appointments table into gzipped JSONL files in ARCHIVE_DIR, one per month,
+    # ARCHIVE_BATCH_SIZE per transaction. Every web worker must see ARCHIVE_DIR.
+    ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(basedir, "instance", "archive"))
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 365))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 2000))
+    ARCHIVE_PAUSE = float(os.environ.get("ARCHIVE_PAUSE", 0.05))
+    ARCHIVE_COMPRESS_LEVEL = int(os.environ.get("ARCHIVE_COMPRESS_LEVEL", 6))
+    ARCHIVE_SEARCH_LIMIT = int(os.environ.get("ARCHIVE_SEARCH_LIMIT", 200))  # matches shown on the admin page
+
+    # SMS appointment reminders (services/reminders.py, "flask reminders worker").
+    # Gateways: "log" (development; logs each message) or "http" (JSON API,
+    # or scripts/sms_gateway.py locally). REMINDER_RATE is messages per second.
+    REMINDER_GATEWAY = os.environ.get("REMINDER_GATEWAY", "log")
+    REMINDER_GATEWAY_URL = os.environ.get("REMINDER_GATEWAY_URL", "http://127.0.0.1:8025/messages")
+    REMINDER_GATEWAY_TOKEN = os.environ.get("REMINDER_GATEWAY_TOKEN")
+    REMINDER_GATEWAY_TIMEOUT = float(os.environ.get("REMINDER_GATEWAY_TIMEOUT", 10))
+    REMINDER_RATE = float(os.environ.get("REMINDER_RATE", 100))
+    REMINDER_BURST = int(os.environ.get("REMINDER_BURST", 0))  # 0: one second's worth, at least a batch
+    REMINDER_BATCH_SIZE = int(os.environ.get("REMINDER_BATCH_SIZE", 100))
+    REMINDER_WORKERS = int(os.environ.get("REMINDER_WORKERS", 4))
+    REMINDER_LEAD_HOURS = float(os.environ.get("REMINDER_LEAD_HOURS", 24))
+    REMINDER_INTERVAL = int(os.environ.get("REMINDER_INTERVAL", 300))
+    REMINDER_CLAIM_SIZE = int(os.environ.get("REMINDER_CLAIM_SIZE", 5000))
+    REMINDER_CLAIM_TIMEOUT = int(os.environ.get("REMINDER_CLAIM_TIMEOUT", 900))
+    REMINDER_RETRIES = int(os.environ.get("REMINDER_RETRIES", 2))  # per batch, within one run
+    REMINDER_BACKOFF = float(os.environ.get("REMINDER_BACKOFF", 0.5))
+    REMINDER_BACKOFF_MAX = float(os.environ.get("REMINDER_BACKOFF_MAX", 30))
+    REMINDER_MAX_ATTEMPTS = int(os.environ.get("REMINDER_MAX_ATTEMPTS", 5))  # per message, across runs
+    REMINDER_RETRY_DELAY = int(os.environ.get("REMINDER_RETRY_DELAY", 300))  # doubles per attempt
+
+    # Request timing, SQL accounting and /metrics
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # lets a scraper in without an admin session
+
+    # Interface languages. Catalogs live in translations/<code>.json; the
+    # default and I18N_PRELOAD are compiled at startup, the rest on first use.
+    LANGUAGES = {"en": "English", "tw": "Twi", "gaa": "Gã", "ee": "Eʋegbe"}
+    DEFAULT_LANGUAGE = os.environ.get("DEFAULT_LANGUAGE", "en")
+    I18N_PRELOAD = tuple(
+        code.strip() for code in os.environ.get("I18N_PRELOAD", "en,tw").split(",") if code.strip()
+    )
+    TRANSLATIONS_DIR = os.path.join(basedir, "translations")
+    I18N_CACHE_FRAGMENTS = os.environ.get("I18N_CACHE_FRAGMENTS", "1") != "0"
+
+    # Tip search
+    SEARCH_RESULTS_LIMIT = int(os.environ.get("SEARCH_RESULTS_LIMIT", 20))
+    SEARCH_RESULTS_MAX = int(os.environ.get("SEARCH_RESULTS_MAX", 100))
+
+    # Admin bulk export/import
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 500))
+    IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", 200))  # per-row errors shown
+
+    # Database write retries on lock contention (see services.database.retry_on_lock)
+    DB_WRITE_RETRIES = int(os.environ.get("DB_WRITE_RETRIES", 3))
+    DB_WRITE_RETRY_DELAY = float(os.environ.get("DB_WRITE_RETRY_DELAY", 0.05))
+
+
+def _is_sqlite(uri):
+    return uri.startswith("sqlite")
+
+
+class ProductionConfig(Config):
+    """Concurrent-safe database settings for SQLite (WAL) or PostgreSQL."""
+
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    # Applied to every new SQLite connection by services.database.init_app
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",        # readers no longer block behind writers
+        "synchronous": "NORMAL",      # durable with WAL, far fewer fsyncs
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -int(os.environ.get("SQLITE_CACHE_SIZE_KIB", 32768)),  # negative = KiB
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "temp_store": "MEMORY",
+    }
+
+    _sqlite = _is_sqlite(Config.SQLALCHEMY_DATABASE_URI)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5 if _sqlite else 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10 if _sqlite else 20))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 3600 if _sqlite else 1800))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 10))
+
+    if _sqlite:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            # sqlite3's own wait on a locked database, before raising
+            "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000, "check_same_thread": False},
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_recycle": DB_POOL_RECYCLE,
+        }
+    else:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_pre_ping": True,  # drop connections the server or a proxy closed
+        }
+    del _sqlite
+
+
+configs = {
+    "development": Config,
+    "production": ProductionConfig,
+}
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, PasswordField, SubmitField, SelectField
-from wtforms.validators import DataRequired, Length, EqualTo
+from wtforms.validators import DataRequired, InputRequired, Length, EqualTo
 
 
 class LoginForm(FlaskForm):
@@ -18,8 +18,11 @@ class TipForm(FlaskForm):
 class AppointmentForm(FlaskForm):
     mother_name = StringField("Your name", validators=[DataRequired()])
     phone = StringField("Phone number", validators=[DataRequired()])
-    clinic = StringField("Preferred clinic", validators=[DataRequired()])
-    date = StringField("Preferred date/time", validators=[DataRequired()])
+    # Choices are filled in by the view: clinics, then that clinic's free
+    # slots. Booking checks the pair itself (services.slots), so a slot that
+    # filled up since the page loaded gets a clear message, not "Not a valid choice".
+    clinic_id = SelectField("Clinic", coerce=int, choices=[], validators=[DataRequired()], validate_choice=False)
+    slot_id = SelectField("Time", coerce=int, choices=[], validators=[InputRequired()], validate_choice=False)
     notes = TextAreaField("Notes (optional)")
     submit = SubmitField("Book Appointment")
 
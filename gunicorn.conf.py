@@ -0,0 +1,69 @@
+# Gunicorn settings for serving Mobi Mama in production:
+#
+#     gunicorn -c gunicorn.conf.py wsgi:app
+#
+# The app is built once in the master and forked, so its code and
+# read-only state are shared copy-on-write. Each worker then drops the
+# master's database connections, warms its own caches and only then reports
+# ready on /readyz. SIGTERM drains workers gracefully.
+import multiprocessing
+import os
+import signal
+
+cpus = multiprocessing.cpu_count()
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+# Two workers per core plus one keeps a core busy while another worker waits
+# on SQLite or the network; threads cover the Ask Mobi streams, which mostly wait
+workers = int(os.environ.get("WEB_CONCURRENCY", cpus * 2 + 1))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+preload_app = True
+
+# Readiness warms one pooled database connection per thread, and Ask Mobi
+# caps its provider calls at threads - 1 per worker (see config.py)
+os.environ.setdefault("WEB_THREADS", str(threads))
+
+keepalive = int(os.environ.get("WEB_KEEPALIVE", 5))
+timeout = int(os.environ.get("WEB_TIMEOUT", 30))
+# Long enough for an Ask Mobi stream to reach its own deadline
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", float(os.environ.get("ASK_MOBI_STREAM_DEADLINE", 60)) + 10))
+# Recycle workers now and then so slow leaks cannot build up; jitter keeps
+# them from all restarting at once
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 5000))
+max_requests_jitter = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", 500))
+
+accesslog = os.environ.get("WEB_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    from services import lifecycle
+    from wsgi import app
+
+    lifecycle.after_fork(app)
+
+
+def post_worker_init(worker):
+    from services import lifecycle
+    from wsgi import app
+
+    # Runs before the worker accepts connections; /readyz turns 200 afterwards
+    steps = lifecycle.warmup(app)
+    worker.log.info("worker %s warm in %s ms: %s", worker.pid, lifecycle.warmup_ms, steps)
+
+    # Report not-ready as soon as SIGTERM arrives, then let gunicorn drain
+    stop = signal.getsignal(signal.SIGTERM)
+
+    def drain(signum, frame):
+        lifecycle.drain()
+        stop(signum, frame)
+
+    signal.signal(signal.SIGTERM, drain)
+
+
+def worker_exit(server, worker):
+    from services import lifecycle
+    from wsgi import app
+
+    lifecycle.shutdown(app)
@@ -1,14 +1,12 @@
-from flask import Flask
-from flask_migrate import Migrate
 from app import create_app
-from models import db, Tip, User, Appointment
+from services import database, lifecycle
 
-# Create app using the factory
+# Create app using the factory; create_app() already sets up Flask-Migrate
 app = create_app()
 
-# Initialize Flask-Migrate **after the app is created**
-migrate = Migrate(app, db)
-
 # Optional: make app available for CLI
 if __name__ == "__main__":
+    with app.app_context():
+        database.create_schema()
+    lifecycle.warmup(app)
     app.run(debug=True)
@@ -0,0 +1,33 @@
+"""detach dated slots whose weekly template was removed
+
+Revision ID: 2c8e5f1a7b64
+Revises: 9a3f6c2e7d41
+Create Date: 2026-10-19 14:07:52.913460
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8e5f1a7b64'
+down_revision = '9a3f6c2e7d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite runs with foreign keys off, so ON DELETE SET NULL never fired
+    # for templates removed before services.slots detached their slots
+    slot_occupancy = sa.table('slot_occupancy', sa.column('template_id', sa.Integer))
+    clinic_slots = sa.table('clinic_slots', sa.column('id', sa.Integer))
+    op.execute(
+        slot_occupancy.update()
+        .where(slot_occupancy.c.template_id.is_not(None))
+        .where(~sa.exists().where(clinic_slots.c.id == slot_occupancy.c.template_id))
+        .values(template_id=None)
+    )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,63 @@
+"""add tips full-text index (SQLite FTS5)
+
+Revision ID: 5e8c3b7a1f64
+Revises: d93a5c1e8f20
+Create Date: 2026-10-18 15:20:41.582310
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8c3b7a1f64'
+down_revision = 'd93a5c1e8f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases search with LIKE (services/tip_search.py).
+    # IF NOT EXISTS: app boot may already have created the index.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tips_fts USING fts5(
+            title, content, language UNINDEXED,
+            content='tips', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS tips_fts_ai AFTER INSERT ON tips BEGIN
+            INSERT INTO tips_fts(rowid, title, content, language)
+            VALUES (new.id, new.title, new.content, new.language);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS tips_fts_ad AFTER DELETE ON tips BEGIN
+            INSERT INTO tips_fts(tips_fts, rowid, title, content, language)
+            VALUES ('delete', old.id, old.title, old.content, old.language);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS tips_fts_au AFTER UPDATE OF title, content, language ON tips BEGIN
+            INSERT INTO tips_fts(tips_fts, rowid, title, content, language)
+            VALUES ('delete', old.id, old.title, old.content, old.language);
+            INSERT INTO tips_fts(rowid, title, content, language)
+            VALUES (new.id, new.title, new.content, new.language);
+        END
+    """)
+    # Index the tips that already exist
+    op.execute("INSERT INTO tips_fts(tips_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS tips_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS tips_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS tips_fts_ai")
+    op.execute("DROP TABLE IF EXISTS tips_fts")
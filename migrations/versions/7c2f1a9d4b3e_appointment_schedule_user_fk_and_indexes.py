@@ -0,0 +1,120 @@
+"""appointment scheduled_at, user_id fk and composite indexes
+
+Revision ID: 7c2f1a9d4b3e
+Revises: 04e5a030eea3
+Create Date: 2026-10-18 10:12:31.418207
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2f1a9d4b3e'
+down_revision = '04e5a030eea3'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Frozen copy of models.APPOINTMENT_DATE_FORMATS at the time of this revision
+DATE_FORMATS = (
+    "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y",
+)
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _backfill(connection):
+    """Fill scheduled_at and user_id in id-ordered batches so each
+    transaction step touches a bounded number of rows."""
+    appointments = sa.table(
+        'appointments',
+        sa.column('id', sa.Integer),
+        sa.column('date', sa.String),
+        sa.column('mother_name', sa.String),
+        sa.column('user_id', sa.Integer),
+        sa.column('scheduled_at', sa.DateTime),
+    )
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('username', sa.String))
+
+    set_schedule = (
+        appointments.update()
+        .where(appointments.c.id == sa.bindparam('appt_id'))
+        .values(scheduled_at=sa.bindparam('scheduled_at'))
+    )
+    owner = (
+        sa.select(users.c.id)
+        .where(users.c.username == appointments.c.mother_name)
+        .scalar_subquery()
+    )
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(appointments.c.id, appointments.c.date)
+            .where(appointments.c.id > last_id)
+            .order_by(appointments.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        params = [
+            {'appt_id': row.id, 'scheduled_at': parsed}
+            for row in rows
+            if (parsed := _parse_date(row.date)) is not None
+        ]
+        if params:
+            connection.execute(set_schedule, params)
+
+        connection.execute(
+            appointments.update()
+            .where(appointments.c.id.between(rows[0].id, rows[-1].id))
+            .where(appointments.c.user_id.is_(None))
+            .values(user_id=owner)
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('scheduled_at', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key('fk_appointments_user_id_users', 'users', ['user_id'], ['id'])
+
+    _backfill(op.get_bind())
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_appointments_clinic_id_scheduled_at', ['clinic_id', 'scheduled_at'], unique=False)
+        batch_op.create_index('ix_appointments_scheduled_at', ['scheduled_at'], unique=False)
+
+    with op.batch_alter_table('tips', schema=None) as batch_op:
+        batch_op.create_index('ix_tips_language_created_at', ['language', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tips', schema=None) as batch_op:
+        batch_op.drop_index('ix_tips_language_created_at')
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_scheduled_at')
+        batch_op.drop_index('ix_appointments_clinic_id_scheduled_at')
+        batch_op.drop_index('ix_appointments_user_id_created_at')
+        batch_op.drop_constraint('fk_appointments_user_id_users', type_='foreignkey')
+        batch_op.drop_column('scheduled_at')
+        batch_op.drop_column('user_id')
@@ -0,0 +1,40 @@
+"""add (created_at, id) indexes for the newest-first keyset listings
+
+Revision ID: 9a3f6c2e7d41
+Revises: b7d1e5a93c28
+Create Date: 2026-10-19 09:41:26.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3f6c2e7d41'
+down_revision = 'b7d1e5a93c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_created_at_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('clinics', schema=None) as batch_op:
+        batch_op.create_index('ix_clinics_created_at_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_appointments_clinic_id_created_at_id', ['clinic_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_clinic_id_created_at_id')
+        batch_op.drop_index('ix_appointments_created_at_id')
+
+    with op.batch_alter_table('clinics', schema=None) as batch_op:
+        batch_op.drop_index('ix_clinics_created_at_id')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_created_at_id')
@@ -0,0 +1,52 @@
+"""add sms reminders queue
+
+Revision ID: a6d2f4c81b97
+Revises: 5e8c3b7a1f64
+Create Date: 2026-10-18 17:05:12.440218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f4c81b97'
+down_revision = '5e8c3b7a1f64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reminders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=80), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('clinic_id', sa.Integer(), nullable=False),
+    sa.Column('scheduled_for', sa.DateTime(), nullable=False),
+    sa.Column('phone', sa.String(length=40), nullable=False),
+    sa.Column('body', sa.String(length=320), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claimed_by', sa.String(length=32), nullable=True),
+    sa.Column('gateway', sa.String(length=20), nullable=True),
+    sa.Column('gateway_message_id', sa.String(length=80), nullable=True),
+    sa.Column('last_error', sa.String(length=200), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+    with op.batch_alter_table('reminders', schema=None) as batch_op:
+        batch_op.create_index('ix_reminders_status_next_attempt_at', ['status', 'next_attempt_at'], unique=False)
+        batch_op.create_index('ix_reminders_appointment_id', ['appointment_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reminders', schema=None) as batch_op:
+        batch_op.drop_index('ix_reminders_appointment_id')
+        batch_op.drop_index('ix_reminders_status_next_attempt_at')
+
+    op.drop_table('reminders')
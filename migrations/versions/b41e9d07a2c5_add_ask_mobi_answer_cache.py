@@ -0,0 +1,36 @@
+"""add ask mobi answer cache
+
+Revision ID: b41e9d07a2c5
+Revises: 7c2f1a9d4b3e
+Create Date: 2026-10-18 11:03:52.770431
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41e9d07a2c5'
+down_revision = '7c2f1a9d4b3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ask_mobi_answers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('language', sa.String(length=10), nullable=False),
+    sa.Column('question_key', sa.String(length=40), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('provider', sa.String(length=20), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('language', 'question_key', name='uq_ask_mobi_answers_language_question_key')
+    )
+
+
+def downgrade():
+    op.drop_table('ask_mobi_answers')
@@ -0,0 +1,43 @@
+"""add archive segments indexing the monthly appointment archive files
+
+Revision ID: b7d1e5a93c28
+Revises: f4a8d2e6b915
+Create Date: 2026-10-18 23:02:17.604219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d1e5a93c28'
+down_revision = 'f4a8d2e6b915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archive_segments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('byte_offset', sa.BigInteger(), nullable=False),
+    sa.Column('byte_length', sa.Integer(), nullable=False),
+    sa.Column('raw_bytes', sa.Integer(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('first_at', sa.DateTime(), nullable=True),
+    sa.Column('last_at', sa.DateTime(), nullable=True),
+    sa.Column('min_id', sa.Integer(), nullable=False),
+    sa.Column('max_id', sa.Integer(), nullable=False),
+    sa.Column('clinic_ids', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archive_segments', schema=None) as batch_op:
+        batch_op.create_index('ix_archive_segments_month_byte_offset', ['month', 'byte_offset'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('archive_segments', schema=None) as batch_op:
+        batch_op.drop_index('ix_archive_segments_month_byte_offset')
+
+    op.drop_table('archive_segments')
@@ -0,0 +1,76 @@
+"""add clinic slot templates, slot occupancy and appointments.slot_id
+
+Revision ID: c3e9b2d5a417
+Revises: a6d2f4c81b97
+Create Date: 2026-10-18 18:32:47.901265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9b2d5a417'
+down_revision = 'a6d2f4c81b97'
+branch_labels = None
+depends_on = None
+
+# Config.SLOT_DEFAULT_* at the time of this migration
+DEFAULT_WEEKDAYS = (0, 1, 2, 3, 4)
+DEFAULT_TIMES = ("08:00", "09:00", "10:00", "11:00", "13:00", "14:00", "15:00")
+DEFAULT_MINUTES = 60
+DEFAULT_CAPACITY = 6
+
+
+def upgrade():
+    op.create_table('clinic_slots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('clinic_id', sa.Integer(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.String(length=5), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinics.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('clinic_id', 'weekday', 'start_time', name='uq_clinic_slots_clinic_id_weekday_start_time')
+    )
+    op.create_table('slot_occupancy',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('clinic_id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=True),
+    sa.Column('day', sa.String(length=10), nullable=False),
+    sa.Column('start_time', sa.String(length=5), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('booked', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinics.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['clinic_slots.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('clinic_id', 'day', 'start_time', name='uq_slot_occupancy_clinic_id_day_start_time')
+    )
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('slot_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_appointments_slot_id_slot_occupancy', 'slot_occupancy', ['slot_id'], ['id'],
+                                    ondelete='SET NULL')
+        batch_op.create_index('ix_appointments_slot_id', ['slot_id'], unique=False)
+
+    # Existing clinics get the default week; existing appointments keep their
+    # free-text dates and hold no slot. Dated slots are created on first use.
+    for weekday in DEFAULT_WEEKDAYS:
+        for start_time in DEFAULT_TIMES:
+            op.execute(
+                "INSERT INTO clinic_slots (clinic_id, weekday, start_time, duration_minutes, capacity) "
+                f"SELECT id, {weekday}, '{start_time}', {DEFAULT_MINUTES}, {DEFAULT_CAPACITY} FROM clinics"
+            )
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_slot_id')
+        batch_op.drop_constraint('fk_appointments_slot_id_slot_occupancy', type_='foreignkey')
+        batch_op.drop_column('slot_id')
+
+    op.drop_table('slot_occupancy')
+    op.drop_table('clinic_slots')
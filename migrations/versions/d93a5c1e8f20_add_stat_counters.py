@@ -0,0 +1,46 @@
+"""add stat counters rollup table
+
+Revision ID: d93a5c1e8f20
+Revises: b41e9d07a2c5
+Create Date: 2026-10-18 11:47:05.126993
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd93a5c1e8f20'
+down_revision = 'b41e9d07a2c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stat_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(length=40), nullable=False),
+    sa.Column('dimension', sa.String(length=40), nullable=False),
+    sa.Column('day', sa.String(length=10), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('metric', 'dimension', 'day', name='uq_stat_counters_metric_dimension_day')
+    )
+
+    # Count the rows that already exist; ORM events keep the table current after this.
+    for select in (
+        "SELECT 'users', '', '', COUNT(*) FROM users",
+        "SELECT 'users_by_role', COALESCE(role, ''), '', COUNT(*) FROM users GROUP BY role",
+        "SELECT 'clinics', '', '', COUNT(*) FROM clinics",
+        "SELECT 'appointments', '', '', COUNT(*) FROM appointments",
+        "SELECT 'appointments_by_clinic', CAST(clinic_id AS VARCHAR(40)), '', COUNT(*) "
+        "FROM appointments GROUP BY clinic_id",
+        "SELECT 'appointments_by_clinic_day', CAST(clinic_id AS VARCHAR(40)), "
+        "COALESCE(CAST(DATE(scheduled_at) AS VARCHAR(10)), ''), COUNT(*) "
+        "FROM appointments GROUP BY clinic_id, DATE(scheduled_at)",
+    ):
+        op.execute(f"INSERT INTO stat_counters (metric, dimension, day, value) {select}")
+
+
+def downgrade():
+    op.drop_table('stat_counters')
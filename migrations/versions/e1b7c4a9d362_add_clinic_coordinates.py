@@ -0,0 +1,28 @@
+"""add clinic coordinates
+
+Revision ID: e1b7c4a9d362
+Revises: c3e9b2d5a417
+Create Date: 2026-10-18 20:14:05.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b7c4a9d362'
+down_revision = 'c3e9b2d5a417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('clinics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('clinics', schema=None) as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
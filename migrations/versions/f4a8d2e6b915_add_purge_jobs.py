@@ -0,0 +1,47 @@
+"""add purge jobs for background clinic and user deletes
+
+Revision ID: f4a8d2e6b915
+Revises: e1b7c4a9d362
+Create Date: 2026-10-18 21:26:40.117392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a8d2e6b915'
+down_revision = 'e1b7c4a9d362'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('purge_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('label', sa.String(length=200), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('deleted', sa.Integer(), nullable=False),
+    sa.Column('batches', sa.Integer(), nullable=False),
+    sa.Column('claimed_by', sa.String(length=32), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('requested_by', sa.Integer(), nullable=True),
+    sa.Column('last_error', sa.String(length=200), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_purge_jobs_kind_target_id', ['kind', 'target_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_purge_jobs_kind_target_id')
+
+    op.drop_table('purge_jobs')
@@ -1,12 +1,35 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from datetime import datetime
 
 db = SQLAlchemy()
 
+# Formats mothers and staff actually type into the free-text date field
+APPOINTMENT_DATE_FORMATS = (
+    "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y",
+)
+
+
+def parse_appointment_date(value):
+    """Best-effort parse of an appointment date string; None if unrecognised."""
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in APPOINTMENT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),  # newest-first keyset listing
+    )
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)  # hash in production
@@ -20,10 +43,16 @@ class User(UserMixin, db.Model):
 
 class Clinic(db.Model):
     __tablename__ = 'clinics'
+    __table_args__ = (
+        db.Index('ix_clinics_created_at_id', 'created_at', 'id'),  # newest-first keyset listing
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     address = db.Column(db.String(300), nullable=False)
     phone = db.Column(db.String(40), nullable=False)
+    # WGS84 degrees; clinics without them are left out of "clinics near me"
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -33,23 +62,192 @@ class Clinic(db.Model):
         return f"<Clinic {self.name}>"
 
 
+class ClinicSlot(db.Model):
+    """Weekly slot template: each ``weekday`` (0 = Monday) at ``start_time``
+    a clinic sees up to ``capacity`` mothers."""
+    __tablename__ = 'clinic_slots'
+    __table_args__ = (
+        db.UniqueConstraint('clinic_id', 'weekday', 'start_time', name='uq_clinic_slots_clinic_id_weekday_start_time'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    clinic_id = db.Column(db.Integer, db.ForeignKey('clinics.id'), nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.String(5), nullable=False)  # 'HH:MM'
+    duration_minutes = db.Column(db.Integer, nullable=False, default=60)
+    capacity = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ClinicSlot clinic={self.clinic_id} {self.weekday}@{self.start_time} x{self.capacity}>"
+
+
+class SlotOccupancy(db.Model):
+    """One dated slot and how many of its places are taken.
+
+    Rows are materialized from the templates a few weeks ahead by
+    services.slots; booking claims a place with a conditional UPDATE of
+    ``booked``, so this table is also what availability queries read.
+    """
+    __tablename__ = 'slot_occupancy'
+    __table_args__ = (
+        db.UniqueConstraint('clinic_id', 'day', 'start_time', name='uq_slot_occupancy_clinic_id_day_start_time'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    clinic_id = db.Column(db.Integer, db.ForeignKey('clinics.id'), nullable=False)
+    template_id = db.Column(db.Integer, db.ForeignKey('clinic_slots.id', ondelete='SET NULL'), nullable=True)
+    day = db.Column(db.String(10), nullable=False)  # ISO date
+    start_time = db.Column(db.String(5), nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=60)
+    capacity = db.Column(db.Integer, nullable=False)
+    booked = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SlotOccupancy clinic={self.clinic_id} {self.day} {self.start_time} {self.booked}/{self.capacity}>"
+
+
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_appointments_clinic_id_scheduled_at', 'clinic_id', 'scheduled_at'),
+        db.Index('ix_appointments_scheduled_at', 'scheduled_at'),
+        db.Index('ix_appointments_slot_id', 'slot_id'),
+        # Newest-first keyset listings, unfiltered and by clinic
+        db.Index('ix_appointments_created_at_id', 'created_at', 'id'),
+        db.Index('ix_appointments_clinic_id_created_at_id', 'clinic_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     mother_name = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(40), nullable=False)
     clinic_id = db.Column(db.Integer, db.ForeignKey('clinics.id'), nullable=False)
-    date = db.Column(db.String(50), nullable=False)  # simple for now, can use Date type
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    date = db.Column(db.String(50), nullable=False)  # as entered; scheduled_at is the typed copy
+    scheduled_at = db.Column(db.DateTime, nullable=True)
+    # The slot this visit holds a place in; None for visits booked before
+    # slots existed or imported in bulk
+    slot_id = db.Column(db.Integer, db.ForeignKey('slot_occupancy.id', ondelete='SET NULL'), nullable=True)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    @validates('date')
+    def _sync_scheduled_at(self, key, value):
+        self.scheduled_at = parse_appointment_date(value)
+        return value
+
     def __repr__(self):
         return f"<Appointment {self.mother_name} - {self.date}>"
 
 
+class Reminder(db.Model):
+    """One SMS reminder for one appointment, sent at most once.
+
+    ``idempotency_key`` names the appointment and the time it was
+    reminded for, so planning twice never queues a second message and a
+    rescheduled visit gets a fresh one. The same key goes to the gateway,
+    which drops a resend of a message it already accepted.
+    """
+    __tablename__ = 'reminders'
+    __table_args__ = (
+        db.Index('ix_reminders_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_reminders_appointment_id', 'appointment_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(80), unique=True, nullable=False)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id', ondelete='CASCADE'), nullable=False)
+    clinic_id = db.Column(db.Integer, nullable=False)  # batches are built per clinic
+    scheduled_for = db.Column(db.DateTime, nullable=False)  # the appointment time this reminder names
+    phone = db.Column(db.String(40), nullable=False)
+    body = db.Column(db.String(320), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # 'pending', 'sending', 'sent', 'failed', 'cancelled'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(32), nullable=True)  # scheduler run holding a 'sending' row
+    gateway = db.Column(db.String(20), nullable=True)
+    gateway_message_id = db.Column(db.String(80), nullable=True)
+    last_error = db.Column(db.String(200), nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Reminder {self.idempotency_key} {self.status}>"
+
+
+class PurgeJob(db.Model):
+    """Background delete of a clinic or a user with all their appointments.
+
+    Appointments go in batches, each in its own short transaction that also
+    advances ``deleted``, so progress is exact and a job stopped half way
+    resumes where it left off. The clinic or user row goes last.
+    """
+    __tablename__ = 'purge_jobs'
+    __table_args__ = (
+        db.Index('ix_purge_jobs_kind_target_id', 'kind', 'target_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # 'clinic' or 'user'
+    target_id = db.Column(db.Integer, nullable=False)
+    label = db.Column(db.String(200), nullable=False)  # shown once the row itself is gone
+    status = db.Column(db.String(10), nullable=False, default='pending')  # 'pending', 'running', 'done', 'failed'
+    total = db.Column(db.Integer, nullable=False, default=0)  # appointments when the job was queued
+    deleted = db.Column(db.Integer, nullable=False, default=0)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    claimed_by = db.Column(db.String(32), nullable=True)  # runner working a 'running' job
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    requested_by = db.Column(db.Integer, nullable=True)  # admin user id; no FK, admins can be purged too
+    last_error = db.Column(db.String(200), nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def percent(self):
+        if self.status == 'done':
+            return 100
+        return min(99, int(100 * self.deleted / self.total)) if self.total else 0
+
+    def __repr__(self):
+        return f"<PurgeJob {self.kind} {self.target_id} {self.status}>"
+
+
+class ArchiveSegment(db.Model):
+    """One gzip member of a monthly appointment archive file.
+
+    services.archive appends a member per batch and month to
+    ``appointments-<month>.jsonl.gz`` in ARCHIVE_DIR and records it here in
+    the same transaction that deletes the rows, so these rows are the index
+    archive searches read to know which byte ranges to open. Bytes past the
+    last recorded member are a batch whose transaction never committed.
+    """
+    __tablename__ = 'archive_segments'
+    __table_args__ = (
+        db.Index('ix_archive_segments_month_byte_offset', 'month', 'byte_offset'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM' of scheduled_at (created_at for undated visits)
+    byte_offset = db.Column(db.BigInteger, nullable=False)
+    byte_length = db.Column(db.Integer, nullable=False)  # compressed
+    raw_bytes = db.Column(db.Integer, nullable=False)  # the JSONL before compression
+    rows = db.Column(db.Integer, nullable=False)
+    first_at = db.Column(db.DateTime, nullable=True)
+    last_at = db.Column(db.DateTime, nullable=True)
+    min_id = db.Column(db.Integer, nullable=False)
+    max_id = db.Column(db.Integer, nullable=False)
+    clinic_ids = db.Column(db.Text, nullable=False)  # ',3,17,' so a clinic filter can skip the member
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ArchiveSegment {self.month} @{self.byte_offset} x{self.rows}>"
+
+
 class Tip(db.Model):
     __tablename__ = 'tips'
+    __table_args__ = (
+        db.Index('ix_tips_language_created_at', 'language', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -60,3 +258,38 @@ class Tip(db.Model):
 
     def __repr__(self):
         return f"<Tip {self.title} ({self.language})>"
+
+
+class AskMobiAnswer(db.Model):
+    __tablename__ = 'ask_mobi_answers'
+    __table_args__ = (
+        db.UniqueConstraint('language', 'question_key', name='uq_ask_mobi_answers_language_question_key'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    language = db.Column(db.String(10), nullable=False)
+    question_key = db.Column(db.String(40), nullable=False)  # sha1 of the normalized question
+    question = db.Column(db.Text, nullable=False)  # normalized form, for staff review
+    answer = db.Column(db.Text, nullable=False)
+    provider = db.Column(db.String(20), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AskMobiAnswer {self.language}:{self.question[:30]}>"
+
+
+class StatCounter(db.Model):
+    """Precomputed count, kept current by services.counters."""
+    __tablename__ = 'stat_counters'
+    __table_args__ = (
+        db.UniqueConstraint('metric', 'dimension', 'day', name='uq_stat_counters_metric_dimension_day'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(40), nullable=False)  # 'users', 'users_by_role', 'appointments_by_clinic_day', ...
+    dimension = db.Column(db.String(40), nullable=False, default='')  # role name or clinic id
+    day = db.Column(db.String(10), nullable=False, default='')  # ISO date for per-day metrics
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<StatCounter {self.metric}[{self.dimension}][{self.day}]={self.value}>"
@@ -6,5 +6,6 @@ from .clinic_routes import clinic_bp
 from .mother_routes import mother_bp
 from .admin_routes import admin_bp
 from .admin_auth_routes import admin_auth_bp
+from .health_routes import health_bp
 
-__all__ = ["main_bp", "auth_bp", "clinic_bp", "mother_bp", "admin_bp", "admin_auth_bp"]
+__all__ = ["main_bp", "auth_bp", "clinic_bp", "mother_bp", "admin_bp", "admin_auth_bp", "health_bp"]
@@ -1,6 +1,21 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+import hmac
+import re
+from flask import (
+    Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify,
+    current_app, Response, stream_with_context,
+)
 from flask_login import login_required, current_user
-from models import db, User, Clinic, Appointment
+from datetime import date, datetime, timedelta
+from itertools import islice
+from models import db, User, Clinic, ClinicSlot, Appointment, PurgeJob
+from services import (
+    tip_feed_cache, answer_cache, ask_mobi_providers, user_cache, page_cache, reminder_scheduler, purge_runner,
+    appointment_archiver, counters, metrics, slots, transfer,
+)
+from services.purge import ACTIVE
+from services.listings import appointment_listing
+from services.pagination import keyset_paginate
+from services.metrics import ask_mobi_ttft
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/mobi-panel-888x")
 
@@ -19,20 +34,81 @@ def admin_required(f):
 @login_required
 @admin_required
 def dashboard():
+    # Precomputed rows from stat_counters instead of COUNT(*) scans
+    today = date.today()
+    week = [(today + timedelta(days=i)).isoformat() for i in range(7)]
+    stats = counters.read(days=["", *week])
+
+    per_day = counters.by_day(stats, "appointments_by_clinic_day")
+    busiest = sorted(
+        counters.by_dimension(stats, "appointments_by_clinic_day", week[0]).items(),
+        key=lambda item: item[1], reverse=True,
+    )[:5]
+    names = dict(
+        db.session.query(Clinic.id, Clinic.name).filter(Clinic.id.in_([int(c) for c, _ in busiest])).all()
+    ) if busiest else {}
+
     return render_template(
         "admin/dashboard.html",
-        users_count=User.query.count(),
-        clinics_count=Clinic.query.count(),
-        appointments_count=Appointment.query.count()
+        users_count=counters.total(stats, "users"),
+        clinics_count=counters.total(stats, "clinics"),
+        appointments_count=counters.total(stats, "appointments"),
+        users_by_role=counters.by_dimension(stats, "users_by_role"),
+        upcoming=[(day, per_day.get(day, 0)) for day in week],
+        busiest_today=[(names.get(int(c), f"Clinic #{c}"), n) for c, n in busiest],
+    )
+
+# ---------------- Cache Stats ----------------
+@admin_bp.route("/cache-stats")
+@login_required
+@admin_required
+def cache_stats():
+    return jsonify(
+        tip_feed=tip_feed_cache.stats(),
+        ask_mobi_answers=answer_cache.stats(),
+        users=user_cache.stats(),
+        pages=page_cache.stats(),
     )
 
+@admin_bp.route("/ask-mobi-cache/purge", methods=["POST"])
+@login_required
+@admin_required
+def purge_answer_cache():
+    removed = answer_cache.purge(request.form.get("language") or None)
+    flash(f"Removed {removed} cached Ask Mobi answers.", "success")
+    return redirect(url_for("admin.dashboard"))
+
+@admin_bp.route("/ask-mobi-stats")
+@login_required
+@admin_required
+def ask_mobi_stats():
+    return jsonify(time_to_first_token=ask_mobi_ttft.snapshot(), providers=ask_mobi_providers.snapshot())
+
+@admin_bp.route("/reminder-stats")
+@login_required
+@admin_required
+def reminder_stats():
+    return jsonify(reminder_scheduler.snapshot())
+
+@admin_bp.route("/metrics")
+def prometheus_metrics():
+    # Admins, or a scraper presenting METRICS_TOKEN as a bearer token
+    token = current_app.config.get("METRICS_TOKEN")
+    if not (token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")):
+        if not current_user.is_authenticated:
+            return current_app.login_manager.unauthorized()
+        if current_user.role != "admin":
+            abort(403)
+    return Response(metrics.render(metrics.REGISTRY), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 # ---------------- Users Management ----------------
 @admin_bp.route("/users")
 @login_required
 @admin_required
 def manage_users():
-    users = User.query.all()
-    return render_template("admin/users.html", users=users)
+    users = keyset_paginate(User.query, User, request.args.get("cursor"))
+    purging = purge_runner.active_targets("user", (user.id for user in users.items))
+    return render_template("admin/users.html", users=users, purging=purging)
 
 @admin_bp.route("/users/add", methods=["GET", "POST"])
 @login_required
@@ -60,6 +136,7 @@ def edit_user(user_id):
         user.username = request.form.get("username")
         user.role = request.form.get("role")
         db.session.commit()
+        user_cache.invalidate(user.id)
         flash("User updated!", "success")
         return redirect(url_for("admin.manage_users"))
     return render_template("admin/edit_user.html", user=user)
@@ -68,19 +145,20 @@ def edit_user(user_id):
 @login_required
 @admin_required
 def delete_user(user_id):
+    # The user and their appointments go in batches on a background job
     user = User.query.get_or_404(user_id)
-    db.session.delete(user)
-    db.session.commit()
-    flash("User deleted!", "success")
-    return redirect(url_for("admin.manage_users"))
+    job = purge_runner.request("user", user, requested_by=current_user.id)
+    flash(f"Deleting {job.label} and {job.total} appointment(s) in the background.", "info")
+    return redirect(url_for("admin.purge_jobs"))
 
 # ---------------- Clinics Management ----------------
 @admin_bp.route("/clinics")
 @login_required
 @admin_required
 def manage_clinics():
-    clinics = Clinic.query.all()
-    return render_template("admin/clinics.html", clinics=clinics)
+    clinics = keyset_paginate(Clinic.query, Clinic, request.args.get("cursor"))
+    purging = purge_runner.active_targets("clinic", (clinic.id for clinic in clinics.items))
+    return render_template("admin/clinics.html", clinics=clinics, purging=purging)
 
 @admin_bp.route("/clinics/add", methods=["GET", "POST"])
 @login_required
@@ -90,13 +168,18 @@ def add_clinic():
         name = request.form.get("name")
         address = request.form.get("address")
         phone = request.form.get("phone")
-        if name and address and phone:
-            clinic = Clinic(name=name, address=address, phone=phone)
-            db.session.add(clinic)
-            db.session.commit()
-            flash("Clinic added successfully!", "success")
-            return redirect(url_for("admin.manage_clinics"))
-        flash("All fields are required", "danger")
+        try:
+            latitude, longitude = _coordinates(request.form)
+        except ValueError as e:
+            flash(str(e), "danger")
+        else:
+            if name and address and phone:
+                clinic = Clinic(name=name, address=address, phone=phone, latitude=latitude, longitude=longitude)
+                db.session.add(clinic)
+                db.session.commit()
+                flash("Clinic added successfully!", "success")
+                return redirect(url_for("admin.manage_clinics"))
+            flash("All fields are required", "danger")
     return render_template("admin/add_clinic.html")
 
 @admin_bp.route("/clinics/edit/<int:clinic_id>", methods=["GET", "POST"])
@@ -105,6 +188,11 @@ def add_clinic():
 def edit_clinic(clinic_id):
     clinic = Clinic.query.get_or_404(clinic_id)
     if request.method == "POST":
+        try:
+            clinic.latitude, clinic.longitude = _coordinates(request.form)
+        except ValueError as e:
+            flash(str(e), "danger")
+            return render_template("admin/edit_clinic.html", clinic=clinic)
         clinic.name = request.form.get("name")
         clinic.address = request.form.get("address")
         clinic.phone = request.form.get("phone")
@@ -113,32 +201,99 @@ def edit_clinic(clinic_id):
         return redirect(url_for("admin.manage_clinics"))
     return render_template("admin/edit_clinic.html", clinic=clinic)
 
+def _coordinates(form):
+    """(latitude, longitude) from a clinic form; both blank means not located."""
+    latitude, longitude = form.get("latitude", "").strip(), form.get("longitude", "").strip()
+    if not latitude and not longitude:
+        return None, None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except ValueError:
+        raise ValueError("Latitude and longitude must both be decimal degrees") from None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("Latitude must be within ±90 and longitude within ±180")
+    return latitude, longitude
+
 @admin_bp.route("/clinics/delete/<int:clinic_id>", methods=["POST"])
 @login_required
 @admin_required
 def delete_clinic(clinic_id):
+    # The clinic, its appointments and its slots go in batches on a background job
     clinic = Clinic.query.get_or_404(clinic_id)
-    db.session.delete(clinic)
-    db.session.commit()
-    flash("Clinic deleted!", "success")
-    return redirect(url_for("admin.manage_clinics"))
+    job = purge_runner.request("clinic", clinic, requested_by=current_user.id)
+    flash(f"Deleting {job.label} and {job.total} appointment(s) in the background.", "info")
+    return redirect(url_for("admin.purge_jobs"))
+
+# ---------------- Background Deletes ----------------
+@admin_bp.route("/purge-jobs")
+@login_required
+@admin_required
+def purge_jobs():
+    # Jobs left behind by a worker that went away continue here
+    purge_runner.resume_abandoned()
+    jobs = PurgeJob.query.order_by(PurgeJob.id.desc()).limit(50).all()
+    return render_template("admin/purge_jobs.html", jobs=jobs, active=ACTIVE)
+
+@admin_bp.route("/purge-jobs/<int:job_id>")
+@login_required
+@admin_required
+def purge_job(job_id):
+    return jsonify(purge_runner.progress(PurgeJob.query.get_or_404(job_id)))
+
+@admin_bp.route("/clinics/<int:clinic_id>/slots", methods=["GET", "POST"])
+@login_required
+@admin_required
+def clinic_slots(clinic_id):
+    clinic = Clinic.query.get_or_404(clinic_id)
+    if request.method == "POST":
+        action = request.form.get("action")
+        capacity = request.form.get("capacity", type=int)
+        if capacity is not None and capacity < 0:
+            flash("Capacity cannot be negative", "danger")
+        elif action == "add":
+            weekday = request.form.get("weekday", type=int)
+            start_time = request.form.get("start_time", "")
+            duration = request.form.get("duration", 60, type=int)
+            if weekday not in range(7) or not re.fullmatch(r"([01]\d|2[0-3]):[0-5]\d", start_time) or not capacity:
+                flash("Choose a day, a start time (HH:MM) and a capacity", "danger")
+            elif ClinicSlot.query.filter_by(clinic_id=clinic.id, weekday=weekday, start_time=start_time).first():
+                flash("That slot already exists; change its capacity instead", "warning")
+            else:
+                slots.add_template(clinic.id, weekday, start_time, capacity, duration)
+                db.session.commit()
+                flash("Slot added!", "success")
+        else:
+            template = ClinicSlot.query.filter_by(id=request.form.get("template", type=int), clinic_id=clinic.id).first_or_404()
+            if action == "capacity" and capacity is not None:
+                slots.set_capacity(template, capacity)
+                flash("Capacity updated!", "success")
+            elif action == "remove":
+                slots.remove_template(template)
+                flash("Slot removed!", "success")
+            db.session.commit()
+        return redirect(url_for("admin.clinic_slots", clinic_id=clinic.id))
+
+    return render_template(
+        "admin/clinic_slots.html",
+        clinic=clinic,
+        templates=ClinicSlot.query.filter_by(clinic_id=clinic.id).order_by(ClinicSlot.weekday, ClinicSlot.start_time).all(),
+        weekdays=slots.WEEKDAYS,
+        occupancy=slots.occupancy(clinic.id),
+    )
 
 # ---------------- Appointments Management ----------------
 @admin_bp.route("/appointments")
 @login_required
 @admin_required
 def manage_appointments():
-    clinic_filter = request.args.get("clinic")
+    clinic_filter = request.args.get("clinic", type=int)
     date_filter = request.args.get("date")
-    query = Appointment.query.order_by(Appointment.date.desc())
-    
-    if clinic_filter:
-        query = query.filter_by(clinic=clinic_filter)
-    if date_filter:
-        query = query.filter_by(date=date_filter)
-    
-    appointments = query.all()
-    clinics = [c.name for c in Clinic.query.all()]  # for filter dropdown
+    query = appointment_listing(
+        _appointments_query(clinic_filter, date_filter),
+        Appointment.mother_name, Appointment.phone, Appointment.date, Appointment.notes,
+    )
+    appointments = keyset_paginate(query, Appointment, request.args.get("cursor"))
+    clinics = db.session.query(Clinic.id, Clinic.name).order_by(Clinic.name).all()  # for filter dropdown
     return render_template(
         "admin/appointments.html",
         appointments=appointments,
@@ -147,22 +302,51 @@ def manage_appointments():
         selected_date=date_filter
     )
 
+def _appointment_filters(clinic_id=None, date=None):
+    criteria = []
+    if clinic_id:
+        criteria.append(Appointment.clinic_id == clinic_id)
+    if date:
+        # Range on scheduled_at so (clinic_id, scheduled_at) can serve the filter
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            abort(400, description="Invalid date")
+        criteria += [Appointment.scheduled_at >= day, Appointment.scheduled_at < day + timedelta(days=1)]
+    return criteria
+
+def _appointments_query(clinic_id=None, date=None):
+    return Appointment.query.filter(*_appointment_filters(clinic_id, date))
+
 @admin_bp.route("/appointments/edit/<int:appointment_id>", methods=["GET", "POST"])
 @login_required
 @admin_required
 def edit_appointment(appointment_id):
     appointment = Appointment.query.get_or_404(appointment_id)
-    clinics = Clinic.query.all()
     if request.method == "POST":
-        appointment.mother_name = request.form.get("mother_name")
-        appointment.phone = request.form.get("phone")
-        appointment.clinic = request.form.get("clinic")
-        appointment.date = request.form.get("date")
-        appointment.notes = request.form.get("notes")
-        db.session.commit()
-        flash("Appointment updated!", "success")
-        return redirect(url_for("admin.manage_appointments"))
-    return render_template("admin/edit_appointment.html", appointment=appointment, clinics=clinics)
+        try:
+            slots.move(appointment, request.form.get("clinic", type=int), request.form.get("slot", 0, type=int))
+        except slots.SlotUnavailable as e:
+            db.session.rollback()
+            flash(str(e), "warning")
+        else:
+            appointment.mother_name = request.form.get("mother_name")
+            appointment.phone = request.form.get("phone")
+            appointment.notes = request.form.get("notes")
+            db.session.commit()
+            flash("Appointment updated!", "success")
+            return redirect(url_for("admin.manage_appointments"))
+    clinic_id = request.args.get("clinic", type=int) or appointment.clinic_id
+    slot_choices = slots.choices(
+        clinic_id,
+        current=appointment.slot_id if clinic_id == appointment.clinic_id else None,
+        keep_label=None if appointment.slot_id else f"Keep {appointment.date}",
+    )
+    clinics = db.session.query(Clinic.id, Clinic.name).order_by(Clinic.name).all()
+    return render_template(
+        "admin/edit_appointment.html", appointment=appointment, clinics=clinics, clinic_id=clinic_id,
+        slot_choices=slot_choices,
+    )
 
 @admin_bp.route("/appointments/delete/<int:appointment_id>", methods=["POST"])
 @login_required
@@ -173,3 +357,161 @@ def delete_appointment(appointment_id):
     db.session.commit()
     flash("Appointment deleted!", "success")
     return redirect(url_for("admin.manage_appointments"))
+
+# ---------------- Bulk Export / Import ----------------
+@admin_bp.route("/export/<any(users, clinics, appointments):kind>.<any(csv, jsonl):fmt>")
+@login_required
+@admin_required
+def export_data(kind, fmt):
+    where = ()
+    if kind == "appointments":
+        where = _appointment_filters(request.args.get("clinic", type=int), request.args.get("date"))
+    rows = transfer.export_rows(kind, current_app.config["EXPORT_BATCH_SIZE"], where)
+    serialize, content_type = transfer.FORMATS[fmt]
+    response = Response(stream_with_context(serialize(rows)), content_type=content_type)
+    response.headers["Content-Disposition"] = f"attachment; filename={kind}-{date.today().isoformat()}.{fmt}"
+    return response
+
+@admin_bp.route("/import/<any(clinics, appointments):kind>", methods=["GET", "POST"])
+@login_required
+@admin_required
+def import_data(kind):
+    report = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        fmt = (upload.filename.rsplit(".", 1)[-1].lower() if upload and upload.filename else "")
+        if fmt not in transfer.FORMATS:
+            flash("Upload a .csv or .jsonl file", "danger")
+        else:
+            report = transfer.import_records(
+                kind,
+                transfer.read_records(upload.stream, fmt),
+                batch_size=current_app.config["IMPORT_BATCH_SIZE"],
+                max_errors=current_app.config["IMPORT_MAX_ERRORS"],
+            )
+            if request.accept_mimetypes.best == "application/json":
+                return jsonify(report.as_dict())
+            flash(f"Imported {report.inserted} {kind}, rejected {report.rejected} rows.",
+                  "success" if not report.rejected else "warning")
+    return render_template("admin/import.html", kind=kind, columns=transfer.IMPORT_COLUMNS[kind], report=report)
+
+# ---------------- Appointment Archive ----------------
+@admin_bp.route("/archive")
+@login_required
+@admin_required
+def appointment_archive():
+    filters = _archive_filters()
+    results, more = None, False
+    if any(filters.values()):
+        # Reads only the indexed members that can match, and stops at the limit
+        limit = appointment_archiver.search_limit
+        results = list(islice(appointment_archiver.search(**filters), limit + 1))
+        results, more = results[:limit], len(results) > limit
+    clinics = db.session.query(Clinic.id, Clinic.name).order_by(Clinic.name).all()
+    return render_template(
+        "admin/archive.html",
+        months=appointment_archiver.months(),
+        after_days=appointment_archiver.after_days,
+        results=results,
+        more=more,
+        clinics=clinics,
+        clinic_names=dict(clinics),
+        selected_clinic=filters["clinic_id"],
+        selected_month=filters["month"],
+        selected_date=request.args.get("date", ""),
+        search_query=filters["text"] or "",
+    )
+
+def _archive_filters():
+    month = request.args.get("month") or None
+    if month and not re.fullmatch(r"\d{4}-\d{2}", month):
+        abort(400, description="Invalid month")
+    day = request.args.get("date") or None
+    if day:
+        try:
+            day = datetime.strptime(day, "%Y-%m-%d")
+        except ValueError:
+            abort(400, description="Invalid date")
+    return {
+        "month": month,
+        "clinic_id": request.args.get("clinic", type=int),
+        "day": day,
+        "text": request.args.get("q") or None,
+    }
+
+@admin_bp.route("/archive/export.<any(csv, jsonl):fmt>")
+@login_required
+@admin_required
+def export_archive(fmt):
+    rows = appointment_archiver.export_rows(**_archive_filters())
+    serialize, content_type = transfer.FORMATS[fmt]
+    response = Response(stream_with_context(serialize(rows)), content_type=content_type)
+    response.headers["Content-Disposition"] = f"attachment; filename=archived-appointments-{date.today().isoformat()}.{fmt}"
+    return response
+
+@admin_bp.route("/archive/<month>.jsonl.gz")
+@login_required
+@admin_required
+def archive_month(month):
+    # The stored file as is, never decompressed here
+    chunks = appointment_archiver.month_chunks(month) if re.fullmatch(r"\d{4}-\d{2}", month) else None
+    if chunks is None:
+        abort(404)
+    response = Response(stream_with_context(chunks), mimetype="application/gzip")
+    response.headers["Content-Disposition"] = f"attachment; filename=appointments-{month}.jsonl.gz"
+    return response
+
+# ---------------- JSON Listing API ----------------
+def _page_json(page, serialize):
+    return jsonify(
+        items=[serialize(row) for row in page.items],
+        next_cursor=page.next_cursor,
+        per_page=page.per_page,
+    )
+
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+@admin_bp.route("/api/users")
+@login_required
+@admin_required
+def api_users():
+    page = keyset_paginate(User.query, User, request.args.get("cursor"))
+    return _page_json(page, lambda u: {
+        "id": u.id,
+        "username": u.username,
+        "role": u.role,
+        "created_at": _timestamp(u.created_at),
+    })
+
+@admin_bp.route("/api/clinics")
+@login_required
+@admin_required
+def api_clinics():
+    page = keyset_paginate(Clinic.query, Clinic, request.args.get("cursor"))
+    return _page_json(page, lambda c: {
+        "id": c.id,
+        "name": c.name,
+        "address": c.address,
+        "phone": c.phone,
+        "latitude": c.latitude,
+        "longitude": c.longitude,
+        "created_at": _timestamp(c.created_at),
+    })
+
+@admin_bp.route("/api/appointments")
+@login_required
+@admin_required
+def api_appointments():
+    query = _appointments_query(request.args.get("clinic", type=int), request.args.get("date"))
+    page = keyset_paginate(query, Appointment, request.args.get("cursor"))
+    return _page_json(page, lambda a: {
+        "id": a.id,
+        "mother_name": a.mother_name,
+        "phone": a.phone,
+        "clinic_id": a.clinic_id,
+        "date": a.date,
+        "scheduled_at": _timestamp(a.scheduled_at),
+        "notes": a.notes,
+        "created_at": _timestamp(a.created_at),
+    })
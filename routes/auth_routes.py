@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User
 from forms import LoginForm, RegisterForm
+from services.database import retry_on_lock
 from werkzeug.security import check_password_hash, generate_password_hash
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
@@ -31,6 +32,7 @@ def logout():
 
 # ---------------- Register (regular users only) ----------------
 @auth_bp.route("/register", methods=["GET", "POST"])
+@retry_on_lock
 def register():
     form = RegisterForm()
     if form.validate_on_submit():
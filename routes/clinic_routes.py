@@ -1,7 +1,11 @@
-from flask import render_template, redirect, url_for, flash, Blueprint 
+from flask import render_template, redirect, url_for, flash, request, Blueprint
 from flask_login import login_required, current_user
-from models import db, Tip, Appointment
+from models import db, Tip, Appointment, Clinic
 from forms import TipForm, AppointmentForm
+from services import tip_feed_cache, slots
+from services.listings import appointment_listing
+from services.pagination import keyset_paginate
+from services.database import retry_on_lock
 
 #initialize clinic route
 clinic_bp = Blueprint("clinic", __name__)
@@ -13,13 +17,17 @@ def dashboard():
         flash("Access denied.", "danger")
         return redirect(url_for("main.index"))
 
-    tips = Tip.query.order_by(Tip.created_at.desc()).all()
-    appts = Appointment.query.order_by(Appointment.created_at.desc()).all()
-    return render_template("clinic_dashboard.html", tips=tips, appts=appts)
+    tips = keyset_paginate(Tip.query, Tip, request.args.get("tips_cursor"))
+    appts = keyset_paginate(
+        appointment_listing(Appointment.query, Appointment.mother_name, Appointment.phone, Appointment.date),
+        Appointment, request.args.get("appts_cursor"),
+    )
+    return render_template("nurse_dashboard.html", tips=tips, appts=appts)
 
 
 @clinic_bp.route("/add_tip", methods=["GET", "POST"])
 @login_required
+@retry_on_lock
 def add_tip():
     if current_user.role != "clinic":
         flash("Access denied.", "danger")
@@ -35,6 +43,7 @@ def add_tip():
         )
         db.session.add(tip)
         db.session.commit()
+        tip_feed_cache.invalidate(tip.language)
         flash("Tip added successfully!", "success")
         return redirect(url_for("clinic.dashboard"))
     return render_template("add_tip.html", form=form)
@@ -42,6 +51,7 @@ def add_tip():
 
 @clinic_bp.route("/edit_tip/<int:tip_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_lock
 def edit_tip(tip_id):
     if current_user.role != "clinic":
         flash("Access denied.", "danger")
@@ -50,11 +60,14 @@ def edit_tip(tip_id):
     tip = Tip.query.get_or_404(tip_id)
     form = TipForm(obj=tip)
     if form.validate_on_submit():
+        old_language = tip.language
         tip.title = form.title.data
         tip.content = form.content.data
         tip.language = form.language.data
         tip.audio_filename = form.audio_filename.data or None
         db.session.commit()
+        tip_feed_cache.invalidate(old_language)
+        tip_feed_cache.invalidate(tip.language)
         flash("Tip updated successfully!", "success")
         return redirect(url_for("clinic.dashboard"))
     return render_template("add_tip.html", form=form, edit=True)
@@ -62,20 +75,24 @@ def edit_tip(tip_id):
 
 @clinic_bp.route("/delete_tip/<int:tip_id>")
 @login_required
+@retry_on_lock
 def delete_tip(tip_id):
     if current_user.role != "clinic":
         flash("Access denied.", "danger")
         return redirect(url_for("main.index"))
 
     tip = Tip.query.get_or_404(tip_id)
+    language = tip.language
     db.session.delete(tip)
     db.session.commit()
+    tip_feed_cache.invalidate(language)
     flash("Tip deleted successfully.", "success")
     return redirect(url_for("clinic.dashboard"))
 
 
 @clinic_bp.route("/edit_appointment/<int:appt_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_lock
 def edit_appointment(appt_id):
     if current_user.role != "clinic":
         flash("Access denied.", "danger")
@@ -84,12 +101,26 @@ def edit_appointment(appt_id):
     appt = Appointment.query.get_or_404(appt_id)
     form = AppointmentForm(obj=appt)
     if form.validate_on_submit():
-        appt.mother_name = form.mother_name.data
-        appt.phone = form.phone.data
-        appt.clinic = form.clinic.data
-        appt.date = form.date.data
-        appt.notes = form.notes.data
-        db.session.commit()
-        flash("Appointment updated successfully!", "success")
-        return redirect(url_for("clinic.dashboard"))
+        try:
+            slots.move(appt, form.clinic_id.data, form.slot_id.data)
+        except slots.SlotUnavailable as e:
+            db.session.rollback()
+            flash(str(e), "warning")
+        else:
+            appt.mother_name = form.mother_name.data
+            appt.phone = form.phone.data
+            appt.notes = form.notes.data
+            db.session.commit()
+            flash("Appointment updated successfully!", "success")
+            return redirect(url_for("clinic.dashboard"))
+
+    if request.method == "GET":
+        form.clinic_id.data = request.args.get("clinic", type=int) or appt.clinic_id
+        form.slot_id.data = appt.slot_id or 0
+    form.clinic_id.choices = [tuple(row) for row in db.session.query(Clinic.id, Clinic.name).order_by(Clinic.name)]
+    form.slot_id.choices = slots.choices(
+        form.clinic_id.data,
+        current=appt.slot_id if form.clinic_id.data == appt.clinic_id else None,
+        keep_label=None if appt.slot_id else f"Keep {appt.date}",
+    )
     return render_template("appointments.html", form=form, edit=True)
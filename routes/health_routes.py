@@ -0,0 +1,16 @@
+from flask import Blueprint, jsonify
+from services import lifecycle
+
+health_bp = Blueprint("health", __name__)
+
+# ---------------- Liveness / readiness probes ----------------
+@health_bp.route("/healthz")
+def healthz():
+    # The process is up and serving; says nothing about warm caches
+    return jsonify(status="ok")
+
+@health_bp.route("/readyz")
+def readyz():
+    # 503 until this worker has warmed up, and again once it starts draining
+    state = lifecycle.snapshot()
+    return jsonify(state), 200 if state["ready"] else 503
@@ -1,35 +1,119 @@
-from flask import Blueprint, render_template, session, g, request
-from models import Tip
+from flask import Blueprint, render_template, session, g, request, current_app, send_from_directory, jsonify
+from markupsafe import Markup
+from models import Tip, Clinic
+from services import tip_feed_cache, tip_search, translations, page_cache, slots, clinic_index
+from services.http_cache import conditional_page
 
 main_bp = Blueprint("main", __name__)
 
 @main_bp.before_app_request
 def set_language():
-    lang = request.args.get("lang")
+    # Unsupported ?lang= values are ignored rather than stored in the session
+    lang = translations.negotiate(request.args.get("lang"))
     if lang:
         session["lang"] = lang
-    g.lang = session.get("lang", "en")
+    g.lang = translations.negotiate(session.get("lang")) or translations.default
 
 @main_bp.context_processor
 def inject_translations():
-    translations = {
-        "en": {"title": "Health Tips", "book": "Book an Appointment", "read_more": "Read More",
-               "welcome": "Welcome to Mobi Mama", "subtitle": "Empowering mothers with healthcare guidance.",
-               "login": "Login", "signup": "Sign Up"},
-        "tw": {"title": "Apɔw Mu Nkyerɛkyerɛ", "book": "Paw Appɔintment", "read_more": "Kenkan Bio",
-               "welcome": "Akwaaba Mobi Mama", "subtitle": "Yɛboa maamefoɔ wɔ Ghana sɛ wɔnya apɔw ho nkyerɛkyerɛ.",
-               "login": "Kɔ Mu", "signup": "Bɔ Akawnt"},
+    # Catalogs are compiled once; this is a dict lookup per render
+    lang = g.lang
+    return {
+        "t": translations.catalog(lang),
+        "current_lang": lang,
+        "languages": translations.languages,
+        "fragment": lambda template: translations.fragment(template, lang),
     }
-    return {"t": translations[g.lang], "current_lang": g.lang}
 
 @main_bp.route("/")
+@page_cache.cached
 def index():
     lang = g.lang
-    tips = Tip.query.filter_by(language=lang).order_by(Tip.created_at.desc()).all()
-    return render_template("index.html", tips=tips, lang=lang)
+    feed = tip_feed_cache.get_or_load(
+        lang, lambda tips: render_template("partials/tip_section.html", tips=tips)
+    )
+    # Validators come from the cached rows, so a 304 costs no query
+    last_modified = max((tip.updated_at or tip.created_at for tip in feed.tips), default=None)
+    return conditional_page(
+        lambda: render_template("index.html", tips=feed.tips, tips_html=Markup(feed.html), lang=lang),
+        "index", lang, len(feed.tips), last_modified,
+        last_modified=last_modified,
+    )
+
+@main_bp.route("/search")
+def search():
+    query = request.args.get("q", "").strip()
+    # ?language=all searches every language; default is the reader's own
+    language = request.args.get("language", g.lang)
+    limit = min(request.args.get("limit", current_app.config["SEARCH_RESULTS_LIMIT"], type=int),
+                current_app.config["SEARCH_RESULTS_MAX"])
+    hits = tip_search.search(query, None if language == "all" else language, limit=max(limit, 1))
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(query=query, language=language, results=[
+            {"id": hit.id, "title": hit.title, "language": hit.language, "snippet": str(hit.snippet)}
+            for hit in hits
+        ])
+    return render_template("search.html", query=query, language=language, hits=hits)
 
 @main_bp.route("/tip/<int:tip_id>")
+@page_cache.cached
 def tip_detail(tip_id):
     tip = Tip.query.get_or_404(tip_id)
     current_lang = g.lang
-    return render_template("tip.html", t=tip, current_lang=current_lang)
+    last_modified = tip.updated_at or tip.created_at
+
+    def render():
+        # The tip card is shared by every viewer; only the page around it is per user
+        card = page_cache.fragment(f"tip:{tip.id}", lambda: render_template("partials/tip_card.html", tip=tip))
+        return render_template("tip.html", tip=tip, tip_html=Markup(card), current_lang=current_lang)
+
+    return conditional_page(
+        render,
+        "tip", tip.id, current_lang, last_modified,
+        last_modified=last_modified,
+    )
+
+@main_bp.route("/clinics/<int:clinic_id>/slots")
+def clinic_slots(clinic_id):
+    """Next free times at a clinic, read from the per-day slot occupancy table."""
+    if not Clinic.query.with_entities(Clinic.id).filter_by(id=clinic_id).first():
+        return jsonify(error="Unknown clinic"), 404
+    limit = min(request.args.get("limit", current_app.config["SLOT_CHOICES"], type=int), 100)
+    return jsonify(clinic=clinic_id, slots=[
+        {"id": row.id, "day": row.day, "start": row.start_time, "free": row.capacity - row.booked}
+        for row in slots.next_free(clinic_id, limit=max(limit, 1))
+    ])
+
+@main_bp.route("/clinics/nearby")
+def clinics_nearby():
+    """Clinics nearest ``?lat=&lon=``: the ``k`` nearest, those within
+    ``radius_km``, or the ``k`` nearest within it. Served from the in-memory grid."""
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    # NaN fails both comparisons, so it is rejected too
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify(error="lat and lon must be decimal degrees"), 400
+    config = current_app.config
+    radius_km = request.args.get("radius_km", type=float)
+    if radius_km is not None:
+        if not radius_km > 0:
+            return jsonify(error="radius_km must be positive"), 400
+        radius_km = min(radius_km, config["CLINIC_NEARBY_MAX_RADIUS_KM"])
+    default_k = config["CLINIC_NEARBY_LIMIT"] if radius_km is None else config["CLINIC_NEARBY_MAX"]
+    k = min(max(request.args.get("k", default_k, type=int), 1), config["CLINIC_NEARBY_MAX"])
+    return jsonify(clinics=[
+        {"id": clinic.id, "name": clinic.name, "address": clinic.address, "phone": clinic.phone,
+         "latitude": clinic.latitude, "longitude": clinic.longitude, "distance_km": round(distance, 2)}
+        for distance, clinic in clinic_index.nearest(lat, lon, k=k, radius_km=radius_km)
+    ])
+
+@main_bp.route("/audio/<path:filename>")
+def audio_file(filename):
+    # conditional=True gives ETag/Last-Modified and Range (206) support,
+    # so interrupted downloads resume instead of starting over.
+    response = send_from_directory(
+        current_app.config["UPLOAD_FOLDER"], filename,
+        conditional=True, max_age=current_app.config.get("HTTP_CACHE_AUDIO_MAX_AGE", 604800),
+    )
+    response.cache_control.public = True
+    return response
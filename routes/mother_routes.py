@@ -1,21 +1,23 @@
-from dotenv import load_dotenv
-import os
-from flask import render_template, redirect, url_for, flash, request, session, Blueprint
+import json
+import logging
+import time
+from flask import (
+    render_template, redirect, url_for, flash, request, Blueprint,
+    Response, abort, stream_with_context, g,
+)
 from flask_login import login_required, current_user
-from models import Appointment, Tip, db
+from models import Appointment, Clinic, Tip, db
 from forms import AppointmentForm
-import google.generativeai as genai
-from openai import OpenAI
-
-# Load environment variables
-load_dotenv()
-
-# ✅ Configure AI clients
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from services import slots
+from services.ai_providers import ask_mobi_providers, system_prompt
+from services.answer_cache import answer_cache
+from services.database import retry_on_lock
+from services.listings import appointment_listing
+from services.metrics import ask_mobi_ttft
 
 # Initialize mother blueprint
 mother_bp = Blueprint("mother", __name__)
+log = logging.getLogger("mobi_mama.ask_mobi")
 
 
 # ------------------- MOTHER DASHBOARD -------------------
@@ -26,8 +28,8 @@ def dashboard():
         flash("Access denied.", "danger")
         return redirect(url_for("main.index"))
 
-    appointments = Appointment.query.filter_by(
-        mother_name=current_user.username
+    appointments = appointment_listing(
+        Appointment.query.filter_by(user_id=current_user.id), Appointment.date, Appointment.notes
     ).order_by(Appointment.created_at.desc()).all()
 
     tips = Tip.query.order_by(Tip.created_at.desc()).limit(5).all()
@@ -38,6 +40,7 @@ def dashboard():
 # ------------------- APPOINTMENTS -------------------
 @mother_bp.route("/appointments", methods=["GET", "POST"])
 @login_required
+@retry_on_lock
 def appointments():
     if current_user.role != "mother":
         flash("Access denied.", "danger")
@@ -45,27 +48,48 @@ def appointments():
 
     form = AppointmentForm()
 
+    # The booking's conditional UPDATE runs before anything else is read, so
+    # on SQLite it starts its own write transaction instead of upgrading a
+    # stale read snapshot; the slot it names must belong to the clinic
     if form.validate_on_submit():
-        appt = Appointment(
-            mother_name=current_user.username,
-            phone=form.phone.data,
-            clinic=form.clinic.data,
-            date=form.date.data,
-            notes=form.notes.data,
+        try:
+            slots.book(
+                Appointment(
+                    mother_name=current_user.username,
+                    user_id=current_user.id,
+                    phone=form.phone.data,
+                    notes=form.notes.data,
+                ),
+                form.clinic_id.data,
+                form.slot_id.data,
+            )
+            db.session.commit()
+        except slots.SlotUnavailable as e:
+            db.session.rollback()
+            flash(str(e), "warning")
+        else:
+            flash("Appointment booked successfully!", "success")
+            return redirect(url_for("mother.appointments"))
+
+    form.clinic_id.choices = [tuple(row) for row in db.session.query(Clinic.id, Clinic.name).order_by(Clinic.name)]
+    if request.method == "GET":
+        form.clinic_id.data = request.args.get("clinic", type=int) or (
+            form.clinic_id.choices[0][0] if form.clinic_id.choices else None
         )
-        db.session.add(appt)
-        db.session.commit()
-        flash("Appointment booked successfully!", "success")
-        return redirect(url_for("mother.appointments"))
+    form.slot_id.choices = slots.choices(form.clinic_id.data)
 
-    appointments = Appointment.query.filter_by(
-        mother_name=current_user.username
+    appointments = appointment_listing(
+        Appointment.query.filter_by(user_id=current_user.id),
+        Appointment.mother_name, Appointment.date, Appointment.phone,
     ).order_by(Appointment.created_at.desc()).all()
 
     return render_template("appointments.html", form=form, appts=appointments)
 
 
 # ------------------- ASK MOBI (AI Chatbot) -------------------
+UNAVAILABLE_MESSAGE = "Sorry, Mobi is currently unavailable. Please try again later."
+
+
 @mother_bp.route("/ask_mobi", methods=["GET", "POST"])
 @login_required
 def ask_mobi():
@@ -76,39 +100,72 @@ def ask_mobi():
     response_text = None
     user_message = None
 
+    # Non-streaming fallback for browsers that can't read a streamed response
     if request.method == "POST":
         user_message = request.form.get("message")
         if user_message:
-            lang = session.get("lang", "en")
-            system_prompt = (
-                "You are Mobi, a friendly maternal health assistant for mothers in Ghana. "
-                "Respond kindly, clearly, and accurately. If asked for a diagnosis, "
-                "advise visiting a health center. Respond in "
-                f"{'Twi' if lang == 'tw' else 'English'}."
-            )
-
-            # Choose Gemini or OpenAI
-            use_gemini = True
-
-            try:
-                if use_gemini:
-                    model = genai.GenerativeModel("gemini-2.5-flash")
-                    chat = model.start_chat(history=[])
-                    response = chat.send_message(f"{system_prompt}\nUser: {user_message}")
-                    response_text = response.text
-                else:
-                    completion = openai_client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_message},
-                        ],
-                        temperature=0.7,
-                    )
-                    response_text = completion.choices[0].message.content
-
-            except Exception as e:
-                print("AI Error:", e)
-                response_text = "Sorry, Mobi is currently unavailable. Please try again later."
-
-    return render_template("ask_mobi.html", response=response_text, user_message=user_message)
+            lang = g.lang
+            response_text = answer_cache.get(lang, user_message)
+            if response_text is None:
+                try:
+                    response_text, provider_name = ask_mobi_providers.complete(system_prompt(lang), user_message)
+                    answer_cache.put(lang, user_message, response_text, provider_name)
+                except Exception as e:
+                    log.warning("Ask Mobi failed: %s", e)
+                    response_text = answer_cache.get(lang, user_message, allow_stale=True) or UNAVAILABLE_MESSAGE
+
+    return render_template(
+        "ask_mobi.html", response=response_text, user_message=user_message, unavailable_message=UNAVAILABLE_MESSAGE
+    )
+
+
+# The question travels in the POST body so it stays out of access logs,
+# proxy logs and browser history; the page reads the reply with fetch()
+@mother_bp.route("/ask_mobi/stream", methods=["POST"])
+@login_required
+def ask_mobi_stream():
+    if current_user.role != "mother":
+        abort(403)
+
+    user_message = request.form.get("message", "").strip()
+    if not user_message:
+        abort(400)
+
+    lang = g.lang
+
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    def generate():
+        cached = answer_cache.get(lang, user_message)
+        if cached is not None:
+            yield sse("token", {"text": cached})
+            yield sse("done", {"cached": True})
+            return
+
+        started = time.monotonic()
+        tokens = []
+        try:
+            provider_name, stream = ask_mobi_providers.open_stream(system_prompt(lang), user_message)
+            for token in stream:
+                if not tokens:
+                    ask_mobi_ttft.observe(time.monotonic() - started)
+                tokens.append(token)
+                yield sse("token", {"text": token})
+        except Exception as e:
+            log.warning("Ask Mobi stream failed: %s", e)
+            # Only fall back if nothing was shown yet, so answers aren't spliced
+            stale = None if tokens else answer_cache.get(lang, user_message, allow_stale=True)
+            if stale is not None:
+                yield sse("token", {"text": stale})
+                yield sse("done", {"cached": True})
+            else:
+                yield sse("error", {"text": UNAVAILABLE_MESSAGE})
+            return
+        answer_cache.put(lang, user_message, "".join(tokens), provider_name)
+        yield sse("done", {})
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # don't let nginx buffer tokens
+    return response
@@ -0,0 +1,75 @@
+"""Offline load test for the Ask Mobi provider pool.
+
+Drives a ProviderPool of two local FakeProviders (a flaky, slow primary and a
+healthy secondary) from many threads and reports latency, failovers,
+rejections and breaker state. No network access or API keys needed.
+
+    python scripts/ask_mobi_load.py --requests 400 --concurrency 32
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services.ai_providers import FakeProvider, ProviderPool, ProviderUnavailable
+
+
+def run(args):
+    pool = ProviderPool(
+        providers=[
+            FakeProvider("primary", first_token_delay=args.primary_delay,
+                         error_rate=args.primary_error_rate, seed=args.seed),
+            FakeProvider("secondary", first_token_delay=args.secondary_delay, seed=args.seed),
+        ],
+        max_in_flight=args.max_in_flight,
+        acquire_timeout=args.acquire_timeout,
+        timeout=args.timeout,
+        breaker_options={"cooldown": args.cooldown, "slow_seconds": args.slow_seconds},
+    )
+
+    def ask(i):
+        started = time.monotonic()
+        try:
+            _, provider = pool.complete("prompt", f"question {i}")
+        except ProviderUnavailable:
+            provider = None
+        return provider, time.monotonic() - started
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(ask, range(args.requests)))
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(latency for _, latency in results)
+    served = {}
+    for provider, _ in results:
+        served[provider or "unavailable"] = served.get(provider or "unavailable", 0) + 1
+
+    print(f"requests:     {args.requests} in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+    print(f"latency p50:  {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p95:  {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"served by:    {served}")
+    snapshot = pool.snapshot()
+    print(f"failovers:    {snapshot['failovers']}  rejected: {snapshot['rejected']}")
+    for name, breaker in snapshot["providers"].items():
+        print(f"breaker {name}: {breaker}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--acquire-timeout", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--primary-delay", type=float, default=0.05)
+    parser.add_argument("--primary-error-rate", type=float, default=0.6)
+    parser.add_argument("--secondary-delay", type=float, default=0.02)
+    parser.add_argument("--slow-seconds", type=float, default=0.5)
+    parser.add_argument("--cooldown", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    run(parser.parse_args())
@@ -0,0 +1,219 @@
+"""Admin appointment pages before and after archiving past visits.
+
+Seeds (or reuses, from --data-dir) the scripts/seed_db.py database at
+--scale, works on a copy, and times the admin appointment pages, the JSON
+listing API and the CSV exports through a test client. Then archives every
+visit scheduled more than --after-days before the seed's anchor with
+services.archive, times the same pages again, and times searching and
+streaming the archive. Checks that every archived visit reads back field
+for field, that no visit was lost or duplicated, and that the dashboard
+counters still match a full recount.
+
+    python scripts/bench_archive.py
+    python scripts/bench_archive.py --scale 30 --after-days 30 --output /tmp/archive.json
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import event, func, select
+from werkzeug.test import Client
+
+from app import create_app
+from models import db, Appointment
+from services import appointment_archiver, counters
+from services.archive import COLUMNS
+from bench_endpoints import BenchConfig, login_as, measure, sample_ids, seeded_database
+
+ANCHOR = datetime(2026, 1, 5, 9, 0)  # seed_db's default; its visits run from a year before to 90 days after
+PANEL = "/mobi-panel-888x"
+
+
+def fingerprint(values):
+    encoded = json.dumps([value.isoformat() if hasattr(value, "isoformat") else value for value in values])
+    return hashlib.blake2b(encoded.encode(), digest_size=8).digest()
+
+
+def admin_pages(ids, args):
+    """(name, url, requests) for the pages archival should speed up."""
+    clinic = ids["clinic"]
+    return [
+        ("admin.dashboard", f"{PANEL}/", args.requests),
+        ("admin.manage_appointments", f"{PANEL}/appointments", args.requests),
+        ("admin.manage_appointments[clinic]", f"{PANEL}/appointments?clinic={clinic}", args.requests),
+        ("admin.api_appointments", f"{PANEL}/api/appointments", args.requests),
+        ("admin.api_appointments[clinic]", f"{PANEL}/api/appointments?clinic={clinic}", args.requests),
+        ("admin.export_data[clinic csv]", f"{PANEL}/export/appointments.csv?clinic={clinic}", args.export_requests),
+        ("admin.export_data[all csv]", f"{PANEL}/export/appointments.csv", args.export_requests),
+    ]
+
+
+def archive_pages(ids, month, day, needle, args):
+    clinic = ids["clinic"]
+    return [
+        ("archive: months", f"{PANEL}/archive", args.requests),
+        ("archive: clinic + day", f"{PANEL}/archive?clinic={clinic}&date={day}", args.requests),
+        ("archive: month", f"{PANEL}/archive?month={month}", args.requests),
+        ("archive: name search", f"{PANEL}/archive?q={needle}", args.export_requests),
+        ("archive: clinic csv", f"{PANEL}/archive/export.csv?clinic={clinic}", args.export_requests),
+        ("archive: month .jsonl.gz", f"{PANEL}/archive/{month}.jsonl.gz", args.requests),
+    ]
+
+
+class BufferedClient(Client):
+    """Reads each response to the end, so streamed exports are timed whole."""
+
+    def open(self, *args, **kwargs):
+        kwargs.setdefault("buffered", True)
+        return super().open(*args, **kwargs)
+
+
+def run_pages(app, pages, admin_id, statements, args):
+    results = {}
+    for name, url, requests in pages:
+        client = BufferedClient(app)
+        login_as(client, app, admin_id)
+        results[name] = measure(client, "GET", url, None, requests, args.warmup, args.memory_requests, statements)
+    return results
+
+
+def database_size(path):
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=10, help="seed_db scale; 1 = 10,000 appointments")
+    parser.add_argument("--after-days", type=int, default=90, help="archive visits older than this at the anchor")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--export-requests", type=int, default=5, help="exports stream every row; time fewer")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--memory-requests", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "mobi-mama-bench"),
+                        help="where seeded databases are cached")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    pristine = seeded_database(args.scale, args.seed, args.data_dir)
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, "bench.sqlite")
+        shutil.copyfile(pristine, path)
+        config = type("ArchiveBenchConfig", (BenchConfig,), {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "ARCHIVE_DIR": os.path.join(workdir, "archive"),
+            "ARCHIVE_BATCH_SIZE": args.batch_size,
+        })
+        app = create_app(config)
+        app.logger.setLevel(logging.CRITICAL)
+        logging.getLogger("mobi_mama.slow_query").setLevel(logging.ERROR)
+        statements = []
+        with app.app_context():
+            ids = sample_ids()
+            rows_before = db.session.scalar(select(func.count(Appointment.id)))
+            table = Appointment.__table__
+            originals = {
+                row[0]: fingerprint(row)
+                for row in db.session.execute(select(*[table.c[key] for key in COLUMNS]).execution_options(yield_per=5000))
+            }
+            db.session.remove()
+            event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(1))
+        size_before = database_size(path)
+        print(f"scale {args.scale:g}: {rows_before} appointments, database {size_before / 2**20:.1f} MiB")
+
+        before = run_pages(app, admin_pages(ids, args), ids["admin"], statements, args)
+
+        with app.app_context():
+            started = time.perf_counter()
+            summary = appointment_archiver.run(now=ANCHOR, after_days=args.after_days)
+            archive_seconds = time.perf_counter() - started
+            rows_after = db.session.scalar(select(func.count(Appointment.id)))
+            months = appointment_archiver.months()
+            archived_bytes = sum(month.bytes for month in months)
+            raw_bytes = sum(month.raw_bytes for month in months)
+
+            # Every archived visit, field for field, exactly once
+            seen, wrong = set(), 0
+            for segment in appointment_archiver.segments():
+                for record in appointment_archiver.read(segment):
+                    wrong += record["id"] in seen or originals.get(record["id"]) != fingerprint(
+                        [record[key] for key in COLUMNS])
+                    seen.add(record["id"])
+            still_hot = set(db.session.scalars(select(Appointment.id)))
+            accounted = not (seen & still_hot) and seen | still_hot == set(originals)
+
+            days = [""] + sorted({row.day for row in db.session.execute(select(counters.counters.c.day).distinct())})
+            live = lambda snapshot: {(metric, dimension, day): value
+                                     for metric, dimensions in snapshot.items()
+                                     for dimension, by_day in dimensions.items()
+                                     for day, value in by_day.items() if value}
+            kept = live(counters.read(days))
+            counters.rebuild()
+            consistent = kept == live(counters.read(days))
+
+            sample = appointment_archiver.segments(clinic_id=ids["clinic"])[len(months) // 2]
+            record = next(r for r in appointment_archiver.read(sample) if r["clinic_id"] == ids["clinic"])
+            day, month, needle = record["scheduled_at"][:10], sample.month, record["mother_name"].split()[0]
+            db.session.remove()
+        size_after = database_size(path)
+        print(f"archived {summary['archived']} appointments in {summary['batches']} batches, {archive_seconds:.1f}s "
+              f"({summary['archived'] / archive_seconds:,.0f}/s): {len(months)} months, {archived_bytes / 2**20:.1f} MiB "
+              f"of gzip for {raw_bytes / 2**20:.1f} MiB of JSONL; {rows_after} appointments left, "
+              f"database {size_after / 2**20:.1f} MiB (free pages are reused, not returned)")
+
+        after = run_pages(app, admin_pages(ids, args), ids["admin"], statements, args)
+        archive = run_pages(app, archive_pages(ids, month, day, needle, args), ids["admin"], statements, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'page':36} {'before p50':>11} {'after p50':>10} {'change':>8} {'before p99':>11} {'after p99':>10} "
+          f"{'sql':>5}")
+    for name, b in before.items():
+        a = after[name]
+        print(f"{name:36} {b['p50_ms']:9.2f}ms {a['p50_ms']:8.2f}ms {a['p50_ms'] / b['p50_ms']:7.2f}x "
+              f"{b['p99_ms']:9.2f}ms {a['p99_ms']:8.2f}ms {a['sql_per_request']:5.1f}")
+    print(f"\n{'archive page':36} {'p50':>11} {'p99':>10} {'peak KiB':>9}")
+    for name, r in archive.items():
+        print(f"{name:36} {r['p50_ms']:9.2f}ms {r['p99_ms']:8.2f}ms {r['peak_kib']:9.1f}")
+
+    checks = [
+        ("every archived visit reads back unchanged, once", wrong == 0),
+        ("archive plus table hold every visit exactly once", accounted and rows_after + len(seen) == rows_before),
+        ("counters match a full recount", consistent),
+        ("every page answered without errors",
+         not any(r["errors"] for results in (before, after, archive) for r in results.values())),
+    ]
+    print()
+    for name, ok in checks:
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "args": vars(args), "archive": summary, "archive_seconds": archive_seconds,
+                "rows_before": rows_before, "rows_after": rows_after, "months": len(months),
+                "archived_bytes": archived_bytes, "raw_bytes": raw_bytes,
+                "database_bytes_before": size_before, "database_bytes_after": size_after,
+                "before": before, "after": after, "archive_pages": archive,
+                "checks": {name: ok for name, ok in checks},
+            }, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
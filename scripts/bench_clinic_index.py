@@ -0,0 +1,183 @@
+"""Nearest-clinic lookups: the grid index against a brute-force scan.
+
+Scatters --clinics clinics over Ghana (most around towns, the rest spread
+thinly, as real facilities are) and times k-nearest and within-radius
+queries from points scattered the same way through services.clinic_index.ClinicGrid and
+through a haversine scan of every clinic. Every grid answer is checked
+against the scan's.
+
+Then loads the same clinics into a throwaway database and times
+GET /clinics/nearby end to end, including the first request that builds
+the grid. Exits non-zero if an answer differs or the grid's p99 for the
+queries the endpoint serves (k nearest, radius capped at --max) is over
+--budget-ms.
+
+    python scripts/bench_clinic_index.py
+    python scripts/bench_clinic_index.py --clinics 100000 --queries 5000 --output /tmp/nearby.json
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from werkzeug.test import Client
+
+from app import create_app
+from models import db, Clinic
+from services import database, clinic_index
+from services.clinic_index import ClinicGrid, ClinicPoint, distance_km
+from bench_endpoints import BenchConfig
+from seed_db import TOWN_CENTRES
+
+# Ghana's bounding box
+SOUTH, NORTH, WEST, EAST = 4.7, 11.2, -3.3, 1.2
+
+
+def scatter(count, rng):
+    points = []
+    centres = list(TOWN_CENTRES.values())
+    for n in range(count):
+        if rng.random() < 0.7:
+            lat, lon = rng.choice(centres)
+            lat, lon = rng.gauss(lat, 0.15), rng.gauss(lon, 0.15)
+        else:
+            lat, lon = rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+        points.append(ClinicPoint(n + 1, f"Clinic {n + 1}", f"{n + 1} Market Road", f"0302{n:06d}",
+                                  round(lat, 5), round(lon, 5)))
+    return points
+
+
+def brute_force(points, lat, lon, k=None, radius_km=None):
+    scored = ((distance_km(lat, lon, p.latitude, p.longitude), p) for p in points)
+    if radius_km is not None:
+        scored = [(d, p) for d, p in scored if d <= radius_km]
+    return heapq.nsmallest(k, scored, key=lambda pair: pair[0]) if k else sorted(scored, key=lambda pair: pair[0])
+
+
+def same(a, b):
+    # Clinics at exactly the cut-off distance may differ; everything nearer must match
+    if [round(d, 9) for d, _ in a] != [round(d, 9) for d, _ in b]:
+        return False
+    edge = a[-1][0] - 1e-9 if a else 0
+    return {p.id for d, p in a if d < edge} == {p.id for d, p in b if d < edge}
+
+
+def timed(fn, queries):
+    times, answers = [], []
+    for query in queries:
+        started = time.perf_counter()
+        answers.append(fn(*query))
+        times.append((time.perf_counter() - started) * 1000)
+    return times, answers
+
+
+def summary(times):
+    ordered = sorted(times)
+    return {"p50_ms": statistics.median(ordered), "p99_ms": ordered[int(len(ordered) * 0.99) - 1],
+            "mean_ms": statistics.fmean(ordered)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clinics", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--brute-queries", type=int, default=200, help="the scan is slow; time fewer")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--radius-km", type=float, default=10)
+    parser.add_argument("--max", type=int, default=50, help="CLINIC_NEARBY_MAX, the endpoint's answer cap")
+    parser.add_argument("--per-cell", type=int, default=8)
+    parser.add_argument("--budget-ms", type=float, default=1.0, help="grid p99 must be under this")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    points = scatter(args.clinics, rng)
+    started = time.perf_counter()
+    grid = ClinicGrid(points, args.per_cell)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(points)} clinics, grid of {len(grid.cells)} cells of {grid.cell:.4f} degrees built in {build_ms:.0f} ms")
+
+    # Mothers live where the clinics are: query from points drawn the same way
+    origins = [(p.latitude, p.longitude) for p in scatter(args.queries, rng)]
+    # The endpoint caps radius answers at CLINIC_NEARBY_MAX, so that is the
+    # within-radius query held to the budget; the uncapped one is for reference
+    kinds = {
+        f"{args.k} nearest": (dict(k=args.k), True),
+        f"within {args.radius_km:g} km, nearest {args.max}": (dict(k=args.max, radius_km=args.radius_km), True),
+        f"within {args.radius_km:g} km, all": (dict(radius_km=args.radius_km), False),
+    }
+    results, mismatches = {}, 0
+    print(f"\n{'query':32} {'results':>8} {'grid p50':>10} {'grid p99':>10} {'scan p50':>10} {'speedup':>8}")
+    for name, (options, budgeted) in kinds.items():
+        grid_times, grid_answers = timed(lambda lat, lon: grid.search(lat, lon, **options), origins)
+        scan_times, scan_answers = timed(lambda lat, lon: brute_force(points, lat, lon, **options),
+                                         origins[:args.brute_queries])
+        wrong = sum(1 for a, b in zip(grid_answers, scan_answers) if not same(a, b))
+        mismatches += wrong
+        results[name] = {"grid": summary(grid_times), "scan": summary(scan_times), "mismatches": wrong,
+                         "mean_results": statistics.fmean(len(a) for a in grid_answers), "budgeted": budgeted}
+        speedup = results[name]["scan"]["p50_ms"] / results[name]["grid"]["p50_ms"]
+        print(f"{name:32} {results[name]['mean_results']:8.1f} {results[name]['grid']['p50_ms']:8.3f}ms {results[name]['grid']['p99_ms']:8.3f}ms "
+              f"{results[name]['scan']['p50_ms']:8.1f}ms {speedup:7.0f}x")
+
+    # End to end: GET /clinics/nearby on a database holding the same clinics
+    workdir = tempfile.mkdtemp()
+    config = type("NearbyBenchConfig", (BenchConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'nearby.sqlite')}",
+        "CLINIC_INDEX_PER_CELL": args.per_cell,
+    })
+    app = create_app(config)
+    try:
+        with app.app_context():
+            database.create_schema()
+            db.session.execute(Clinic.__table__.insert(), [p._asdict() for p in points])
+            db.session.commit()
+        client = Client(app)
+        lat, lon = origins[0]
+        started = time.perf_counter()
+        client.get(f"/clinics/nearby?lat={lat}&lon={lon}&k={args.k}")
+        first_ms = (time.perf_counter() - started) * 1000
+        endpoint_times = []
+        for lat, lon in origins[:args.brute_queries]:
+            started = time.perf_counter()
+            response = client.get(f"/clinics/nearby?lat={lat}&lon={lon}&k={args.k}")
+            endpoint_times.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.data
+        index_stats = clinic_index.stats()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    endpoint = summary(endpoint_times)
+    print(f"\nGET /clinics/nearby: first request {first_ms:.0f} ms (grid build {index_stats['last_build_ms']} ms), "
+          f"then p50 {endpoint['p50_ms']:.2f} ms, p99 {endpoint['p99_ms']:.2f} ms")
+
+    worst_p99 = max(r["grid"]["p99_ms"] for r in results.values() if r["budgeted"])
+    checks = [
+        ("grid answers match the scan", mismatches == 0),
+        (f"grid p99 under {args.budget_ms:g} ms (worst {worst_p99:.3f} ms)", worst_p99 < args.budget_ms),
+    ]
+    print()
+    for name, ok in checks:
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "build_ms": build_ms, "cells": len(grid.cells), "cell_degrees": grid.cell,
+                       "queries": results, "endpoint": dict(endpoint, first_ms=first_ms), "index": index_stats,
+                       "checks": {name: ok for name, ok in checks}}, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Endpoint benchmark suite: latency, throughput, SQL statements and memory per endpoint.
+
+For each --scale, seeds a database with scripts/seed_db.py (cached in
+--data-dir, then copied so runs never see each other's writes), builds the
+app through create_app() with Ask Mobi on the local fake provider and drives
+the hot endpoints with a test client. Results go to --output as JSON; with
+--baseline they are diffed against an earlier run and regressions flagged.
+
+    python scripts/bench_endpoints.py --scales 0.1,1 --requests 200 --output bench.json
+    python scripts/bench_endpoints.py --scales 0.1,1 --baseline bench.json --fail-on-regression
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import event, text, update
+from werkzeug.test import Client
+
+from app import create_app
+from config import Config
+from models import db, SlotOccupancy
+from services import slots
+import seed_db
+
+
+class BenchConfig(Config):
+    WTF_CSRF_ENABLED = False
+    ASK_MOBI_PROVIDERS = ("fake",)  # no network; answers come back immediately
+    ASK_MOBI_FAKE_FIRST_TOKEN_DELAY = 0
+    ASK_MOBI_FAKE_TOKEN_DELAY = 0
+    ASK_MOBI_FAKE_ERROR_RATE = 0
+
+
+QUESTIONS = [f"Is it safe to eat {food} when pregnant?" for food in (
+    "pawpaw", "pineapple", "garden eggs", "kontomire", "okra", "groundnuts", "snails", "tilapia",
+)]
+
+
+def endpoints(ids):
+    """(name, role, method, url or url-maker, form data or maker) for each benchmarked endpoint."""
+    tip_ids = ids["tips"]
+    return [
+        ("main.index[en]", None, "GET", "/?lang=en", None),
+        ("main.index[tw]", None, "GET", "/?lang=tw", None),
+        ("main.tip_detail", None, "GET", lambda i: f"/tip/{tip_ids[i % len(tip_ids)]}", None),
+        ("mother.dashboard", "mother", "GET", "/mother/dashboard", None),
+        ("mother.appointments[POST]", "mother", "POST", "/mother/appointments", lambda i: {
+            "mother_name": "Bench Mother", "phone": "0240000000", "clinic_id": str(ids["clinic"]),
+            "slot_id": str(ids["slots"][i % len(ids["slots"])]), "notes": "benchmark",
+        }),
+        ("mother.ask_mobi[POST]", "mother", "POST", "/mother/ask_mobi", lambda i: {
+            "message": QUESTIONS[i % len(QUESTIONS)],
+        }),
+        ("clinic.dashboard", "clinic", "GET", "/clinic/dashboard", None),
+        ("admin.dashboard", "admin", "GET", "/mobi-panel-888x/", None),
+        ("admin.manage_users", "admin", "GET", "/mobi-panel-888x/users", None),
+        ("admin.manage_clinics", "admin", "GET", "/mobi-panel-888x/clinics", None),
+        ("admin.manage_appointments", "admin", "GET", "/mobi-panel-888x/appointments", None),
+        ("admin.manage_appointments[filtered]", "admin", "GET",
+         lambda i: f"/mobi-panel-888x/appointments?clinic={ids['clinic']}&date=2026-01-05", None),
+    ]
+
+
+# Endpoints whose success is not a 2xx; any other status counts as an error,
+# so a booking form that fails validation and re-renders with 200 is caught
+EXPECTED_STATUS = {"mother.appointments[POST]": 302}
+
+
+# ---------------- Setup ----------------
+
+def seeded_database(scale, seed, data_dir):
+    """Path to a pristine seeded SQLite file for ``scale``, generating it once."""
+    path = os.path.join(data_dir, f"seed-scale{scale:g}-seed{seed}.sqlite")
+    if not os.path.exists(path):
+        config = type("SeedConfig", (BenchConfig,), {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+        seed_db.generate(scale, seed, config_class=config)
+    return path
+
+
+def login_as(client, app, user_id):
+    # A signed Flask-Login session cookie; skips the login forms and password hashing
+    serializer = app.session_interface.get_signing_serializer(app)
+    client.set_cookie(app.config["SESSION_COOKIE_NAME"], serializer.dumps({"_user_id": str(user_id), "_fresh": True}))
+
+
+def sample_ids():
+    first = lambda sql: db.session.execute(text(sql)).scalar()
+    return {
+        "admin": first("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1"),
+        "clinic_user": first("SELECT id FROM users WHERE role = 'clinic' ORDER BY id LIMIT 1"),
+        "mother": first("SELECT user_id FROM appointments WHERE user_id IS NOT NULL "
+                        "GROUP BY user_id ORDER BY COUNT(*) DESC, user_id LIMIT 1"),
+        "clinic": first("SELECT clinic_id FROM appointments GROUP BY clinic_id ORDER BY COUNT(*) DESC LIMIT 1"),
+        "tips": [row[0] for row in db.session.execute(text("SELECT id FROM tips ORDER BY id LIMIT 50"))],
+    }
+
+
+def bookable_slots(clinic_id):
+    """Ids of ``clinic_id``'s next free slots, with room for every benchmarked booking."""
+    slots.extend_horizon(db.session.connection())  # the cached seed may be older than the horizon
+    slot_ids = [row.id for row in slots.next_free(clinic_id)]
+    db.session.execute(update(SlotOccupancy).where(SlotOccupancy.id.in_(slot_ids)).values(capacity=1_000_000))
+    db.session.commit()
+    return slot_ids
+
+
+# ---------------- Measuring ----------------
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def measure(client, method, url, data, requests, warmup, memory_requests, statements, expect=None):
+    def call(i):
+        target = url(i) if callable(url) else url
+        form = data(i) if callable(data) else data
+        return client.open(target, method=method, data=form)
+
+    for i in range(warmup):
+        call(i)
+
+    latencies, errors = [], 0
+    statements.clear()
+    started = time.perf_counter()
+    for i in range(warmup, warmup + requests):
+        t0 = time.perf_counter()
+        response = call(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        response.close()
+        if response.status_code != expect if expect else response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    sql = len(statements) / requests
+
+    # Memory is traced in a separate, shorter pass so tracing doesn't skew latency
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for i in range(memory_requests):
+        call(warmup + requests + i).close()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "sql_per_request": round(sql, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_scale(scale, args):
+    pristine = seeded_database(scale, args.seed, args.data_dir)
+    workdir = tempfile.mkdtemp()
+    working = os.path.join(workdir, "bench.sqlite")
+    shutil.copyfile(pristine, working)
+
+    config = type("RunConfig", (BenchConfig,), {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{working}"})
+    app = create_app(config)
+    app.logger.setLevel(logging.CRITICAL)  # failing endpoints are counted in the "err" column instead
+    statements = []
+    with app.app_context():
+        ids = sample_ids()
+        ids["slots"] = bookable_slots(ids["clinic"])
+        event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(1))
+
+    results = {}
+    user_ids = {"admin": ids["admin"], "clinic": ids["clinic_user"], "mother": ids["mother"]}
+    for name, role, method, url, data in endpoints(ids):
+        if args.only and not any(part in name for part in args.only):
+            continue
+        client = Client(app)
+        if role:
+            login_as(client, app, user_ids[role])
+        results[name] = measure(client, method, url, data, args.requests, args.warmup,
+                                args.memory_requests, statements, EXPECTED_STATUS.get(name))
+        print_row(scale, name, results[name])
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+# ---------------- Reporting ----------------
+
+HEADER = f"{'scale':>6s} {'endpoint':38s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'req/s':>8s} {'sql':>6s} {'peak KiB':>9s} {'err':>4s}"
+
+
+def print_row(scale, name, r):
+    print(f"{scale:>6g} {name:38s} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+          f"{r['throughput_rps']:8.1f} {r['sql_per_request']:6.2f} {r['peak_kib']:9.1f} {r['errors']:4d}")
+
+
+def diff(current, baseline, latency_tolerance, memory_tolerance):
+    """Regressions of ``current`` against ``baseline`` as printable strings."""
+    problems = []
+    for scale, endpoints_ in current["results"].items():
+        for name, now in endpoints_.items():
+            before = baseline.get("results", {}).get(scale, {}).get(name)
+            if not before:
+                continue
+            label = f"scale {scale} {name}"
+            # An absolute floor keeps sub-millisecond jitter from counting as a regression
+            if now["p95_ms"] > before["p95_ms"] * (1 + latency_tolerance) and now["p95_ms"] - before["p95_ms"] > 1:
+                problems.append(f"{label}: p95 {before['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms")
+            if now["sql_per_request"] > before["sql_per_request"] + 0.5:
+                problems.append(f"{label}: SQL/request {before['sql_per_request']} -> {now['sql_per_request']}")
+            if now["peak_kib"] > before["peak_kib"] * (1 + memory_tolerance) and now["peak_kib"] - before["peak_kib"] > 64:
+                problems.append(f"{label}: peak memory {before['peak_kib']} -> {now['peak_kib']} KiB")
+            if now["errors"] > before["errors"]:
+                problems.append(f"{label}: errors {before['errors']} -> {now['errors']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="0.1,1", help="comma-separated seed_db scales")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--memory-requests", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="run endpoints whose name contains any of these")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "mobi-mama-bench"),
+                        help="where seeded databases are cached between runs")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="earlier results JSON to diff against")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.5)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    current = {
+        "meta": {
+            "created": datetime.utcnow().isoformat(timespec="seconds"),
+            "seed": args.seed,
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+        },
+        "results": {},
+    }
+    print(HEADER)
+    for scale in (float(s) for s in args.scales.split(",")):
+        current["results"][f"{scale:g}"] = run_scale(scale, args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"\nwrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = diff(current, json.load(f), args.latency_tolerance, args.memory_tolerance)
+        print(f"\n{len(problems)} regression(s) against {args.baseline}")
+        for problem in problems:
+            print(f"  {problem}")
+        if problems and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Deleting a big clinic: ORM cascade against the batched purge job.
+
+Builds a WAL SQLite database (production settings) with one district
+clinic holding --appointments appointments (a share with queued SMS
+reminders) beside a few small clinics, then deletes the big clinic twice,
+each time on a fresh copy and in a child process so peak memory is its own:
+
+  orm    the old request path: session.delete(clinic) with the
+         Clinic.appointments cascade, then commit;
+  purge  services.purge: set-based batches on the background runner.
+
+While each delete runs, --bookers mothers keep booking at a small clinic
+through POST /mother/appointments. Reports the delete's wall time, the
+worker's peak memory, and booking latency and failures during the delete;
+afterwards checks that the clinic, its appointments, reminders and slots
+are gone and that the dashboard counters still match a full recount.
+
+    python scripts/bench_purge.py
+    python scripts/bench_purge.py --appointments 300000 --batch-size 1000 --output /tmp/purge.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import func, select
+from werkzeug.test import Client
+
+from app import create_app
+from config import ProductionConfig
+from models import db, User, Clinic, Appointment, Reminder, SlotOccupancy, ClinicSlot
+from services import counters, database, slots, purge_runner
+from bench_endpoints import BenchConfig, login_as
+
+BIG_CLINIC = 1
+SMALL_CLINIC = 2
+
+
+def make_app(path, args):
+    config = type("PurgeBenchConfig", (BenchConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "SQLITE_PRAGMAS": ProductionConfig.SQLITE_PRAGMAS,
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": args.bookers + 2, "max_overflow": args.bookers},
+        "PURGE_BATCH_SIZE": args.batch_size,
+        "PURGE_PAUSE": args.pause,
+    })
+    app = create_app(config)
+    logging.getLogger("mobi_mama.slow_query").setLevel(logging.ERROR)
+    return app
+
+
+def build(path, args):
+    app = make_app(path, args)
+    rng = random.Random(args.seed)
+    with app.app_context():
+        database.create_schema()
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        db.session.add_all(User(username=f"booker-{i}", password="x", role="mother") for i in range(args.bookers))
+        db.session.add_all(Clinic(name=name, address=f"{i} Hospital Road", phone=f"03020000{i:02d}")
+                           for i, name in enumerate(["District Hospital"] + [f"Health Centre {n}" for n in range(4)]))
+        db.session.commit()
+        # Room at the small clinic for every booking the run can make
+        db.session.execute(SlotOccupancy.__table__.update()
+                           .where(SlotOccupancy.clinic_id == SMALL_CLINIC).values(capacity=1_000_000))
+        db.session.commit()
+        appointment_rows = []
+        for i in range(args.appointments):
+            when = now + timedelta(minutes=rng.randrange(-180 * 24 * 60, 60 * 24 * 60))
+            appointment_rows.append({
+                "mother_name": f"Mother {i}", "phone": f"024{i:07d}", "clinic_id": BIG_CLINIC,
+                "date": when.strftime("%Y-%m-%d %H:%M"), "scheduled_at": when, "notes": "Antenatal visit",
+                "created_at": now, "updated_at": now,
+            })
+        for start in range(0, len(appointment_rows), 10_000):
+            db.session.execute(Appointment.__table__.insert(), appointment_rows[start:start + 10_000])
+        ids = db.session.scalars(select(Appointment.id).where(Appointment.clinic_id == BIG_CLINIC)).all()
+        reminder_rows = [{
+            "idempotency_key": f"appt-{appointment_id}", "appointment_id": appointment_id, "clinic_id": BIG_CLINIC,
+            "scheduled_for": now, "phone": "0240000000", "body": "Reminder", "status": "sent", "attempts": 1,
+            "next_attempt_at": now, "created_at": now, "updated_at": now,
+        } for appointment_id in ids if rng.random() < args.reminder_share]
+        for start in range(0, len(reminder_rows), 10_000):
+            db.session.execute(Reminder.__table__.insert(), reminder_rows[start:start + 10_000])
+        db.session.commit()
+        counters.rebuild()
+        db.session.remove()
+        # Closing the last connection checkpoints the WAL into the file the runs copy
+        db.engine.dispose()
+        return len(ids), len(reminder_rows)
+
+
+def child(args):
+    """One delete with bookings alongside; prints a JSON result."""
+    app = make_app(args.db, args)
+    with app.app_context():
+        mothers = db.session.scalars(select(User.id).where(User.role == "mother")).all()
+        free = [row.id for row in slots.next_free(SMALL_CLINIC, limit=5)]
+        appointments_before = db.session.scalar(select(func.count(Appointment.id)))
+
+    clients = []
+    for mother_id in mothers:
+        client = Client(app)
+        login_as(client, app, mother_id)
+        clients.append(client)
+    latencies, failures, done = [], [], threading.Event()
+    lock = threading.Lock()
+
+    def book(client, rng):
+        while not done.is_set():
+            started = time.perf_counter()
+            response = client.post("/mother/appointments", data={
+                "mother_name": "Booker", "phone": "0240000000", "clinic_id": str(SMALL_CLINIC),
+                "slot_id": str(rng.choice(free)), "notes": "",
+            })
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                (latencies if response.status_code == 302 else failures).append(elapsed)
+            time.sleep(args.think)
+
+    bookers = [threading.Thread(target=book, args=(client, random.Random(i))) for i, client in enumerate(clients)]
+    for thread in bookers:
+        thread.start()
+    time.sleep(0.5)  # bookings settle before the delete starts
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    with app.app_context():
+        if args.run == "orm":
+            db.session.delete(db.session.get(Clinic, BIG_CLINIC))
+            db.session.commit()
+        else:
+            job = purge_runner.request("clinic", db.session.get(Clinic, BIG_CLINIC))
+            while True:
+                db.session.expire_all()
+                if db.session.get(type(job), job.id).status not in ("pending", "running"):
+                    break
+                time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    done.set()
+    for thread in bookers:
+        thread.join()
+
+    with app.app_context():
+        left = {
+            "clinic": db.session.get(Clinic, BIG_CLINIC) is not None,
+            "appointments": db.session.scalar(select(func.count()).where(Appointment.clinic_id == BIG_CLINIC)),
+            "reminders": db.session.scalar(select(func.count()).where(Reminder.clinic_id == BIG_CLINIC)),
+            "slots": db.session.scalar(select(func.count()).where(SlotOccupancy.clinic_id == BIG_CLINIC))
+            + db.session.scalar(select(func.count()).where(ClinicSlot.clinic_id == BIG_CLINIC)),
+        }
+        booked = db.session.scalar(select(func.count()).where(Appointment.clinic_id == SMALL_CLINIC))
+        snapshot = counters.read()
+        counters.rebuild()
+        db.session.commit()
+        consistent = {metric: values for metric, values in snapshot.items() if metric != "appointments_by_clinic"} == {
+            metric: values for metric, values in counters.read().items() if metric != "appointments_by_clinic"}
+        consistent = consistent and counters.total(snapshot, "appointments") == db.session.scalar(
+            select(func.count(Appointment.id)))
+    ordered = sorted(latencies) or [0]
+    print(json.dumps({
+        "mode": args.run, "seconds": elapsed, "peak_rss_mb": rss_after / 1024, "rss_growth_mb": (rss_after - rss_before) / 1024,
+        "appointments_before": appointments_before, "left": left, "counters_consistent": consistent,
+        "bookings": len(latencies), "booking_failures": len(failures), "booked_rows": booked,
+        "booking_p50_ms": statistics.median(ordered), "booking_p99_ms": ordered[max(0, int(len(ordered) * 0.99) - 1)],
+        "booking_max_ms": ordered[-1],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--appointments", type=int, default=100_000)
+    parser.add_argument("--reminder-share", type=float, default=0.3)
+    parser.add_argument("--bookers", type=int, default=4)
+    parser.add_argument("--think", type=float, default=0.01, help="seconds each booker waits between bookings")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.02)
+    parser.add_argument("--modes", default="orm,purge")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return child(args)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        base = os.path.join(workdir, "base.sqlite")
+        started = time.perf_counter()
+        appointments, reminders = build(base, args)
+        print(f"built {appointments} appointments and {reminders} reminders at one clinic "
+              f"in {time.perf_counter() - started:.1f}s")
+        results = {}
+        for mode in args.modes.split(","):
+            path = os.path.join(workdir, f"{mode}.sqlite")
+            shutil.copy(base, path)
+            command = [sys.executable, os.path.abspath(__file__), "--run", mode, "--db", path] + [
+                f"--{name.replace('_', '-')}={getattr(args, name)}"
+                for name in ("bookers", "think", "batch_size", "pause", "seed")
+            ]
+            output = subprocess.run(command, capture_output=True, text=True)
+            if output.returncode:
+                print(output.stderr[-2000:])
+                raise SystemExit(f"{mode} run failed")
+            results[mode] = json.loads(output.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'':6} {'delete':>9} {'peak RSS':>9} {'growth':>8} {'bookings':>9} {'failed':>7} "
+          f"{'book p50':>9} {'book p99':>9} {'book max':>9}")
+    for mode, r in results.items():
+        print(f"{mode:6} {r['seconds']:8.1f}s {r['peak_rss_mb']:7.0f}MB {r['rss_growth_mb']:6.0f}MB {r['bookings']:9d} "
+              f"{r['booking_failures']:7d} {r['booking_p50_ms']:7.1f}ms {r['booking_p99_ms']:7.1f}ms {r['booking_max_ms']:7.0f}ms")
+
+    checks = []
+    if "purge" in results:
+        r = results["purge"]
+        checks = [
+            ("purge removed the clinic, appointments, reminders and slots", not any(r["left"].values())),
+            ("counters match a full recount", r["counters_consistent"]),
+            ("no booking failed during the purge", r["booking_failures"] == 0),
+        ]
+        print()
+        for name, ok in checks:
+            print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results, "checks": {name: ok for name, ok in checks}}, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
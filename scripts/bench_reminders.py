@@ -0,0 +1,192 @@
+"""Reminder throughput: can the nightly run send 100k reminders in its window?
+
+Builds a throwaway database with --reminders appointments in the next day
+across --clinics clinics, starts scripts/sms_gateway.py with the given
+latency, rate limit and failure rates, and runs the real scheduler against
+it: one plan, then dispatch passes until nothing is due. Retries are made
+due straight away so the run finishes in one sitting.
+
+Reports plan and dispatch time, messages per second and the projected time
+for 100k reminders. It then checks the idempotency guarantees: the gateway
+saw every message exactly once (resends after lost replies come back as
+duplicates), and a second run plans and sends nothing. Exits non-zero if a
+check fails or the projection misses --window-hours.
+
+    python scripts/bench_reminders.py
+    python scripts/bench_reminders.py --reminders 20000 --rate 1000 --error-rate 0.05 --lost-reply-rate 0.02
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import create_app
+from models import db, Appointment, Clinic, Reminder
+from services import database, reminder_scheduler
+from bench_endpoints import BenchConfig
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TARGET = 100_000
+
+
+def start_gateway(args):
+    command = [
+        sys.executable, os.path.join(HERE, "sms_gateway.py"), "--port", str(args.port),
+        "--latency", str(args.latency), "--rate", str(args.gateway_rate or args.rate),
+        "--error-rate", str(args.error_rate), "--lost-reply-rate", str(args.lost_reply_rate),
+        "--reject-rate", str(args.reject_rate),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            gateway_stats(args.port)
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise SystemExit("SMS gateway stand-in did not start")
+
+
+def gateway_stats(port):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("GET", "/stats")
+    return json.loads(connection.getresponse().read())
+
+
+def populate(count, clinics, now, seed):
+    rng = random.Random(seed)
+    db.session.execute(Clinic.__table__.insert(), [
+        {"name": f"Clinic {i}", "address": f"{i} Market Road", "phone": f"0302{i:06d}",
+         "created_at": now, "updated_at": now}
+        for i in range(clinics)
+    ])
+    clinic_ids = [row[0] for row in db.session.query(Clinic.id).all()]
+    chunk = 10_000
+    for start in range(0, count, chunk):
+        rows = []
+        for i in range(start, min(start + chunk, count)):
+            when = (now + timedelta(minutes=rng.randrange(60, 23 * 60))).replace(second=0, microsecond=0)
+            rows.append({
+                "mother_name": f"Mother {i}", "phone": f"024{i:07d}", "clinic_id": rng.choice(clinic_ids),
+                "date": when.strftime("%Y-%m-%d %H:%M"), "scheduled_at": when, "notes": None,
+                "created_at": now, "updated_at": now,
+            })
+        db.session.execute(Appointment.__table__.insert(), rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reminders", type=int, default=TARGET)
+    parser.add_argument("--clinics", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=2000, help="REMINDER_RATE, messages per second")
+    parser.add_argument("--gateway-rate", type=float, help="stand-in's own limit (default: --rate)")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=40, help="stand-in milliseconds per batch")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--lost-reply-rate", type=float, default=0.01)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    parser.add_argument("--window-hours", type=float, default=6, help="nightly window to fit 100k into")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    workdir = tempfile.mkdtemp()
+    config = type("ReminderBenchConfig", (BenchConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'reminders.sqlite')}",
+        "REMINDER_GATEWAY": "http",
+        "REMINDER_GATEWAY_URL": f"http://127.0.0.1:{args.port}/messages",
+        "REMINDER_RATE": args.rate,
+        "REMINDER_BATCH_SIZE": args.batch_size,
+        "REMINDER_WORKERS": args.workers,
+        "REMINDER_BACKOFF": 0.05,
+        "REMINDER_RETRY_DELAY": 0,  # retry in the next pass rather than minutes later
+    })
+    app = create_app(config)
+    logging.getLogger("mobi_mama.reminders").setLevel(logging.WARNING)
+    gateway = start_gateway(args)
+    try:
+        with app.app_context():
+            database.create_schema()
+            now = datetime.utcnow()
+            started = time.perf_counter()
+            populate(args.reminders, args.clinics, now, args.seed)
+            print(f"populated {args.reminders} appointments in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            planned = reminder_scheduler.plan(now)
+            plan_s = time.perf_counter() - started
+
+            totals = {"sent": 0, "duplicate": 0, "retry": 0, "failed": 0, "cancelled": 0}
+            passes = 0
+            started = time.perf_counter()
+            while True:
+                passes += 1
+                summary = reminder_scheduler.dispatch(datetime.utcnow())
+                for key in totals:
+                    totals[key] += summary[key]
+                if not summary["retry"] or passes >= 10:
+                    break
+            dispatch_s = time.perf_counter() - started
+
+            delivered = totals["sent"] + totals["duplicate"]
+            by_status = dict(db.session.query(Reminder.status, db.func.count()).group_by(Reminder.status).all())
+            stats = gateway_stats(args.port)
+            again = reminder_scheduler.run_once()
+            waited = reminder_scheduler.bucket.waited
+    finally:
+        gateway.terminate()
+        gateway.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    throughput = delivered / dispatch_s if dispatch_s else 0
+    projected_s = plan_s * TARGET / max(planned, 1) + TARGET / throughput if throughput else float("inf")
+    print(f"\nplan      {planned:7d} reminders queued in {plan_s:6.2f}s ({planned / plan_s:,.0f}/s)")
+    print(f"dispatch  {delivered:7d} delivered in {dispatch_s:6.2f}s over {passes} pass(es) "
+          f"({throughput:,.0f} msg/s, rate limit {args.rate:,.0f}/s, {waited:.1f}s held by the limiter)")
+    print(f"outcomes  {totals}")
+    print(f"statuses  {by_status}")
+    print(f"gateway   {stats}")
+
+    checks = [
+        ("every appointment queued once", planned == args.reminders),
+        ("each message reached the gateway once", stats["unique_messages"] == stats["accepted"] == by_status.get("sent", 0)),
+        ("resends were caught as duplicates", stats["duplicates"] == totals["duplicate"]),
+        ("nothing left pending", not by_status.get("pending") and not by_status.get("sending")),
+        ("second run plans and sends nothing", again["planned"] == 0 and again["sent"] == 0 and again["duplicate"] == 0),
+        (f"100k fits the {args.window_hours:g}h window (projected {projected_s / 60:.1f} min)",
+         projected_s <= args.window_hours * 3600),
+    ]
+    print()
+    for name, ok in checks:
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "args": vars(args), "planned": planned, "plan_seconds": plan_s, "dispatch_seconds": dispatch_s,
+                "throughput_per_second": throughput, "projected_seconds_100k": projected_s,
+                "totals": totals, "statuses": by_status, "gateway": stats,
+                "checks": {name: ok for name, ok in checks},
+            }, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
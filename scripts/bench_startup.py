@@ -0,0 +1,99 @@
+"""Worker startup cost: import time, create_app() time and resident memory.
+
+Each run is a fresh interpreter, as a new or restarted worker would be. It
+reports how long ``import app`` and ``create_app()`` take, the RSS once the
+app is built, and whether the AI SDKs were loaded. With --warmup each run
+also times ``ask_mobi_providers.warmup()``, which is what the first Ask Mobi
+question (or a post-fork warmup hook) pays instead.
+
+    python scripts/bench_startup.py --runs 5
+    python scripts/bench_startup.py --runs 5 --warmup --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SDK_MODULES = ("google.generativeai", "openai", "httpx", "grpc")
+
+
+def rss_mib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def child(warmup):
+    sys.path.insert(0, ROOT)
+    started = time.perf_counter()
+    from app import create_app
+
+    imported = time.perf_counter()
+    app = create_app()
+    built = time.perf_counter()
+    result = {
+        "import_ms": (imported - started) * 1000,
+        "create_app_ms": (built - imported) * 1000,
+        "rss_mib": rss_mib(),
+        "sdks_loaded": [name for name in SDK_MODULES if name in sys.modules],
+    }
+    if warmup:
+        from services import ask_mobi_providers
+
+        with app.app_context():
+            ask_mobi_providers.warmup()
+        result["warmup_ms"] = (time.perf_counter() - built) * 1000
+        result["rss_after_warmup_mib"] = rss_mib()
+    print(json.dumps(result))
+
+
+def run(warmup):
+    env = dict(os.environ)
+    # A throwaway database: create_app() must not need one to exist
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.sqlite"))
+    env.setdefault("ASK_MOBI_PROVIDERS", "gemini,openai")
+    env.setdefault("OPENAI_API_KEY", "startup-benchmark")  # lets the client build without a real key
+    command = [sys.executable, os.path.abspath(__file__), "--child"] + (["--warmup"] if warmup else [])
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="also time building the Ask Mobi clients")
+    parser.add_argument("--output", help="write the per-run results as JSON here")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.warmup)
+
+    runs = [run(args.warmup) for _ in range(args.runs)]
+    fields = ["import_ms", "create_app_ms", "rss_mib"] + (["warmup_ms", "rss_after_warmup_mib"] if args.warmup else [])
+    print(f"{'metric':22s} {'median':>9s} {'min':>9s} {'max':>9s}")
+    for field in fields:
+        values = [r[field] for r in runs]
+        print(f"{field:22s} {statistics.median(values):9.1f} {min(values):9.1f} {max(values):9.1f}")
+    print(f"SDKs imported by create_app(): {', '.join(runs[0]['sdks_loaded']) or 'none'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"runs": runs}, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Tip search latency over a synthetic corpus: FTS5 versus a LIKE scan.
+
+Builds the app against a throwaway SQLite file, bulk-inserts a deterministic
+corpus of English and Twi tips (the FTS triggers index them as they go) and
+times a fixed set of queries through services.tip_search.
+
+    python scripts/bench_tip_search.py --tips 100000 --rounds 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+WORDS = {
+    "en": ("malaria net mosquito iron folic acid water rest clinic visit baby breastfeeding "
+           "fever bleeding swelling headache vaccine nutrition anaemia exercise sleep labour "
+           "contractions danger signs hospital midwife vegetables fruit protein beans fish").split(),
+    "tw": ("nsuo aduane yare apɔmuden abofra ɔyafunu mogya atiridii nna ahoɔden kɔ ayaresabea "
+           "nkwan nam nhabannuru aduaba ɛnnɛ daa maame nufusuo ɔkwan nkyerɛkyerɛ").split(),
+}
+QUERIES = [
+    ("malaria", "en"), ("mosquito net", "en"), ("breastf", "en"), ("danger signs", "en"),
+    ("nsuo", "tw"), ("apɔmu", "tw"), ("vaccine", None), ("zzzz", "en"),
+]
+
+
+def corpus(count, seed):
+    """Tips that each cover a couple of topics, padded with Zipf-distributed filler."""
+    rng = random.Random(seed)
+    filler = [f"w{n}" for n in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(filler))]
+    for i in range(count):
+        language = "tw" if i % 3 == 0 else "en"
+        topics = rng.sample(WORDS[language], 2)
+        body = rng.choices(filler, weights, k=60)
+        for topic in topics:
+            for _ in range(rng.randint(1, 3)):
+                body.insert(rng.randrange(len(body)), topic)
+        yield {
+            "title": " ".join(topics + rng.choices(filler, weights, k=3)).capitalize(),
+            "content": " ".join(body) + ".",
+            "language": language,
+        }
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def run(args):
+    from sqlalchemy import insert
+
+    from app import create_app
+    from models import db, Tip
+    from services import database, tip_search
+
+    app = create_app()
+    with app.app_context():
+        database.create_schema()
+        started = time.perf_counter()
+        rows = list(corpus(args.tips, args.seed))
+        for offset in range(0, len(rows), 5000):
+            db.session.execute(insert(Tip), rows[offset:offset + 5000])
+        db.session.commit()
+        print(f"inserted and indexed {args.tips} tips in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'query':22s} {'lang':4s} {'hits':>4s} {'fts p50':>9s} {'fts p95':>9s} {'like p50':>9s}")
+        for terms, language in QUERIES:
+            hits = tip_search.search(terms, language, limit=20)
+            fts = timed(lambda: tip_search.search(terms, language, limit=20), args.rounds)
+            like = timed(lambda: tip_search._like_search(terms, language, 20), max(1, args.rounds // 5))
+            print(f"{terms:22s} {language or 'all':4s} {len(hits):4d} "
+                  f"{statistics.median(fts):7.2f}ms {percentile(fts, 0.95):7.2f}ms {statistics.median(like):7.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tips", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+    run(args)
@@ -0,0 +1,61 @@
+"""Database queries per authenticated request, with and without the user cache.
+
+Builds the app against a throwaway SQLite file, logs an admin in and hits a
+page whose only database work is loading the logged-in user.
+
+    python scripts/bench_user_loader.py --requests 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def run(requests, cache_enabled):
+    from sqlalchemy import event
+    from werkzeug.test import Client
+
+    from app import create_app
+    from config import Config
+    from models import db, User
+    from services import database
+
+    Config.USER_CACHE_ENABLED = cache_enabled
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        database.create_schema()
+        if not User.query.filter_by(username="bench-admin").first():
+            db.session.add(User(username="bench-admin", password="bench", role="admin"))
+            db.session.commit()
+        engine = db.engine
+
+    client = Client(app)
+    client.post("/mobi-panel-888x/login", data={"username": "bench-admin", "password": "bench"})
+
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get("/mobi-panel-888x/cache-stats")
+        assert response.status_code == 200, response.status_code
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "before_cursor_execute", listener)
+
+    return len(statements) / requests, elapsed / requests * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.sqlite"))
+    for label, enabled in (("before (no cache)", False), ("after (user cache)", True)):
+        queries, ms = run(args.requests, enabled)
+        print(f"{label:20s} {queries:.2f} queries/request  {ms:.2f} ms/request")
@@ -0,0 +1,141 @@
+"""Ask Mobi streaming check against the local fake provider.
+
+Builds a throwaway database with one mother, then posts questions to
+POST /mother/ask_mobi/stream with ASK_MOBI_PROVIDERS=fake and checks the
+event stream: ``token`` events followed by ``done``, a cached replay of the
+same question, time to first token recorded for streams only, the question
+refused in a query string, and an ``error`` event when the provider fails.
+No network access or API keys needed.
+
+    python scripts/check_ask_mobi_stream.py
+    python scripts/check_ask_mobi_stream.py --token-delay 0.01 --output /tmp/stream.json
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from werkzeug.test import Client
+
+from app import create_app
+from models import db, User
+from routes.mother_routes import UNAVAILABLE_MESSAGE
+from services import database
+from services.metrics import ask_mobi_ttft
+from bench_endpoints import BenchConfig, login_as
+
+STREAM = "/mother/ask_mobi/stream"
+
+
+def events(response):
+    """``(event, payload)`` pairs of an event-stream body."""
+    parsed = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in fields:
+            parsed.append((fields["event"], json.loads(fields.get("data", "null"))))
+    return parsed
+
+
+def make_client(path, args, **overrides):
+    config = type("StreamCheckConfig", (BenchConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "ASK_MOBI_PROVIDERS": ("fake",),
+        "ASK_MOBI_FAKE_TOKEN_DELAY": args.token_delay,
+        **overrides,
+    })
+    app = create_app(config)
+    app.logger.setLevel(logging.CRITICAL)
+    logging.getLogger("mobi_mama.ask_mobi").setLevel(logging.ERROR)  # the failing-provider run warns on purpose
+    with app.app_context():
+        database.create_schema()
+        mother = db.session.scalar(db.select(User.id).where(User.username == "stream-mother"))
+        if mother is None:
+            user = User(username="stream-mother", password="x", role="mother")
+            db.session.add(user)
+            db.session.commit()
+            mother = user.id
+    client = Client(app)
+    login_as(client, app, mother)
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--token-delay", type=float, default=0.0, help="fake provider seconds between tokens")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, "stream.sqlite")
+        client = make_client(path, args)
+        question = "Is it safe to eat pawpaw when pregnant?"
+
+        ttft_before = ask_mobi_ttft.snapshot()["count"]
+        fresh = client.post(STREAM, data={"message": question}, buffered=True)
+        fresh_events = events(fresh)
+        ttft_fresh = ask_mobi_ttft.snapshot()["count"] - ttft_before
+        tokens = [payload["text"] for name, payload in fresh_events if name == "token"]
+        answer = "".join(tokens)
+
+        replay = client.post(STREAM, data={"message": question}, buffered=True)
+        replay_events = events(replay)
+
+        ttft_before = ask_mobi_ttft.snapshot()["count"]
+        fallback = client.post("/mother/ask_mobi", data={"message": "How much water should I drink?"})
+        ttft_fallback = ask_mobi_ttft.snapshot()["count"] - ttft_before
+
+        in_url = client.get(STREAM, query_string={"message": question})
+        empty = client.post(STREAM, data={"message": "  "})
+
+        failing = make_client(path, args, ASK_MOBI_FAKE_ERROR_RATE=1.0)
+        failed_events = events(failing.post(STREAM, data={"message": "A question nobody has asked"}, buffered=True))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"fresh:    {fresh.status_code} {fresh.headers.get('Content-Type')}, {len(tokens)} token event(s), "
+          f"then {fresh_events[-1] if fresh_events else None}")
+    print(f"replay:   {replay.status_code}, {replay_events}"[:160])
+    print(f"fallback: {fallback.status_code}; question in the URL: {in_url.status_code}; empty: {empty.status_code}")
+    print(f"failing:  {failed_events}")
+
+    checks = [
+        ("stream answers 200 as text/event-stream",
+         fresh.status_code == 200 and fresh.mimetype == "text/event-stream"),
+        ("a fresh answer streams several token events, then done",
+         len(tokens) > 1 and answer.strip() != "" and fresh_events[-1] == ("done", {})
+         and all(name == "token" for name, _ in fresh_events[:-1])),
+        ("asking again replays the cached answer in one token",
+         replay_events == [("token", {"text": answer}), ("done", {"cached": True})]),
+        ("time to first token is recorded for the fresh stream only", ttft_fresh == 1),
+        ("the non-streaming fallback records no time to first token",
+         fallback.status_code == 200 and ttft_fallback == 0),
+        ("a question in the query string is refused", in_url.status_code == 405),
+        ("an empty question is refused", empty.status_code == 400),
+        ("a failing provider ends the stream with an error event",
+         failed_events == [("error", {"text": UNAVAILABLE_MESSAGE})]),
+    ]
+    print()
+    for name, ok in checks:
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "args": vars(args), "tokens": len(tokens), "answer": answer,
+                "checks": {name: ok for name, ok in checks},
+            }, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
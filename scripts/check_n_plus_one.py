@@ -0,0 +1,133 @@
+"""N+1 query check for the listing pages.
+
+Builds two throwaway databases, one with --small rows per listing and one
+with --large, and requests every listing endpoint against each. A page
+whose SQL statement count is higher on the larger database is issuing
+queries per row; those endpoints are reported with the statements that
+repeated, and the script exits non-zero.
+
+    python scripts/check_n_plus_one.py
+    python scripts/check_n_plus_one.py --small 3 --large 40 --verbose
+"""
+import argparse
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import event
+from werkzeug.test import Client
+
+from app import create_app
+from models import db, User, Clinic, Appointment, Tip
+from services import database
+from bench_endpoints import BenchConfig, login_as
+
+# (name, role, url) for each page that renders a list of rows
+LISTINGS = [
+    ("main.index", None, "/?lang=en"),
+    ("mother.dashboard", "mother", "/mother/dashboard"),
+    ("mother.appointments", "mother", "/mother/appointments"),
+    ("clinic.dashboard", "clinic", "/clinic/dashboard"),
+    ("admin.manage_users", "admin", "/mobi-panel-888x/users"),
+    ("admin.manage_clinics", "admin", "/mobi-panel-888x/clinics"),
+    ("admin.manage_appointments", "admin", "/mobi-panel-888x/appointments"),
+    ("admin.api_users", "admin", "/mobi-panel-888x/api/users"),
+    ("admin.api_clinics", "admin", "/mobi-panel-888x/api/clinics"),
+    ("admin.api_appointments", "admin", "/mobi-panel-888x/api/appointments"),
+]
+
+
+def populate(rows):
+    """``rows`` of everything a listing shows, each appointment at its own clinic.
+
+    Distinct clinics matter: appointments sharing one clinic would hit the
+    identity map after the first lazy load and hide the per-row query.
+    """
+    users = {role: User(username=f"check-{role}", password="x", role=role) for role in ("admin", "clinic", "mother")}
+    db.session.add_all(users.values())
+    db.session.add_all(User(username=f"check-mother-{i}", password="x", role="mother") for i in range(rows))
+    clinics = [Clinic(name=f"Clinic {i}", address=f"{i} High Street", phone=f"0300{i:06d}") for i in range(rows)]
+    db.session.add_all(clinics)
+    db.session.flush()
+    db.session.add_all(
+        Appointment(mother_name="Check Mother", phone="0240000000", clinic_id=clinic.id,
+                    user_id=users["mother"].id, date=f"2026-03-{i % 28 + 1:02d} 09:00", notes=f"visit {i}")
+        for i, clinic in enumerate(clinics)
+    )
+    db.session.add_all(Tip(title=f"Tip {i}", content=f"Advice number {i}.", language="en") for i in range(rows))
+    db.session.commit()
+    return {role: user.id for role, user in users.items()}
+
+
+def shape(statement):
+    """``statement`` with literals and whitespace collapsed, so repeats group together."""
+    statement = re.sub(r"'[^']*'|\b\d+\b", "?", statement)
+    return " ".join(statement.split())
+
+
+def profile(rows, workdir):
+    """Statements issued by each listing against a database of ``rows`` rows."""
+    path = os.path.join(workdir, f"check-{rows}.sqlite")
+    config = type("CheckConfig", (BenchConfig,), {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    app = create_app(config)
+    app.logger.setLevel(logging.CRITICAL)
+    statements = []
+    with app.app_context():
+        database.create_schema()
+        user_ids = populate(rows)
+        event.listen(db.engine, "before_cursor_execute", lambda conn, cursor, statement, *a: statements.append(statement))
+
+    results = {}
+    for name, role, url in LISTINGS:
+        client = Client(app)
+        if role:
+            login_as(client, app, user_ids[role])
+        client.get(url).close()  # warm the user and feed caches so both runs start equal
+        del statements[:]
+        response = client.get(url)
+        response.close()
+        results[name] = (response.status_code, list(statements))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small", type=int, default=2, help="rows per listing in the small database")
+    parser.add_argument("--large", type=int, default=20, help="rows per listing in the large database")
+    parser.add_argument("--verbose", action="store_true", help="print every statement of failing pages")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        small = profile(args.small, workdir)
+        large = profile(args.large, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failures = 0
+    print(f"{'endpoint':32s} {'status':>6s} {args.small:>6d} {args.large:>6d}")
+    for name, _, _ in LISTINGS:
+        status, few = small[name]
+        _, many = large[name]
+        grew = len(many) > len(few)
+        failures += grew or status >= 400
+        print(f"{name:32s} {status:6d} {len(few):6d} {len(many):6d}{'  N+1' if grew else ''}")
+        if grew:
+            for statement, count in Counter(map(shape, many)).most_common():
+                if count > 1 or args.verbose:
+                    print(f"    {count:4d} x {statement[:160]}")
+
+    if failures:
+        print(f"\n{failures} listing(s) failed")
+        sys.exit(1)
+    print("\nno listing grows its query count with its row count")
+
+
+if __name__ == "__main__":
+    main()
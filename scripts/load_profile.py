@@ -0,0 +1,200 @@
+"""Load profile: the development server versus gunicorn.conf.py.
+
+Starts each server as a subprocess on a copy of a seeded database, waits
+for /readyz, then runs --clients concurrent keep-alive clients for
+--duration seconds over a weighted mix of public pages. Reports
+throughput and latency per server and the gain of gunicorn over the dev
+server. Both servers run with MOBI_ENV=production so only the serving
+model differs.
+
+    python scripts/load_profile.py --clients 16 --duration 20
+    python scripts/load_profile.py --servers gunicorn --workers 4 --threads 8
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import sqlite3
+
+from bench_endpoints import seeded_database, percentile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# (path, weight); {tip} is replaced with a random seeded tip id
+MIX = [
+    ("/?lang=en", 4),
+    ("/?lang=tw", 2),
+    ("/tip/{tip}", 3),
+    ("/search?q=malaria", 1),
+]
+
+SERVERS = {
+    "dev": lambda args: [sys.executable, "app.py"],
+    "gunicorn": lambda args: ["gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+}
+
+
+def start(name, args, database, port):
+    env = dict(
+        os.environ,
+        MOBI_ENV="production",
+        DATABASE_URL=f"sqlite:///{database}",
+        PORT=str(port),
+        WEB_ACCESS_LOG="/dev/null",
+        ASK_MOBI_PROVIDERS="fake",
+    )
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+    if args.threads:
+        env["WEB_THREADS"] = str(args.threads)
+    # Own process group, so the dev server's reloader child is stopped too
+    return subprocess.Popen(
+        SERVERS[name](args), cwd=ROOT, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(port, timeout):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/readyz")
+            if connection.getresponse().status == 200:
+                return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"server on port {port} not ready after {timeout}s")
+
+
+def stop(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def fetch(connection, path):
+    connection.request("GET", path)
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def client(port, paths, deadline, results, seed):
+    rng = random.Random(seed)
+    latencies, errors, retries = [], 0, 0
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        started = time.perf_counter()
+        try:
+            try:
+                status = fetch(connection, path)
+            except http.client.RemoteDisconnected:
+                # The server closed an idle keep-alive connection as we reused
+                # it; like a browser, retry the GET once on a fresh one
+                retries += 1
+                connection.close()
+                status = fetch(connection, path)
+            if status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    results.append((latencies, errors, retries))
+
+
+def load(port, tip_ids, args):
+    rng = random.Random(args.seed)
+    weighted = list(itertools.chain.from_iterable([path] * weight for path, weight in MIX))
+    paths = [path.format(tip=rng.choice(tip_ids)) for path in weighted for _ in range(10)]
+
+    results = []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=client, args=(port, paths, deadline, results, args.seed + i))
+        for i in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = [ms for samples, _, _ in results for ms in samples]
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors, _ in results),
+        "retries": sum(retries for _, _, retries in results),
+        "throughput_rps": round(len(latencies) / args.duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", default="dev,gunicorn", help="comma-separated: dev, gunicorn")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per server")
+    parser.add_argument("--workers", type=int, help="gunicorn workers (default: from the CPU count)")
+    parser.add_argument("--threads", type=int, help="gunicorn threads per worker")
+    parser.add_argument("--scale", type=float, default=0.1, help="seed_db scale of the database")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "mobi-mama-bench"))
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    pristine = seeded_database(args.scale, args.seed, args.data_dir)
+    with sqlite3.connect(pristine) as connection:
+        tip_ids = [row[0] for row in connection.execute("SELECT id FROM tips ORDER BY id LIMIT 200")]
+
+    results = {}
+    print(f"{'server':10s} {'ready s':>8s} {'req/s':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'errors':>7s} {'retries':>7s}")
+    for name in args.servers.split(","):
+        workdir = tempfile.mkdtemp()
+        database = os.path.join(workdir, "load.sqlite")
+        shutil.copyfile(pristine, database)
+        process = start(name, args, database, args.port)
+        try:
+            ready = wait_ready(args.port, 120)
+            results[name] = dict(load(args.port, tip_ids, args), ready_s=round(ready, 2))
+        finally:
+            stop(process)
+            shutil.rmtree(workdir, ignore_errors=True)
+        r = results[name]
+        print(f"{name:10s} {r['ready_s']:8.2f} {r['throughput_rps']:8.1f} {r['p50_ms']:8.2f} "
+              f"{r['p95_ms']:8.2f} {r['p99_ms']:8.2f} {r['errors']:7d} {r['retries']:7d}")
+
+    if "dev" in results and "gunicorn" in results and results["dev"]["throughput_rps"]:
+        gain = results["gunicorn"]["throughput_rps"] / results["dev"]["throughput_rps"]
+        print(f"\ngunicorn serves {gain:.2f}x the dev server's throughput ({os.cpu_count()} CPU(s))")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"clients": args.clients, "duration": args.duration, "results": results}, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Local Redis-protocol stand-in for the page cache's "resp" backend.
+
+Implements the handful of commands services.page_cache uses (GET, MGET,
+SET with EX, INCR, DEL, SELECT, PING, FLUSHDB, DBSIZE) in memory, so a
+multi-worker setup can share one cache without installing Redis. Point the
+app at it with PAGE_CACHE_BACKEND=resp PAGE_CACHE_URL=redis://127.0.0.1:6380/0.
+
+    python scripts/resp_server.py --port 6380
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+_lock = threading.Lock()
+_data = {}  # key -> (value, expires at or None)
+
+
+def _alive(key, now):
+    entry = _data.get(key)
+    if entry is None:
+        return None
+    value, expires = entry
+    if expires is not None and expires <= now:
+        del _data[key]
+        return None
+    return value
+
+
+def execute(command, args):
+    now = time.time()
+    with _lock:
+        if command == b"GET":
+            return _alive(args[0], now)
+        if command == b"MGET":
+            return [_alive(key, now) for key in args]
+        if command == b"SET":
+            expires = None
+            options = [a.upper() for a in args[2:]]
+            if b"EX" in options:
+                expires = now + int(args[2 + options.index(b"EX") + 1])
+            _data[args[0]] = (args[1], expires)
+            return "OK"
+        if command == b"INCR":
+            value = int(_alive(args[0], now) or 0) + 1
+            _data[args[0]] = (str(value).encode(), None)
+            return value
+        if command == b"DEL":
+            return sum(_data.pop(key, None) is not None for key in args)
+        if command == b"FLUSHDB":
+            _data.clear()
+            return "OK"
+        if command == b"DBSIZE":
+            return len(_data)
+        if command in (b"PING", b"SELECT"):
+            return "PONG" if command == b"PING" else "OK"
+    return Exception(f"ERR unknown command '{command.decode(errors='replace')}'")
+
+
+def encode(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return f"-{reply}\r\n".encode()
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode()
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, list):
+        return f"*{len(reply)}\r\n".encode() + b"".join(encode(item) for item in reply)
+    return f"${len(reply)}\r\n".encode() + reply + b"\r\n"
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if not line.startswith(b"*"):
+                continue  # inline commands are not supported
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(encode(execute(args[0].upper(), args[1:])))
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+    with Server((args.host, args.port), Handler) as server:
+        print(f"RESP stand-in listening on {args.host}:{args.port}")
+        server.serve_forever()
@@ -1,12 +1,34 @@
+"""Seed the database: a demo nurse and two tips, or a synthetic load-test dataset.
+
+With no arguments this adds the demo rows. With --scale it generates users,
+clinics, bilingual tips and appointments (scale 1 = 10,000 appointments)
+with bulk Core inserts. The output is the same for the same --seed and
+--anchor, however many --workers share the appointment chunks.
+
+    python scripts/seed_db.py
+    python scripts/seed_db.py --scale 200 --seed 42 --workers 4 --reset
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 from app import create_app
-from models import db, User, Tip
+from models import db, User, Tip, Clinic, Appointment
+from services import database, slots
 from werkzeug.security import generate_password_hash
 
 
 def seed():
     app = create_app()
     with app.app_context():
-        db.create_all()
+        database.create_schema()
 
         # create default nurse if missing
         nurse = User.query.filter_by(username='nurse').first()
@@ -35,5 +57,307 @@ def seed():
         db.session.commit()
 
 
+# ---------------- Synthetic data ----------------
+
+# Rows per unit of --scale
+PER_SCALE = {"clinics": 20, "mothers": 1000, "tips": 100, "appointments": 10000}
+CHUNK_SIZE = 50000  # appointments per chunk; chunks are the unit of determinism and of work
+BATCH_SIZE = 10000  # rows per executemany
+
+FIRST_NAMES = ("Akosua Ama Abena Efua Adwoa Yaa Afua Esi Akua Araba Adjoa Ekua Serwaa Dzifa "
+               "Selasi Enyonam Mawunyo Naa Dede Fatima Aisha Mariama Comfort Grace Patience").split()
+LAST_NAMES = ("Mensah Owusu Boateng Asante Osei Agyeman Appiah Darko Amoah Addo Quaye Tetteh "
+              "Agbeko Dzakpasu Adjei Ofori Ansah Sarpong Danso Yeboah Abubakar Iddrisu").split()
+TOWNS = ("Accra Kumasi Tamale Takoradi Cape-Coast Sunyani Ho Koforidua Techiman Obuasi Tema "
+         "Wa Bolgatanga Nkawkaw Winneba Hohoe Kintampo Ejisu Mampong Aflao").split()
+# Town centres (latitude, longitude); clinics are scattered up to ~8 km around them
+TOWN_CENTRES = {
+    "Accra": (5.6037, -0.1870), "Kumasi": (6.6885, -1.6244), "Tamale": (9.4075, -0.8533),
+    "Takoradi": (4.8985, -1.7554), "Cape-Coast": (5.1053, -1.2466), "Sunyani": (7.3349, -2.3123),
+    "Ho": (6.6008, 0.4713), "Koforidua": (6.0941, -0.2591), "Techiman": (7.5909, -1.9344),
+    "Obuasi": (6.2023, -1.6640), "Tema": (5.6698, -0.0166), "Wa": (10.0601, -2.5099),
+    "Bolgatanga": (10.7856, -0.8514), "Nkawkaw": (6.5510, -0.7662), "Winneba": (5.3511, -0.6231),
+    "Hohoe": (7.1519, 0.4736), "Kintampo": (8.0563, -1.7306), "Ejisu": (6.7200, -1.4700),
+    "Mampong": (7.0627, -1.4001), "Aflao": (6.1190, 1.1900),
+}
+CLINIC_KINDS = ("Polyclinic", "Health Centre", "Maternity Home", "CHPS Compound", "District Hospital")
+
+# Bilingual tip topics: (English title, Twi title, English sentences, Twi sentences)
+TIP_TOPICS = (
+    ("Sleep under a treated net", "Da ntamadan a wɔde aduru asra mu",
+     ["Malaria is dangerous in pregnancy.", "Sleep under a treated mosquito net every night."],
+     ["Malaria yɛ hu ma ɔyafunu mu.", "Da ntamadan a wɔde aduru asra mu anadwo biara."]),
+    ("Drink enough water", "Nom nsuo pii",
+     ["Drink at least eight cups of clean water a day.", "Water helps prevent swelling and headaches."],
+     ["Nom nsuo kuruwa nwɔtwe da biara.", "Nsuo boa ma wo ho nhon."]),
+    ("Eat iron rich food", "Di aduane a dade wɔ mu",
+     ["Beans, leafy vegetables and fish give you iron.", "Iron prevents anaemia and tiredness."],
+     ["Adua, nhabannuru ne nam ma wo dade.", "Dade siw mogya a ɛsua ano."]),
+    ("Attend antenatal visits", "Kɔ ayaresabea daa",
+     ["Visit your clinic at least eight times during pregnancy.", "Bring your maternal health book."],
+     ["Kɔ ayaresabea mprɛ nwɔtwe wɔ wo nyinsɛn mu.", "Fa wo maame nwoma ba."]),
+    ("Know the danger signs", "Hunu asiane nsɛnkyerɛnne",
+     ["Bleeding, severe headache and fever need urgent care.", "Go to the hospital immediately."],
+     ["Mogya a ɛtene, atiridii ne tiyɛ hia ayaresa ntɛm.", "Kɔ ayaresabea ntɛm ara."]),
+    ("Breastfeed early", "Ma abofra nufusuo ntɛm",
+     ["Start breastfeeding within one hour of birth.", "Breast milk protects your baby from illness."],
+     ["Hyɛ ase ma abofra nufusuo dɔnhwere baako mu.", "Nufusuo bɔ abofra ho ban."]),
+    ("Take folic acid", "Fa folic acid",
+     ["Folic acid helps your baby's brain and spine grow.", "Take it every day as prescribed."],
+     ["Folic acid boa abofra amemene.", "Fa no da biara sɛnea wɔkyerɛɛ wo."]),
+    ("Rest and move gently", "Home na nante brɛoo",
+     ["Rest when you are tired and walk a little every day.", "Avoid heavy lifting."],
+     ["Home bere a wo ho abrɛ.", "Mfa nneɛma a emu yɛ duru."]),
+)
+NOTES = ("First visit", "Follow-up scan", "Blood test results", "Feels dizzy in the mornings",
+         "Swollen feet", "Bring previous records", "Postnatal check", "Vaccination for baby")
+
+
+def mother_username(user_id):
+    # Pure functions of the id, so appointment chunks can name mothers without a lookup
+    return f"{FIRST_NAMES[user_id * 7 % len(FIRST_NAMES)].lower()}.{LAST_NAMES[user_id * 13 % len(LAST_NAMES)].lower()}{user_id}"
+
+
+def phone_number(n):
+    return f"02{4 + n % 6}{n * 7919 % 10_000_000:07d}"
+
+
+def plan(scale):
+    counts = {name: max(1, round(per * scale)) for name, per in PER_SCALE.items()}
+    counts["staff"] = counts["clinics"]
+    counts["admins"] = 1
+    return counts
+
+
+def _users(counts, password_hash, anchor):
+    rows = [{"id": 1, "username": "admin", "password": "admin", "role": "admin",
+             "created_at": anchor, "updated_at": anchor}]
+    next_id = 2
+    for n in range(counts["staff"]):
+        rows.append({"id": next_id, "username": f"clinic{n + 1}", "password": password_hash,
+                     "role": "clinic", "created_at": anchor, "updated_at": anchor})
+        next_id += 1
+    for _ in range(counts["mothers"]):
+        joined = anchor - timedelta(minutes=next_id)
+        rows.append({"id": next_id, "username": mother_username(next_id), "password": password_hash,
+                     "role": "mother", "created_at": joined, "updated_at": joined})
+        next_id += 1
+    return rows
+
+
+def _clinic_location(n):
+    # Its own generator, so adding coordinates left every other seeded value unchanged
+    rng = random.Random(f"clinic-location:{n}")
+    lat, lon = TOWN_CENTRES[TOWNS[n % len(TOWNS)]]
+    return round(lat + rng.uniform(-0.07, 0.07), 5), round(lon + rng.uniform(-0.07, 0.07), 5)
+
+
+def _clinics(counts, rng, anchor):
+    rows = [{
+        "id": n + 1,
+        "name": f"{TOWNS[n % len(TOWNS)]} {rng.choice(CLINIC_KINDS)} {n // len(TOWNS) + 1}",
+        "address": f"{rng.randint(1, 200)} {rng.choice(LAST_NAMES)} Street, {TOWNS[n % len(TOWNS)]}",
+        "phone": phone_number(n + 1),
+        "created_at": anchor,
+        "updated_at": anchor,
+    } for n in range(counts["clinics"])]
+    for n, row in enumerate(rows):
+        row["latitude"], row["longitude"] = _clinic_location(n)
+    return rows
+
+
+def _tips(counts, rng, anchor):
+    rows = []
+    for n in range(counts["tips"]):
+        en_title, tw_title, en_lines, tw_lines = TIP_TOPICS[n // 2 % len(TIP_TOPICS)]
+        # Tips come in English/Twi pairs on the same topic
+        if n % 2 == 0:
+            title, lines, language = en_title, en_lines, "en"
+        else:
+            title, lines, language = tw_title, tw_lines, "tw"
+        created = anchor - timedelta(hours=rng.randint(0, 24 * 365))
+        rows.append({
+            "id": n + 1,
+            "title": f"{title} ({n // 2 + 1})",
+            "content": " ".join(rng.sample(lines, len(lines))),
+            "language": language,
+            "audio_filename": None,
+            "created_at": created,
+            "updated_at": created,
+        })
+    return rows
+
+
+def _clinic_weights(clinics, seed):
+    # A few busy clinics, a long tail of quiet ones
+    order = list(range(1, clinics + 1))
+    random.Random(f"{seed}:clinics-order").shuffle(order)
+    return order, [1 / (rank + 1) ** 0.8 for rank in range(clinics)]
+
+
+def appointment_chunk(chunk, seed, counts, anchor):
+    """Rows for one chunk of appointments; depends only on its arguments."""
+    rng = random.Random(f"{seed}:appointments:{chunk}")
+    clinic_ids, weights = _clinic_weights(counts["clinics"], seed)
+    first_mother = 2 + counts["staff"]
+    start = chunk * CHUNK_SIZE
+    size = min(CHUNK_SIZE, counts["appointments"] - start)
+    clinic_picks = rng.choices(clinic_ids, weights, k=size)
+
+    rows = []
+    for offset in range(size):
+        day = rng.randint(-365, 90)
+        scheduled = anchor + timedelta(days=day)
+        while scheduled.weekday() >= 5 and rng.random() < 0.85:  # clinics are quiet at weekends
+            scheduled += timedelta(days=1)
+        minutes = int(rng.triangular(8 * 60, 16 * 60, 9 * 60)) // 15 * 15  # busiest first thing
+        scheduled = scheduled.replace(hour=minutes // 60, minute=minutes % 60)
+
+        if rng.random() < 0.85:
+            user_id = rng.randint(first_mother, first_mother + counts["mothers"] - 1)
+            name = mother_username(user_id)
+        else:  # walk-ins with no account
+            user_id = None
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        created = scheduled - timedelta(days=rng.randint(1, 60), minutes=rng.randint(0, 600))
+        rows.append({
+            "id": start + offset + 1,
+            "mother_name": name,
+            "phone": phone_number(user_id or rng.randint(10**6, 10**7)),
+            "clinic_id": clinic_picks[offset],
+            "user_id": user_id,
+            "date": scheduled.strftime("%Y-%m-%d %H:%M"),
+            "scheduled_at": scheduled,
+            "notes": rng.choice(NOTES) if rng.random() < 0.3 else None,
+            "created_at": created,
+            "updated_at": created,
+        })
+    return rows
+
+
+def _insert(connection, table, rows):
+    for offset in range(0, len(rows), BATCH_SIZE):
+        connection.execute(table.insert(), rows[offset:offset + BATCH_SIZE])
+
+
+def _write_shard(args):
+    """Worker: write one chunk of appointments to its own SQLite file."""
+    from sqlalchemy import create_engine
+
+    chunk, seed, counts, anchor, directory = args
+    path = os.path.join(directory, f"appointments-{chunk:05d}.sqlite")
+    engine = create_engine(f"sqlite:///{path}")
+    table = Appointment.__table__
+    with engine.begin() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode=OFF")
+        connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        table.create(connection)
+        _insert(connection, table, appointment_chunk(chunk, seed, counts, anchor))
+    engine.dispose()
+    return path
+
+
+def _merge_shard(engine, path):
+    columns = ", ".join(column.name for column in Appointment.__table__.columns)
+    if engine.dialect.name == "sqlite":
+        # ATTACH must run outside a transaction, so use a connection of our own
+        raw = engine.raw_connection()
+        try:
+            raw.execute("ATTACH DATABASE ? AS shard", (path,))
+            raw.execute(f"INSERT INTO appointments ({columns}) SELECT {columns} FROM shard.appointments")
+            raw.commit()
+            raw.execute("DETACH DATABASE shard")
+        finally:
+            raw.close()
+        return
+    # Other databases: stream the shard's rows in and let executemany batch them
+    import sqlite3
+    shard = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+    shard.row_factory = sqlite3.Row
+    cursor = shard.execute(f"SELECT {columns} FROM appointments")
+    with engine.begin() as connection:
+        while True:
+            rows = [dict(row) for row in cursor.fetchmany(BATCH_SIZE)]
+            if not rows:
+                break
+            connection.execute(Appointment.__table__.insert(), rows)
+    shard.close()
+
+
+def generate(scale, seed=42, workers=1, reset=False, anchor=None, config_class=None):
+    from services import counters, tip_search
+
+    anchor = anchor or datetime(2026, 1, 5, 9, 0)
+    counts = plan(scale)
+    rng = random.Random(f"{seed}:base")
+    app = create_app(config_class)
+    with app.app_context():
+        if reset:
+            db.drop_all()
+        database.create_schema()
+        if db.session.query(User.id).first() or db.session.query(Appointment.id).first():
+            sys.exit("Database is not empty; pass --reset to drop and recreate it.")
+
+        started = time.perf_counter()
+        password_hash = generate_password_hash("password")  # hashed once, shared by every seeded account
+        connection = db.session.connection()
+        _insert(connection, User.__table__, _users(counts, password_hash, anchor))
+        _insert(connection, Clinic.__table__, _clinics(counts, rng, anchor))
+        slots.add_default_templates(connection, db.session.scalars(db.select(Clinic.id)).all())
+        _insert(connection, Tip.__table__, _tips(counts, rng, anchor))
+        tip_search.rebuild(connection)  # drop_all leaves the FTS table behind
+        db.session.commit()
+
+        # Appending in bulk and indexing once afterwards beats updating three indexes per row
+        indexes = Appointment.__table__.indexes
+        with db.engine.begin() as connection:
+            for index in indexes:
+                index.drop(connection)
+
+        chunks = range((counts["appointments"] + CHUNK_SIZE - 1) // CHUNK_SIZE)
+        if workers > 1:
+            with tempfile.TemporaryDirectory() as directory:
+                jobs = [(chunk, seed, counts, anchor, directory) for chunk in chunks]
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for path in executor.map(_write_shard, jobs):
+                        _merge_shard(db.engine, path)
+                        os.remove(path)
+        else:
+            for chunk in chunks:
+                _insert(db.session.connection(), Appointment.__table__, appointment_chunk(chunk, seed, counts, anchor))
+                db.session.commit()
+
+        with db.engine.begin() as connection:
+            for index in indexes:
+                index.create(connection)
+
+        # Bulk inserts skip the ORM events, so recount the dashboard in one pass
+        counters.rebuild()
+        elapsed = time.perf_counter() - started
+
+    total = counts["admins"] + counts["staff"] + counts["mothers"] + counts["clinics"] + counts["tips"] + counts["appointments"]
+    print(f"users: {counts['admins']} admin, {counts['staff']} clinic staff, {counts['mothers']} mothers")
+    print(f"clinics: {counts['clinics']}  tips: {counts['tips']}  appointments: {counts['appointments']}")
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s, {workers} worker(s))")
+    print("Logins: admin/admin (admin panel), clinic1/password, "
+          f"{mother_username(2 + counts['staff'])}/password")
+
+
 if __name__ == '__main__':
-    seed()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, help="dataset size; 1 = 10,000 appointments")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="processes generating appointment chunks")
+    parser.add_argument("--anchor", help="'today' or YYYY-MM-DD that dates are spread around (default 2026-01-05)")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    if args.scale is None:
+        seed()
+    else:
+        anchor = None
+        if args.anchor == "today":
+            anchor = datetime.combine(datetime.utcnow().date(), datetime.min.time()).replace(hour=9)
+        elif args.anchor:
+            anchor = datetime.strptime(args.anchor, "%Y-%m-%d").replace(hour=9)
+        generate(args.scale, args.seed, args.workers, args.reset, anchor)
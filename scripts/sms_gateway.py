@@ -0,0 +1,150 @@
+"""Local HTTP stand-in for the reminders' "http" SMS gateway.
+
+Accepts POST /messages in the format services.sms.HttpGateway sends, and
+remembers every idempotency key it has accepted: a resend comes back as
+"duplicate" and counts in /stats as such, never as a second message. Knobs
+make it behave like a real provider on a bad night:
+
+  --latency MS         time to answer each batch
+  --rate N             messages per second before it answers 429 + Retry-After
+  --error-rate F       share of batches answered 503 without sending
+  --lost-reply-rate F  share of batches sent but then dropped without a reply,
+                       so the caller must resend and rely on idempotency keys
+  --reject-rate F      share of messages rejected as undeliverable
+
+GET /stats returns the counters as JSON; POST /reset clears them.
+
+    python scripts/sms_gateway.py --port 8025 --latency 40 --rate 2000
+    REMINDER_GATEWAY=http REMINDER_GATEWAY_URL=http://127.0.0.1:8025/messages flask reminders run
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_lock = threading.Lock()
+_accepted = {}  # idempotency key -> message id
+_stats = {}
+
+
+def reset():
+    with _lock:
+        _accepted.clear()
+        _stats.update(requests=0, accepted=0, duplicates=0, rejected=0, throttled=0, errors=0, lost_replies=0)
+
+
+class Limiter:
+    """Token bucket over all clients, refusing rather than waiting."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self, n):
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < n:
+            return False
+        self.tokens -= n
+        return True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as the gateway client expects
+    options = None
+    limiter = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload=None, headers=()):
+        body = json.dumps(payload or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._reply(404)
+        with _lock:
+            self._reply(200, dict(_stats, unique_messages=len(_accepted)))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/reset":
+            reset()
+            return self._reply(200)
+        if self.path != "/messages":
+            return self._reply(404)
+        messages = json.loads(body).get("messages", [])
+        options = self.options
+        time.sleep(options.latency / 1000)
+
+        with _lock:
+            _stats["requests"] += 1
+            if not self.limiter.take(len(messages)):
+                _stats["throttled"] += 1
+                return self._reply(429, {"error": "rate limited"}, [("Retry-After", "1")])
+            if random.random() < options.error_rate:
+                _stats["errors"] += 1
+                return self._reply(503, {"error": "try again"})
+
+            results = []
+            for message in messages:
+                key = message["idempotency_key"]
+                if key in _accepted:
+                    _stats["duplicates"] += 1
+                    results.append({"idempotency_key": key, "status": "duplicate", "id": _accepted[key]})
+                elif random.random() < options.reject_rate:
+                    _stats["rejected"] += 1
+                    results.append({"idempotency_key": key, "status": "rejected",
+                                    "error": "undeliverable", "retryable": False})
+                else:
+                    message_id = _accepted[key] = f"sm-{len(_accepted) + 1}"
+                    _stats["accepted"] += 1
+                    results.append({"idempotency_key": key, "status": "accepted", "id": message_id})
+            lost = random.random() < options.lost_reply_rate
+            if lost:
+                _stats["lost_replies"] += 1
+
+        if lost:
+            self.close_connection = True
+            return
+        self._reply(200, {"results": results})
+
+
+def make_server(host, port, latency=0.0, rate=0.0, error_rate=0.0, lost_reply_rate=0.0, reject_rate=0.0):
+    options = argparse.Namespace(latency=latency, rate=rate, error_rate=error_rate,
+                                 lost_reply_rate=lost_reply_rate, reject_rate=reject_rate)
+    handler = type("GatewayHandler", (Handler,), {"options": options, "limiter": Limiter(rate)})
+    reset()
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds per batch")
+    parser.add_argument("--rate", type=float, default=0, help="messages per second, 0 for no limit")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--lost-reply-rate", type=float, default=0)
+    parser.add_argument("--reject-rate", type=float, default=0)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.latency, args.rate, args.error_rate,
+                         args.lost_reply_rate, args.reject_rate)
+    with server:
+        print(f"SMS gateway stand-in listening on http://{args.host}:{args.port}/messages")
+        server.serve_forever()
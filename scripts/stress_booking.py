@@ -0,0 +1,200 @@
+"""Booking contention: can a rush of mothers overbook a clinic slot?
+
+Builds a throwaway SQLite database with the production settings (WAL,
+busy timeout), gives one clinic --slots upcoming slots of --capacity places,
+and lets --threads threads post --bookings bookings through the real
+/mother/appointments view, all aimed at those few slots at once.
+
+Afterwards every slot must hold exactly as many appointments as its
+``booked`` count and no more than its capacity, and no request may have
+failed with a server error. For contrast, --naive first runs the same rush
+through a check-then-insert booking (read ``booked``, compare, write
+``booked + 1``), which is what the conditional UPDATE in services.slots
+replaces; on SQLite it overbooks or loses places as soon as reads interleave.
+
+    python scripts/stress_booking.py
+    python scripts/stress_booking.py --threads 32 --bookings 2000 --slots 3 --capacity 20 --naive
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import func, select
+from werkzeug.test import Client
+
+from app import create_app
+from config import ProductionConfig
+from models import db, User, Clinic, Appointment, SlotOccupancy
+from services import database, slots
+from bench_endpoints import BenchConfig, login_as
+
+
+def setup(args):
+    mothers = [User(username=f"stress-mother-{i}", password="x", role="mother") for i in range(args.threads)]
+    db.session.add_all(mothers)
+    clinic = Clinic(name="Rush Clinic", address="1 Station Road", phone="0302000001")
+    db.session.add(clinic)
+    db.session.commit()
+    rows = slots.next_free(clinic.id, limit=args.slots)
+    db.session.execute(
+        SlotOccupancy.__table__.update()
+        .where(SlotOccupancy.id.in_([row.id for row in rows]))
+        .values(capacity=args.capacity, booked=0)
+    )
+    db.session.commit()
+    return clinic.id, [row.id for row in rows], [mother.id for mother in mothers]
+
+
+def rush(worker, args, slot_ids):
+    """Run ``worker(thread, slot_id)`` --bookings times over --threads threads."""
+    per_thread = args.bookings // args.threads
+    outcomes = Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    def run(thread):
+        rng = random.Random(args.seed + thread)
+        start.wait()
+        for _ in range(per_thread):
+            outcome = worker(thread, rng.choice(slot_ids))
+            with lock:
+                outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, time.perf_counter() - started
+
+
+def tally(slot_ids):
+    """(slot id, capacity, booked, appointments holding it) per slot."""
+    held = dict(db.session.execute(
+        select(Appointment.slot_id, func.count()).where(Appointment.slot_id.in_(slot_ids)).group_by(Appointment.slot_id)
+    ).all())
+    return [
+        (row.id, row.capacity, row.booked, held.get(row.id, 0))
+        for row in db.session.execute(select(SlotOccupancy).where(SlotOccupancy.id.in_(slot_ids))).scalars()
+    ]
+
+
+def naive_rush(app, args, clinic_id, slot_ids):
+    """The rush through check-then-insert, on its own copy of the slots."""
+    table = SlotOccupancy.__table__
+
+    def book(thread, slot_id):
+        with app.app_context():
+            try:
+                booked, capacity = db.session.execute(
+                    select(table.c.booked, table.c.capacity).where(table.c.id == slot_id)
+                ).one()
+                if booked >= capacity:
+                    return "full"
+                time.sleep(0)  # let another request read the same count
+                db.session.execute(table.update().where(table.c.id == slot_id).values(booked=booked + 1))
+                db.session.add(Appointment(mother_name="Naive", phone="0240000000", clinic_id=clinic_id,
+                                           slot_id=slot_id, date="naive"))
+                db.session.commit()
+                return "booked"
+            except Exception as e:
+                db.session.rollback()
+                return "locked" if database.is_lock_contention(e) else type(e).__name__
+            finally:
+                db.session.remove()
+
+    outcomes, elapsed = rush(book, args, slot_ids)
+    with app.app_context():
+        rows = tally(slot_ids)
+        db.session.execute(Appointment.__table__.delete().where(Appointment.slot_id.in_(slot_ids)))
+        db.session.execute(table.update().where(table.c.id.in_(slot_ids)).values(booked=0))
+        db.session.commit()
+    return outcomes, elapsed, rows
+
+
+def report(name, outcomes, elapsed, rows):
+    attempts = sum(outcomes.values())
+    print(f"\n{name}: {attempts} attempts in {elapsed:.2f}s ({attempts / elapsed:,.0f}/s)  {dict(outcomes)}")
+    for slot_id, capacity, booked, held in rows:
+        flag = "" if booked == held <= capacity else "   <-- wrong"
+        print(f"  slot {slot_id:4d}  capacity {capacity:4d}  booked {booked:4d}  appointments {held:4d}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--bookings", type=int, default=800)
+    parser.add_argument("--slots", type=int, default=3)
+    parser.add_argument("--capacity", type=int, default=50)
+    parser.add_argument("--naive", action="store_true", help="also run the check-then-insert baseline")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    config = type("StressConfig", (BenchConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'stress.sqlite')}",
+        "SQLITE_PRAGMAS": ProductionConfig.SQLITE_PRAGMAS,
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": args.threads, "max_overflow": args.threads},
+    })
+    app = create_app(config)
+    logging.getLogger("mobi_mama.slow_query").setLevel(logging.ERROR)  # every write here waits on the lock
+    try:
+        with app.app_context():
+            database.create_schema()
+            clinic_id, slot_ids, mother_ids = setup(args)
+
+        if args.naive:
+            report("check-then-insert", *naive_rush(app, args, clinic_id, slot_ids))
+
+        clients = []
+        for mother_id in mother_ids:
+            client = Client(app)
+            login_as(client, app, mother_id)
+            clients.append(client)
+
+        def book(thread, slot_id):
+            response = clients[thread].post("/mother/appointments", data={
+                "mother_name": f"Mother {thread}", "phone": "0240000000",
+                "clinic_id": str(clinic_id), "slot_id": str(slot_id), "notes": "",
+            })
+            if response.status_code == 302:
+                return "booked"
+            if response.status_code == 200 and b"no longer available" in response.data:
+                return "full"
+            return f"http {response.status_code}"
+
+        outcomes, elapsed = rush(book, args, slot_ids)
+        with app.app_context():
+            rows = tally(slot_ids)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report("conditional UPDATE (/mother/appointments)", outcomes, elapsed, rows)
+    total_capacity = sum(capacity for _, capacity, _, _ in rows)
+    checks = [
+        ("no slot past its capacity", all(booked <= capacity for _, capacity, booked, _ in rows)),
+        ("booked counts match the appointments", all(booked == held for _, _, booked, held in rows)),
+        ("every booking answered booked or full",
+         set(outcomes) <= {"booked", "full"}),
+        ("places all taken before anyone was turned away",
+         outcomes["booked"] == min(total_capacity, sum(outcomes.values()))),
+    ]
+    print()
+    for name, ok in checks:
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
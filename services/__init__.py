@@ -0,0 +1,16 @@
+# services/__init__.py
+
+from .tip_cache import tip_feed_cache
+from .answer_cache import answer_cache
+from .ai_providers import ask_mobi_providers
+from .user_cache import user_cache
+from .i18n import translations
+from .page_cache import page_cache
+from .lifecycle import lifecycle
+from .reminders import reminder_scheduler
+from .clinic_index import clinic_index
+from .purge import purge_runner
+from .archive import appointment_archiver
+from . import counters, database, slots, tip_search, instrumentation
+
+__all__ = ["tip_feed_cache", "answer_cache", "ask_mobi_providers", "user_cache", "translations", "page_cache", "lifecycle", "reminder_scheduler", "clinic_index", "purge_runner", "appointment_archiver", "counters", "database", "slots", "tip_search", "instrumentation"]
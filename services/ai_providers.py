@@ -0,0 +1,440 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from .metrics import ask_mobi_provider_latency
+
+# Load environment variables
+load_dotenv()
+
+log = logging.getLogger("mobi_mama.ask_mobi")
+
+
+class ProviderError(Exception):
+    """A provider call failed, timed out or was refused."""
+
+
+class ProviderUnavailable(ProviderError):
+    """No provider could take the call (all failed, open or saturated)."""
+
+
+# Language Mobi answers in, by interface language code
+ANSWER_LANGUAGES = {"en": "English", "tw": "Twi", "gaa": "Ga", "ee": "Ewe"}
+
+
+def system_prompt(lang):
+    return (
+        "You are Mobi, a friendly maternal health assistant for mothers in Ghana. "
+        "Respond kindly, clearly, and accurately. If asked for a diagnosis, "
+        "advise visiting a health center. Respond in "
+        f"{ANSWER_LANGUAGES.get(lang, 'English')}."
+    )
+
+
+# ---------------- Providers ----------------
+# Each provider builds its SDK client once, on first use, and reuses it so
+# connections stay pooled. ``timeout`` is the per-call deadline in seconds.
+# The SDKs themselves are imported there too: together they take over a
+# second and tens of MB to import, which workers that never answer an Ask
+# Mobi question shouldn't pay. ``warmup()`` builds the client ahead of time.
+
+class GeminiProvider:
+    name = "gemini"
+    model_name = "gemini-2.5-flash"
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    # The gRPC channel behind the model is kept open and multiplexed
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def warmup(self):
+        return self.model
+
+    def complete(self, prompt, message, timeout):
+        return self.model.generate_content(
+            f"{prompt}\nUser: {message}", request_options={"timeout": timeout}
+        ).text
+
+    def stream(self, prompt, message, timeout):
+        response = self.model.generate_content(
+            f"{prompt}\nUser: {message}", stream=True, request_options={"timeout": timeout}
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class OpenAIProvider:
+    name = "openai"
+    model_name = "gpt-4o-mini"
+
+    def __init__(self, api_key=None, pool_size=10, connect_timeout=5.0):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+                    import openai
+
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key,
+                        max_retries=0,  # failover is handled by ProviderPool
+                        http_client=openai.DefaultHttpxClient(
+                            limits=httpx.Limits(
+                                max_connections=self.pool_size,
+                                max_keepalive_connections=self.pool_size,
+                            ),
+                        ),
+                    )
+        return self._client
+
+    def warmup(self):
+        return self.client
+
+    def _create(self, prompt, message, timeout, **kwargs):
+        import httpx
+
+        return self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": message},
+            ],
+            temperature=0.7,
+            timeout=httpx.Timeout(timeout, connect=self.connect_timeout),
+            **kwargs,
+        )
+
+    def complete(self, prompt, message, timeout):
+        return self._create(prompt, message, timeout).choices[0].message.content
+
+    def stream(self, prompt, message, timeout):
+        for chunk in self._create(prompt, message, timeout, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class FakeProvider:
+    """Local stand-in that emits a canned answer word by word.
+
+    ``first_token_delay`` and ``token_delay`` (seconds) mimic a slow provider
+    and ``error_rate`` makes a share of calls fail, so streaming, failover and
+    the circuit breaker can be exercised offline without API keys.
+    """
+
+    def __init__(self, name="fake", first_token_delay=0.0, token_delay=0.0,
+                 error_rate=0.0, answer=None, seed=None):
+        self.name = name
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.answer = answer or (
+            "Drink plenty of clean water, rest often, and visit your clinic "
+            "if you feel dizzy or see any bleeding."
+        )
+
+    def warmup(self):
+        return None
+
+    def complete(self, prompt, message, timeout):
+        return "".join(self.stream(prompt, message, timeout))
+
+    def stream(self, prompt, message, timeout):
+        if self.first_token_delay > timeout:
+            time.sleep(timeout)
+            raise ProviderError(f"{self.name} timed out")
+        time.sleep(self.first_token_delay)
+        if self._random.random() < self.error_rate:
+            raise ProviderError(f"{self.name} failed")
+        words = self.answer.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            yield word if i == len(words) - 1 else word + " "
+
+
+# ---------------- Circuit breaker ----------------
+
+class CircuitBreaker:
+    """Opens when the recent error rate or slow-call rate gets too high.
+
+    While open, calls are refused for ``cooldown`` seconds, doubling on each
+    consecutive re-open up to ``max_cooldown``. After that one trial call is
+    let through (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window=20, min_calls=5, error_rate=0.5, slow_seconds=10.0,
+                 slow_rate=0.5, cooldown=30.0, max_cooldown=300.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)  # (ok, latency)
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._cooldown = cooldown
+        self._trial_in_flight = False
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self._cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record(self, ok, latency):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if ok and latency < self.slow_seconds:
+                    self._close()
+                else:
+                    self._open(backoff=True)
+                return
+
+            self._calls.append((ok, latency))
+            if len(self._calls) < self.min_calls:
+                return
+            errors = sum(1 for call_ok, _ in self._calls if not call_ok)
+            slow = sum(1 for _, call_latency in self._calls if call_latency >= self.slow_seconds)
+            if errors / len(self._calls) >= self.error_rate or slow / len(self._calls) >= self.slow_rate:
+                self._open(backoff=False)
+
+    def _open(self, backoff):
+        if backoff:
+            self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+
+    def _close(self):
+        self.state = self.CLOSED
+        self._cooldown = self.base_cooldown
+        self._calls.clear()
+
+    def snapshot(self):
+        with self._lock:
+            calls = list(self._calls)
+            return {
+                "state": self.state,
+                "recent_calls": len(calls),
+                "recent_errors": sum(1 for ok, _ in calls if not ok),
+                "cooldown_seconds": self._cooldown,
+            }
+
+
+# ---------------- Provider pool ----------------
+
+class ProviderPool:
+    """Providers in preference order, each behind its own circuit breaker.
+
+    A semaphore caps in-flight calls across the process so a slow provider
+    cannot tie up every worker thread; callers that can't get a slot within
+    ``acquire_timeout`` are refused straight away.
+    """
+
+    def __init__(self, providers=(), max_in_flight=8, acquire_timeout=2.0, timeout=20.0,
+                 stream_deadline=60.0, breaker_options=None):
+        self.timeout = timeout
+        self.stream_deadline = stream_deadline
+        self.acquire_timeout = acquire_timeout
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._breaker_options = breaker_options or {}
+        self.providers = []
+        self.breakers = {}
+        self.rejected = 0
+        self.failovers = 0
+        for provider in providers:
+            self.add(provider)
+
+    def init_app(self, app):
+        config = app.config
+        self.timeout = config.get("ASK_MOBI_TIMEOUT", 20.0)
+        self.stream_deadline = config.get("ASK_MOBI_STREAM_DEADLINE", 60.0)
+        self.acquire_timeout = config.get("ASK_MOBI_ACQUIRE_TIMEOUT", 2.0)
+        self.max_in_flight = config.get("ASK_MOBI_MAX_IN_FLIGHT", 3)
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._breaker_options = {
+            "window": config.get("ASK_MOBI_BREAKER_WINDOW", 20),
+            "error_rate": config.get("ASK_MOBI_BREAKER_ERROR_RATE", 0.5),
+            "slow_seconds": config.get("ASK_MOBI_BREAKER_SLOW_SECONDS", 10.0),
+            "cooldown": config.get("ASK_MOBI_BREAKER_COOLDOWN", 30.0),
+            "max_cooldown": config.get("ASK_MOBI_BREAKER_MAX_COOLDOWN", 300.0),
+        }
+        self.providers, self.breakers = [], {}
+        for name in config.get("ASK_MOBI_PROVIDERS", ("gemini", "openai")):
+            self.add(build_provider(name, config))
+        app.extensions["ask_mobi_providers"] = self
+
+    def add(self, provider):
+        self.providers.append(provider)
+        self.breakers[provider.name] = CircuitBreaker(**self._breaker_options)
+
+    def warmup(self):
+        """Import the SDKs and build every client now rather than on the first question.
+
+        Returns the names of providers that are ready; one that cannot be
+        built yet (a missing API key, say) is skipped and will retry on use.
+        """
+        ready = []
+        for provider in self.providers:
+            try:
+                provider.warmup()
+            except Exception as e:
+                log.warning("Ask Mobi warmup skipped %s: %s", provider.name, e)
+                continue
+            ready.append(provider.name)
+        return ready
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self.rejected += 1
+            raise ProviderUnavailable("Too many Ask Mobi requests in flight")
+
+    def _candidates(self):
+        for provider in self.providers:
+            if self.breakers[provider.name].allow():
+                yield provider
+
+    def complete(self, prompt, message):
+        """Answer from the first healthy provider. Returns ``(text, provider_name)``."""
+        self._acquire()
+        try:
+            last_error = None
+            for attempt, provider in enumerate(self._candidates()):
+                if attempt:
+                    self.failovers += 1
+                started = time.monotonic()
+                try:
+                    text = provider.complete(prompt, message, self.timeout)
+                except Exception as e:
+                    self._record(provider, False, time.monotonic() - started)
+                    last_error = e
+                    continue
+                self._record(provider, True, time.monotonic() - started)
+                return text, provider.name
+            raise ProviderUnavailable(str(last_error or "All Ask Mobi providers are unavailable"))
+        finally:
+            self._slots.release()
+
+    def open_stream(self, prompt, message):
+        """Start streaming from the first provider that yields a token.
+
+        Failover only happens before the first token. Returns
+        ``(provider_name, tokens)``; the slot is held until ``tokens`` is
+        exhausted or closed.
+        """
+        self._acquire()
+        try:
+            last_error = None
+            for attempt, provider in enumerate(self._candidates()):
+                if attempt:
+                    self.failovers += 1
+                started = time.monotonic()
+                tokens = provider.stream(prompt, message, self.timeout)
+                try:
+                    first = next(tokens, None)
+                except Exception as e:
+                    self._record(provider, False, time.monotonic() - started)
+                    last_error = e
+                    continue
+                return provider.name, self._drain(provider, tokens, first, started)
+            raise ProviderUnavailable(str(last_error or "All Ask Mobi providers are unavailable"))
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _record(self, provider, ok, elapsed, breaker_elapsed=None, outcome=None):
+        # Breakers judge streams by time to first token; the histogram sees the whole call
+        self.breakers[provider.name].record(ok, elapsed if breaker_elapsed is None else breaker_elapsed)
+        ask_mobi_provider_latency.observe(elapsed, (provider.name, outcome or ("ok" if ok else "error")))
+
+    def _drain(self, provider, tokens, first, started):
+        ttft = time.monotonic() - started
+        outcome = "error"
+        try:
+            if first is not None:
+                yield first
+            for token in tokens:
+                if time.monotonic() - started > self.stream_deadline:
+                    raise ProviderError(f"{provider.name} exceeded the {self.stream_deadline}s deadline")
+                yield token
+            outcome = "ok"
+        except GeneratorExit:
+            # The client went away (tab closed, page left). The provider had
+            # already answered, so this is not held against its breaker
+            outcome = "cancelled"
+            raise
+        finally:
+            try:
+                tokens.close()  # ends the SDK's HTTP stream too
+            finally:
+                self._record(provider, outcome != "error", time.monotonic() - started,
+                             breaker_elapsed=ttft, outcome=outcome)
+                self._slots.release()
+
+    def snapshot(self):
+        return {
+            "providers": {name: breaker.snapshot() for name, breaker in self.breakers.items()},
+            "max_in_flight": self.max_in_flight,
+            "rejected": self.rejected,
+            "failovers": self.failovers,
+            "timeout_seconds": self.timeout,
+        }
+
+
+def build_provider(name, config):
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "openai":
+        return OpenAIProvider(
+            pool_size=config.get("ASK_MOBI_POOL_SIZE", 10),
+            connect_timeout=config.get("ASK_MOBI_CONNECT_TIMEOUT", 5.0),
+        )
+    if name == "fake":
+        return FakeProvider(
+            first_token_delay=config.get("ASK_MOBI_FAKE_FIRST_TOKEN_DELAY", 0.0),
+            token_delay=config.get("ASK_MOBI_FAKE_TOKEN_DELAY", 0.0),
+            error_rate=config.get("ASK_MOBI_FAKE_ERROR_RATE", 0.0),
+        )
+    raise ValueError(f"Unknown Ask Mobi provider: {name}")
+
+
+ask_mobi_providers = ProviderPool()
@@ -0,0 +1,150 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
+
+from models import db, AskMobiAnswer
+
+# Twi letters typed with plain Latin keyboards
+_TWI_LETTERS = str.maketrans({"ɛ": "e", "Ɛ": "e", "ɔ": "o", "Ɔ": "o", "ŋ": "n"})
+
+# Common spelling variants mapped to one form (English and Twi)
+SPELLING_VARIANTS = {
+    "pregnent": "pregnant", "pregant": "pregnant", "pragnant": "pregnant",
+    "nausia": "nausea", "nauseous": "nausea", "vomitting": "vomiting",
+    "diarhea": "diarrhea", "diarrhoea": "diarrhea", "anaemia": "anemia",
+    "haemorrhage": "hemorrhage", "bleding": "bleeding", "feaver": "fever",
+    "maleria": "malaria", "malaira": "malaria",
+    "nsu": "nsuo", "nsuu": "nsuo", "yafunu": "yafun", "yafum": "yafun",
+    "awo": "awoo", "aduane": "aduan", "aduanee": "aduan",
+    "whats": "what", "im": "i", "pls": "please", "plz": "please",
+}
+
+_APOSTROPHES = re.compile(r"['’`]")
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_question(text):
+    """Fold case, accents, punctuation, whitespace and spelling variants so
+    that trivially different phrasings of a question share one cache key."""
+    text = unicodedata.normalize("NFKD", text.translate(_TWI_LETTERS).lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _PUNCTUATION.sub(" ", _APOSTROPHES.sub("", text))
+    return " ".join(SPELLING_VARIANTS.get(word, word) for word in text.split())
+
+
+def question_key(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Ask Mobi answers kept in SQLite, with an in-process LRU in front.
+
+    Entries expire after ``ttl`` but are kept on disk, so a stale answer can
+    still be served when every provider is down. The memory tier only holds
+    rows for ``memory_ttl`` so a purge in one worker reaches the others soon.
+    """
+
+    def __init__(self, maxsize=512, ttl=timedelta(days=7), memory_ttl=600):
+        self._lock = threading.Lock()
+        self._memory = TTLCache(maxsize=maxsize, ttl=memory_ttl)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def init_app(self, app):
+        with self._lock:
+            self._memory = TTLCache(
+                maxsize=app.config.get("ASK_MOBI_CACHE_MEMORY_SIZE", 512),
+                ttl=app.config.get("ASK_MOBI_CACHE_MEMORY_TTL", 600),
+            )
+        self.ttl = timedelta(seconds=app.config.get("ASK_MOBI_CACHE_TTL", 7 * 24 * 3600))
+        app.extensions["ask_mobi_answer_cache"] = self
+
+    def get(self, lang, question, allow_stale=False):
+        """Cached answer for ``question`` in ``lang``, or None.
+
+        With ``allow_stale`` an expired answer is returned too.
+        """
+        key = (lang, question_key(normalize_question(question)))
+        now = datetime.utcnow()
+
+        with self._lock:
+            cached = self._memory.get(key)
+        if cached is None:
+            row = AskMobiAnswer.query.filter_by(language=key[0], question_key=key[1]).first()
+            if row is not None:
+                cached = (row.answer, row.expires_at)
+                with self._lock:
+                    self._memory[key] = cached
+
+        if cached is not None and (cached[1] > now or allow_stale):
+            with self._lock:
+                if cached[1] > now:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+            return cached[0]
+
+        if not allow_stale:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def put(self, lang, question, answer, provider=None):
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        key = (lang, question_key(normalized))
+        expires_at = datetime.utcnow() + self.ttl
+
+        row = AskMobiAnswer.query.filter_by(language=key[0], question_key=key[1]).first()
+        if row is None:
+            row = AskMobiAnswer(language=key[0], question_key=key[1], question=normalized)
+            db.session.add(row)
+        row.answer = answer
+        row.provider = provider
+        row.expires_at = expires_at
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker cached the same question first; theirs is as good.
+            db.session.rollback()
+
+        with self._lock:
+            self._memory[key] = (answer, expires_at)
+
+    def purge(self, lang=None):
+        """Delete cached answers (all, or one language). Returns rows removed."""
+        query = AskMobiAnswer.query
+        if lang:
+            query = query.filter_by(language=lang)
+        removed = query.delete(synchronize_session=False)
+        db.session.commit()
+        with self._lock:
+            if lang:
+                for key in [k for k in self._memory if k[0] == lang]:
+                    del self._memory[key]
+            else:
+                self._memory.clear()
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_maxsize": self._memory.maxsize,
+                "memory_ttl_seconds": self._memory.ttl,
+                "ttl_seconds": int(self.ttl.total_seconds()),
+            }
+
+
+answer_cache = AnswerCache()
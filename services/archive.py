@@ -0,0 +1,297 @@
+import fcntl
+import gzip
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import DBAPIError
+
+from models import db, Appointment, ArchiveSegment, Reminder
+from . import counters, database
+
+# Appointment archival. The appointments table only grows, and every listing,
+# filter and export pays for years of past visits, so a run moves the visits
+# scheduled more than ARCHIVE_AFTER_DAYS ago out of it, oldest first, one
+# batch per transaction:
+#
+#   delete  DELETE ... RETURNING the next ARCHIVE_BATCH_SIZE visits (on
+#           SQLite this write comes first, so the transaction holds the write
+#           lock before it reads), then their reminders, and take them off
+#           the dashboard counters;
+#   append  for each month in the batch, one gzip member of JSONL (every
+#           column, the export's field names) appended to that month's
+#           appointments-<month>.jsonl.gz and fsynced;
+#   index   an archive_segments row per member, then commit.
+#
+# A batch that never commits leaves its visits in the table and its member
+# past the file's indexed end, where the next append overwrites it; readers
+# only open indexed members. Slot places are not given back: the visits are
+# long over. Times are naive UTC.
+
+log = logging.getLogger("mobi_mama.archive")
+
+appointments = Appointment.__table__
+reminders = Reminder.__table__
+segments = ArchiveSegment.__table__
+
+COLUMNS = [column.key for column in appointments.c]
+
+
+class ArchiveError(Exception):
+    """An archive file doesn't match its index."""
+
+
+def _timestamp(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _when(row):
+    return row["scheduled_at"] or row["created_at"]
+
+
+class AppointmentArchiver:
+    def __init__(self):
+        self.directory = None
+        self.after_days = 365
+        self.batch_size = 2000
+        self.pause = 0.05
+        self.compress_level = 6
+        self.search_limit = 200
+        self.lock_retries = 5
+        self.last_run = None
+
+    def init_app(self, app):
+        config = app.config
+        self.directory = config.get("ARCHIVE_DIR") or os.path.join(app.instance_path, "archive")
+        self.after_days = config.get("ARCHIVE_AFTER_DAYS", 365)
+        self.batch_size = config.get("ARCHIVE_BATCH_SIZE", 2000)
+        self.pause = config.get("ARCHIVE_PAUSE", 0.05)
+        self.compress_level = config.get("ARCHIVE_COMPRESS_LEVEL", 6)
+        self.search_limit = config.get("ARCHIVE_SEARCH_LIMIT", 200)
+        self.lock_retries = config.get("DB_WRITE_RETRIES", 5)
+        app.extensions["archive"] = self
+
+    def path(self, month):
+        return os.path.join(self.directory, f"appointments-{month}.jsonl.gz")
+
+    # ---------------- Archiving ----------------
+
+    @contextmanager
+    def _writer(self):
+        """Yields whether this process is the one archiver for ARCHIVE_DIR;
+        two runs appending to the same month file would corrupt it."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _retrying(self, step):
+        """Run one short transaction, again on lock contention."""
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return step()
+            except DBAPIError as e:
+                db.session.rollback()
+                if attempt == self.lock_retries or not database.is_lock_contention(e):
+                    raise
+                time.sleep(0.05 * (2 ** attempt) * (0.5 + random.random()))
+
+    def run(self, now=None, after_days=None):
+        """Archive every visit past the horizon. Returns a summary, or None if
+        another run holds ARCHIVE_DIR. Needs an app context."""
+        started = time.monotonic()
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.after_days if after_days is None else after_days)
+        summary = {"archived": 0, "batches": 0, "cutoff": cutoff.isoformat(timespec="seconds")}
+        with self._writer() as holding:
+            if not holding:
+                log.info("another archive run holds %s", self.directory)
+                return None
+            # Visits whose date never parsed are archived by when they were booked
+            for undated in (False, True):
+                while True:
+                    archived = self._retrying(lambda: self._batch(cutoff, undated))
+                    if not archived:
+                        break
+                    summary["archived"] += archived
+                    summary["batches"] += 1
+                    time.sleep(self.pause)
+        if summary["archived"]:
+            self._retrying(lambda: self._forget_days(cutoff))
+        summary["seconds"] = round(time.monotonic() - started, 2)
+        summary["finished_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        self.last_run = summary
+        log.info("archive run: %s", summary)
+        return summary
+
+    def _batch(self, cutoff, undated):
+        if undated:
+            due = select(appointments.c.id).where(
+                appointments.c.scheduled_at.is_(None), appointments.c.created_at < cutoff
+            )
+        else:
+            due = select(appointments.c.id).where(appointments.c.scheduled_at < cutoff).order_by(
+                appointments.c.scheduled_at
+            )
+        try:
+            connection = db.session.connection()
+            rows = connection.execute(
+                delete(appointments)
+                .where(appointments.c.id.in_(due.limit(self.batch_size)))
+                .returning(*appointments.c)
+            ).mappings().all()
+            if not rows:
+                db.session.rollback()
+                return 0
+            connection.execute(delete(reminders).where(reminders.c.appointment_id.in_([row["id"] for row in rows])))
+            counters.bump_appointments(connection, rows, sign=-1)
+            rows = sorted(rows, key=lambda row: (_when(row), row["id"]))
+            for month, group in groupby(rows, key=lambda row: _when(row).strftime("%Y-%m")):
+                self._write_segment(connection, month, list(group))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(rows)
+
+    def _write_segment(self, connection, month, rows):
+        raw = "".join(
+            json.dumps({key: _timestamp(row[key]) for key in COLUMNS}, ensure_ascii=False) + "\n" for row in rows
+        ).encode()
+        blob = gzip.compress(raw, self.compress_level, mtime=0)
+        end = connection.execute(
+            select(func.coalesce(func.max(segments.c.byte_offset + segments.c.byte_length), 0))
+            .where(segments.c.month == month)
+        ).scalar()
+        self._append(month, blob, end)
+        ids = [row["id"] for row in rows]
+        connection.execute(insert(segments).values(
+            month=month, byte_offset=end, byte_length=len(blob), raw_bytes=len(raw), rows=len(rows),
+            first_at=_when(rows[0]), last_at=_when(rows[-1]), min_id=min(ids), max_id=max(ids),
+            clinic_ids="," + ",".join(str(c) for c in sorted({row["clinic_id"] for row in rows})) + ",",
+            created_at=datetime.utcnow(),
+        ))
+
+    def _append(self, month, blob, end):
+        """Write ``blob`` at ``end``, the file's indexed length, over anything after it."""
+        with open(self.path(month), "a+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < end:
+                raise ArchiveError(f"{self.path(month)} has {size} bytes but its index runs to {end}")
+            f.truncate(end)
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _forget_days(self, cutoff):
+        counters.forget_days(db.session.connection(), "appointments_by_clinic_day", cutoff.date().isoformat())
+        db.session.commit()
+
+    # ---------------- Reading ----------------
+
+    def months(self):
+        """Per-month totals from the index, newest first."""
+        return db.session.execute(
+            select(
+                segments.c.month,
+                func.count().label("segments"),
+                func.sum(segments.c.rows).label("rows"),
+                func.sum(segments.c.byte_length).label("bytes"),
+                func.sum(segments.c.raw_bytes).label("raw_bytes"),
+                func.min(segments.c.first_at).label("first_at"),
+                func.max(segments.c.last_at).label("last_at"),
+            ).group_by(segments.c.month).order_by(segments.c.month.desc())
+        ).all()
+
+    def segments(self, month=None, clinic_id=None, day=None):
+        """Index rows of the members that can hold matching visits, in file order.
+        ``day`` is a datetime at midnight."""
+        query = select(segments.c.month, segments.c.byte_offset, segments.c.byte_length, segments.c.rows)
+        if month:
+            query = query.where(segments.c.month == month)
+        if day:
+            query = query.where(
+                segments.c.month == day.strftime("%Y-%m"),
+                segments.c.first_at < day + timedelta(days=1),
+                segments.c.last_at >= day,
+            )
+        if clinic_id:
+            query = query.where(segments.c.clinic_ids.like(f"%,{int(clinic_id)},%"))
+        return db.session.execute(query.order_by(segments.c.month, segments.c.byte_offset)).all()
+
+    def read(self, segment):
+        """Yield the records of one indexed member."""
+        with open(self.path(segment.month), "rb") as f:
+            f.seek(segment.byte_offset)
+            blob = f.read(segment.byte_length)
+        for line in gzip.decompress(blob).decode().splitlines():
+            yield json.loads(line)
+
+    def search(self, month=None, clinic_id=None, day=None, text=None):
+        """Yield archived visits matching every filter given, oldest first.
+        ``text`` matches part of the mother's name or phone number."""
+        needle = text.strip().lower() if text else None
+        day_prefix = day.date().isoformat() if day else None
+        for segment in self.segments(month, clinic_id, day):
+            for record in self.read(segment):
+                if clinic_id and record["clinic_id"] != clinic_id:
+                    continue
+                if day_prefix and not (record["scheduled_at"] or "").startswith(day_prefix):
+                    continue
+                if needle and needle not in record["mother_name"].lower() and needle not in record["phone"]:
+                    continue
+                yield record
+
+    def export_rows(self, **filters):
+        """``(header, row, row, ...)`` of search(), for transfer.FORMATS."""
+        yield COLUMNS
+        for record in self.search(**filters):
+            yield [record[key] for key in COLUMNS]
+
+    def month_chunks(self, month, chunk_size=1 << 16):
+        """The month's file as stored, up to its indexed end, in chunks: a
+        valid multi-member .jsonl.gz. None if nothing is archived for ``month``."""
+        end = db.session.scalar(
+            select(func.max(segments.c.byte_offset + segments.c.byte_length)).where(segments.c.month == month)
+        )
+        if not end:
+            return None
+
+        def chunks():
+            with open(self.path(month), "rb") as f:
+                remaining = end
+                while remaining:
+                    chunk = f.read(min(chunk_size, remaining))
+                    if not chunk:
+                        raise ArchiveError(f"{self.path(month)} is shorter than its index")
+                    remaining -= len(chunk)
+                    yield chunk
+        return chunks()
+
+    def snapshot(self):
+        months = self.months()
+        return {
+            "directory": self.directory,
+            "after_days": self.after_days,
+            "months": len(months),
+            "rows": sum(month.rows for month in months),
+            "bytes": sum(month.bytes for month in months),
+            "raw_bytes": sum(month.raw_bytes for month in months),
+            "last_run": self.last_run,
+        }
+
+
+appointment_archiver = AppointmentArchiver()
@@ -0,0 +1,264 @@
+import math
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+
+from models import db, Clinic
+
+# "Clinics near me". Every located clinic is bucketed into a grid of square
+# cells (degrees of latitude/longitude); a query scans rings of cells outward
+# from the caller's cell and stops once no unscanned cell can hold anything
+# closer than what it has, so it reads a few dozen clinics however many there
+# are. Each worker holds its own immutable grid and swaps in a fresh one after
+# a clinic write, or after CLINIC_INDEX_TTL for writes made by other workers.
+# Longitudes are not wrapped at +-180 degrees; every clinic is in Ghana.
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Plain snapshot of a located clinic, safe to share between requests and threads.
+ClinicPoint = namedtuple("ClinicPoint", ["id", "name", "address", "phone", "latitude", "longitude"])
+
+
+def _hav(angle):
+    return math.sin(angle / 2) ** 2
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    h = _hav(phi2 - phi1) + math.cos(phi1) * math.cos(phi2) * _hav(math.radians(lon2 - lon1))
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+class ClinicGrid:
+    """An immutable grid over ``points``, sized for about ``per_cell`` clinics per cell."""
+
+    def __init__(self, points, per_cell=8):
+        self.points = {point.id: point for point in points}
+        self.cells = {}
+        self.cell = 1.0
+        if not points:
+            return
+        lats = [point.latitude for point in points]
+        lons = [point.longitude for point in points]
+        area = max(max(lats) - min(lats), 0.01) * max(max(lons) - min(lons), 0.01)
+        self.cell = max(math.sqrt(area * per_cell / len(points)), 0.001)
+        self._fill(points)
+        # Clinics cluster in towns, where most lookups come from too; size the
+        # cells for the crowding a typical clinic sees, not the country average
+        crowding = sum(len(bucket) ** 2 for bucket in self.cells.values()) / len(points)
+        if crowding > 2 * per_cell:
+            self.cell = max(self.cell * math.sqrt(per_cell / crowding), 0.001)
+            self._fill(points)
+        rows = [i for i, _ in self.cells]
+        cols = [j for _, j in self.cells]
+        self.extent = (min(rows), max(rows), min(cols), max(cols))
+        # The smallest cos(latitude) of any clinic bounds longitude distances from below
+        self.cos_min = min(math.cos(math.radians(lat)) for lat in lats)
+
+    def _fill(self, points):
+        self.cells = {}
+        for point in points:
+            phi = math.radians(point.latitude)
+            self.cells.setdefault(self._key(point.latitude, point.longitude), []).append(
+                (phi, math.radians(point.longitude), math.cos(phi), point.id)
+            )
+
+    def __len__(self):
+        return len(self.points)
+
+    def _key(self, lat, lon):
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def _ring(self, ci, cj, r):
+        """Occupied-extent cells at Chebyshev distance ``r`` from (ci, cj)."""
+        imin, imax, jmin, jmax = self.extent
+        if r == 0:
+            yield ci, cj
+            return
+        for j in range(max(cj - r, jmin), min(cj + r, jmax) + 1):
+            if ci - r >= imin:
+                yield ci - r, j
+            if ci + r <= imax:
+                yield ci + r, j
+        for i in range(max(ci - r + 1, imin), min(ci + r - 1, imax) + 1):
+            if cj - r >= jmin:
+                yield i, cj - r
+            if cj + r <= jmax:
+                yield i, cj + r
+
+    def _bound(self, lat, lon, cos_phi, ci, cj, r):
+        """No clinic outside rings 0..r is closer than this many km."""
+        cell = self.cell
+        dlat = min(lat - (ci - r) * cell, (ci + r + 1) * cell - lat)
+        dlon = min(lon - (cj - r) * cell, (cj + r + 1) * cell - lon, 180.0)
+        by_lat = EARTH_RADIUS_KM * math.radians(dlat)
+        by_lon = 2 * EARTH_RADIUS_KM * math.asin(
+            min(1.0, math.sqrt(cos_phi * self.cos_min * _hav(math.radians(dlon))))
+        )
+        return min(by_lat, by_lon)
+
+    def search(self, lat, lon, k=None, radius_km=None):
+        """(distance km, ClinicPoint) pairs, nearest first: the ``k`` nearest,
+        everything within ``radius_km``, or the ``k`` nearest within it."""
+        if not self.cells or (k is not None and k <= 0):
+            return []
+        # Candidates are compared by their haversine, which orders them as
+        # distance does; only the answers are converted to kilometres.
+        phi, lam = math.radians(lat), math.radians(lon)
+        cos_phi = math.cos(phi)
+        sin = math.sin
+        limit = 1.0 if radius_km is None else _hav(min(radius_km / EARTH_RADIUS_KM, math.pi))
+        ci, cj = self._key(lat, lon)
+        imin, imax, jmin, jmax = self.extent
+        # Rings that lie wholly outside the occupied cells hold nothing
+        r = max(0, imin - ci, ci - imax, jmin - cj, cj - jmax)
+        last = max(ci - imin, imax - ci, cj - jmin, jmax - cj)
+        found = []
+        cells = self.cells
+        while True:
+            for key in self._ring(ci, cj, r):
+                for phi2, lam2, cos2, clinic_id in cells.get(key, ()):
+                    h = sin((phi2 - phi) / 2) ** 2 + cos_phi * cos2 * sin((lam2 - lam) / 2) ** 2
+                    if h <= limit:
+                        found.append((h, clinic_id))
+            if r >= last:
+                break
+            bound = _hav(min(self._bound(lat, lon, cos_phi, ci, cj, r) / EARTH_RADIUS_KM, math.pi))
+            if bound > limit:
+                break
+            if k is not None and len(found) >= k:
+                found.sort()
+                del found[k:]
+                if found[-1][0] <= bound:
+                    break
+            r += 1
+        found.sort()
+        if k is not None:
+            del found[k:]
+        diameter = 2 * EARTH_RADIUS_KM
+        return [
+            (diameter * math.asin(min(1.0, math.sqrt(h))), self.points[clinic_id]) for h, clinic_id in found
+        ]
+
+
+class ClinicIndex:
+    """Per-worker nearest-clinic index, rebuilt from the clinics table when stale."""
+
+    def __init__(self, ttl=60, per_cell=8):
+        self._lock = threading.Lock()
+        self._grid = None
+        self._built_at = 0.0
+        self._stale = True
+        self._signature_built = None
+        self.ttl = ttl
+        self.per_cell = per_cell
+        self.builds = 0
+        self.build_seconds = 0.0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("CLINIC_INDEX_TTL", 60)
+        self.per_cell = app.config.get("CLINIC_INDEX_PER_CELL", 8)
+        with self._lock:
+            self._grid = None
+            self._stale = True
+        app.extensions["clinic_index"] = self
+
+    def invalidate(self):
+        self._stale = True
+
+    def _fresh(self):
+        return self._grid is not None and not self._stale and time.monotonic() - self._built_at < self.ttl
+
+    def _signature(self):
+        # Inserts and deletes change the count; edits bump updated_at
+        return tuple(db.session.execute(select(func.count(Clinic.id), func.max(Clinic.updated_at))).one())
+
+    def _rebuild(self):
+        started = time.perf_counter()
+        # Cleared before loading, so a commit that lands meanwhile marks it stale again
+        stale, self._stale = self._stale, False
+        signature = self._signature()
+        if self._grid is not None and not stale and signature == self._signature_built:
+            # TTL check only: no other worker changed a clinic
+            self._built_at = time.monotonic()
+            return self._grid
+        rows = db.session.execute(
+            select(Clinic.id, Clinic.name, Clinic.address, Clinic.phone, Clinic.latitude, Clinic.longitude)
+            .where(Clinic.latitude.isnot(None), Clinic.longitude.isnot(None))
+        ).all()
+        grid = ClinicGrid([ClinicPoint(*row) for row in rows], self.per_cell)
+        self._grid, self._built_at, self._signature_built = grid, time.monotonic(), signature
+        self.builds += 1
+        self.build_seconds = time.perf_counter() - started
+        return grid
+
+    def rebuild(self):
+        """Load every located clinic into a new grid now. Needs an app context."""
+        with self._lock:
+            self._stale = True
+            return self._rebuild()
+
+    def grid(self):
+        if self._fresh():
+            return self._grid
+        # While one thread rebuilds, the others keep answering from the old grid
+        if not self._lock.acquire(blocking=self._grid is None):
+            return self._grid
+        try:
+            return self._grid if self._fresh() else self._rebuild()
+        finally:
+            self._lock.release()
+
+    def nearest(self, lat, lon, k=None, radius_km=None):
+        """See ClinicGrid.search."""
+        return self.grid().search(lat, lon, k=k, radius_km=radius_km)
+
+    def stats(self):
+        grid = self._grid
+        return {
+            "clinics": len(grid) if grid is not None else None,
+            "cells": len(grid.cells) if grid is not None else None,
+            "cell_degrees": round(grid.cell, 4) if grid is not None else None,
+            "builds": self.builds,
+            "last_build_ms": round(self.build_seconds * 1000, 1),
+            "stale": self._stale,
+            "ttl": self.ttl,
+        }
+
+
+clinic_index = ClinicIndex()
+
+
+# ---------------- Invalidation from Clinic writes ----------------
+# Flush events only note that clinics changed; the grid is dropped once the
+# transaction commits so lookups never index uncommitted rows.
+
+def mark_changed(session):
+    """Note a Core write to clinics (imports), which ORM events don't see."""
+    session.info["clinics_changed"] = True
+
+
+@event.listens_for(Clinic, "after_insert")
+@event.listens_for(Clinic, "after_update")
+@event.listens_for(Clinic, "after_delete")
+def _clinic_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        clinic_index.invalidate()
+        return
+    mark_changed(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("clinics_changed", False):
+        clinic_index.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("clinics_changed", None)
@@ -0,0 +1,194 @@
+from collections import Counter
+
+from sqlalchemy import event, func, inspect, select, String, cast
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, User, Clinic, Appointment, StatCounter
+
+# Counter rows are bumped with an atomic upsert on the flushing connection, so
+# they commit or roll back together with the row that changed them.
+
+counters = StatCounter.__table__
+
+
+def _upsert(connection, deltas):
+    """Add each ``(metric, dimension, day) -> delta`` in one executemany upsert."""
+    rows = [
+        {"metric": metric, "dimension": str(dimension or ""), "day": day or "", "value": delta}
+        for (metric, dimension, day), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(counters)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["metric", "dimension", "day"],
+        set_={"value": counters.c.value + stmt.excluded.value},
+    )
+    connection.execute(stmt, rows)
+
+
+def bump(connection, metric, delta, dimension="", day=""):
+    """Add ``delta`` to one counter. Use this from bulk Core paths that
+    bypass ORM events (imports, set-based deletes)."""
+    _upsert(connection, {(metric, dimension, day): delta})
+
+
+def appointment_day(scheduled_at):
+    return scheduled_at.date().isoformat() if scheduled_at else ""
+
+
+def bump_appointment(connection, clinic_id, scheduled_at, delta):
+    bump(connection, "appointments", delta)
+    bump(connection, "appointments_by_clinic", delta, clinic_id)
+    bump(connection, "appointments_by_clinic_day", delta, clinic_id, appointment_day(scheduled_at))
+
+
+def bump_appointments(connection, rows, sign=1):
+    """bump_appointment for many rows with ``clinic_id`` and ``scheduled_at``,
+    as one executemany upsert over the counters touched."""
+    deltas = Counter()
+    for row in rows:
+        deltas["appointments_by_clinic_day", row["clinic_id"], appointment_day(row["scheduled_at"])] += sign
+        deltas["appointments_by_clinic", row["clinic_id"], ""] += sign
+    deltas["appointments", "", ""] = sign * len(rows)
+    _upsert(connection, deltas)
+
+
+def forget(connection, metrics, dimension):
+    """Drop ``dimension``'s zeroed rows of ``metrics``, e.g. a deleted clinic's."""
+    connection.execute(
+        counters.delete().where(
+            counters.c.metric.in_(metrics), counters.c.dimension == str(dimension), counters.c.value == 0
+        )
+    )
+
+
+def forget_days(connection, metric, before):
+    """Drop ``metric``'s zeroed rows for days before ``before`` (ISO date), e.g. archived ones."""
+    connection.execute(
+        counters.delete().where(
+            counters.c.metric == metric, counters.c.day != "", counters.c.day < before, counters.c.value == 0
+        )
+    )
+
+
+# ---------------- ORM events ----------------
+
+@event.listens_for(User, "after_insert")
+def _user_inserted(mapper, connection, target):
+    bump(connection, "users", 1)
+    bump(connection, "users_by_role", 1, target.role)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    bump(connection, "users", -1)
+    bump(connection, "users_by_role", -1, target.role)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    history = inspect(target).attrs.role.history
+    if history.has_changes():
+        for role in history.deleted:
+            bump(connection, "users_by_role", -1, role)
+        for role in history.added:
+            bump(connection, "users_by_role", 1, role)
+
+
+@event.listens_for(Clinic, "after_insert")
+def _clinic_inserted(mapper, connection, target):
+    bump(connection, "clinics", 1)
+
+
+@event.listens_for(Clinic, "after_delete")
+def _clinic_deleted(mapper, connection, target):
+    bump(connection, "clinics", -1)
+
+
+@event.listens_for(Appointment, "after_insert")
+def _appointment_inserted(mapper, connection, target):
+    bump_appointment(connection, target.clinic_id, target.scheduled_at, 1)
+
+
+@event.listens_for(Appointment, "after_delete")
+def _appointment_deleted(mapper, connection, target):
+    bump_appointment(connection, target.clinic_id, target.scheduled_at, -1)
+
+
+@event.listens_for(Appointment, "after_update")
+def _appointment_updated(mapper, connection, target):
+    state = inspect(target)
+    clinic = state.attrs.clinic_id.history
+    scheduled = state.attrs.scheduled_at.history
+    if not (clinic.has_changes() or scheduled.has_changes()):
+        return
+    old_clinic = (clinic.deleted or clinic.unchanged or [target.clinic_id])[0]
+    old_scheduled = (scheduled.deleted or scheduled.unchanged or [target.scheduled_at])[0]
+    bump_appointment(connection, old_clinic, old_scheduled, -1)
+    bump_appointment(connection, target.clinic_id, target.scheduled_at, 1)
+
+
+# ---------------- Reading and rebuilding ----------------
+
+def read(days=("",)):
+    """Counters for the given days as ``{metric: {dimension: {day: value}}}``.
+
+    Undated metrics live under day ``""``, so the default reads just those.
+    """
+    result = {}
+    query = select(counters.c.metric, counters.c.dimension, counters.c.day, counters.c.value)
+    for row in db.session.execute(query.where(counters.c.day.in_(list(days)))):
+        result.setdefault(row.metric, {}).setdefault(row.dimension, {})[row.day] = row.value
+    return result
+
+
+def total(snapshot, metric, dimension="", day=""):
+    return snapshot.get(metric, {}).get(dimension, {}).get(day, 0)
+
+
+def by_dimension(snapshot, metric, day=""):
+    return {
+        dimension: days[day]
+        for dimension, days in snapshot.get(metric, {}).items()
+        if days.get(day)
+    }
+
+
+def by_day(snapshot, metric):
+    totals = {}
+    for days in snapshot.get(metric, {}).values():
+        for day, value in days.items():
+            totals[day] = totals.get(day, 0) + value
+    return totals
+
+
+def rebuild():
+    """Recount everything from the source tables in one transaction."""
+    appt_day = func.coalesce(cast(func.date(Appointment.scheduled_at), String), "")
+    sources = [
+        ("users", select(func.count(User.id))),
+        ("users_by_role", select(func.coalesce(User.role, ""), func.count(User.id)).group_by(User.role)),
+        ("clinics", select(func.count(Clinic.id))),
+        ("appointments", select(func.count(Appointment.id))),
+        ("appointments_by_clinic",
+         select(Appointment.clinic_id, func.count(Appointment.id)).group_by(Appointment.clinic_id)),
+        ("appointments_by_clinic_day",
+         select(Appointment.clinic_id, appt_day, func.count(Appointment.id))
+         .group_by(Appointment.clinic_id, appt_day)),
+    ]
+
+    rows = []
+    for metric, query in sources:
+        for result in db.session.execute(query):
+            *keys, value = result
+            dimension = str(keys[0]) if keys else ""
+            day = keys[1] if len(keys) > 1 else ""
+            rows.append({"metric": metric, "dimension": dimension, "day": day or "", "value": value})
+
+    db.session.execute(counters.delete())
+    if rows:
+        db.session.execute(counters.insert(), rows)
+    db.session.commit()
+    return len(rows)
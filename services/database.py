@@ -0,0 +1,81 @@
+import random
+import time
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError, DBAPIError
+
+from models import db
+
+
+def init_app(app):
+    """Apply per-connection SQLite pragmas from the app config.
+
+    Only engines for SQLite URLs are touched; other databases are left as is.
+    """
+    if not app.config.get("SQLITE_PRAGMAS"):
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = dict(app.config["SQLITE_PRAGMAS"])
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def create_schema():
+    """Create missing tables and the tip search index.
+
+    For fresh development and benchmark databases only; deployed databases
+    are built and upgraded by ``flask db upgrade``. Nothing calls this at
+    boot. Needs an app context.
+    """
+    from . import tip_search
+
+    db.create_all()
+    with db.engine.begin() as connection:
+        tip_search.ensure_index(connection)
+
+
+# ---------------- Retrying short writes ----------------
+
+_LOCK_MESSAGES = ("database is locked", "database table is locked", "database is busy")
+_RETRYABLE_PGCODES = {"40001", "40P01"}  # serialization failure, deadlock
+
+
+def is_lock_contention(error):
+    if isinstance(error, OperationalError) and any(m in str(error.orig).lower() for m in _LOCK_MESSAGES):
+        return True
+    pgcode = getattr(getattr(error, "orig", None), "pgcode", None)
+    return isinstance(error, DBAPIError) and pgcode in _RETRYABLE_PGCODES
+
+
+def retry_on_lock(view):
+    """Re-run a short write view when its transaction loses a lock race.
+
+    The session is rolled back before each retry, so the view starts over
+    from a clean state. Only lock/serialization errors are retried.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        attempts = current_app.config.get("DB_WRITE_RETRIES", 3)
+        delay = current_app.config.get("DB_WRITE_RETRY_DELAY", 0.05)
+        for attempt in range(attempts + 1):
+            try:
+                return view(*args, **kwargs)
+            except DBAPIError as e:
+                db.session.rollback()
+                if attempt == attempts or not is_lock_contention(e):
+                    raise
+                time.sleep(delay * (2 ** attempt) * (0.5 + random.random()))
+    return wrapper
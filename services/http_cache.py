@@ -0,0 +1,50 @@
+import hashlib
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+
+def make_etag(*parts):
+    """Build an ETag from the values a page depends on."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def viewer_key():
+    if current_user.is_authenticated:
+        return f"user:{current_user.get_id()}"
+    return "anon"
+
+
+def apply_cache_policy(response):
+    """Anonymous pages may be kept by shared caches for a short while;
+    logged-in pages are private and always revalidated."""
+    if current_user.is_authenticated:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config.get("HTTP_CACHE_ANON_MAX_AGE", 60)
+    response.vary.add("Cookie")
+    return response
+
+
+def conditional_page(render, *etag_parts, last_modified=None):
+    """Return a 304 when the client's validators still match, else ``render()``.
+
+    The ETag covers the viewer and language, since both change the page.
+    Pages with pending flash messages are always rendered so the message
+    isn't swallowed by a 304.
+    """
+    etag = make_etag(viewer_key(), *etag_parts)
+    if "_flashes" not in session and not is_resource_modified(
+        request.environ, etag=etag, last_modified=last_modified
+    ):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return apply_cache_policy(response)
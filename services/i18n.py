@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+
+from flask import render_template
+from markupsafe import Markup
+
+
+class Catalog:
+    """One language's messages, compiled into a tuple.
+
+    All catalogs share a single key -> slot table built from the default
+    language, so a lookup is one dict probe and one tuple index however many
+    languages are loaded. Keys the language has not translated hold the
+    default language's text; unknown keys render as themselves.
+    """
+
+    __slots__ = ("code", "_slots", "_messages")
+
+    def __init__(self, code, slots, messages):
+        self.code = code
+        self._slots = slots
+        self._messages = messages
+
+    def __getitem__(self, key):
+        slot = self._slots.get(key)
+        return key if slot is None else self._messages[slot]
+
+    def get(self, key, default=None):
+        slot = self._slots.get(key)
+        return default if slot is None else self._messages[slot]
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __repr__(self):
+        return f"<Catalog {self.code} ({len(self._messages)} messages)>"
+
+
+class Translations:
+    """Message catalogs and per-language fragments for the public pages.
+
+    The default language and I18N_PRELOAD are compiled in ``init_app``; any
+    other configured language is compiled the first time a request asks for
+    it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.default = "en"
+        self.languages = {"en": "English"}
+        self.directory = None
+        self.cache_fragments = True
+        self._slots = {}
+        self._catalogs = {}
+        self._fragments = {}
+
+    def init_app(self, app):
+        languages = app.config.get("LANGUAGES", {"en": "English"})
+        directory = app.config.get("TRANSLATIONS_DIR")
+        with self._lock:
+            self.directory = directory
+            self.default = app.config.get("DEFAULT_LANGUAGE", "en")
+            # Only languages with a catalog on disk are offered
+            self.languages = {
+                code: name for code, name in languages.items()
+                if code == self.default or os.path.exists(self._path(code))
+            }
+            self.cache_fragments = app.config.get("I18N_CACHE_FRAGMENTS", True)
+            source = self._read(self.default)
+            self._slots = {key: slot for slot, key in enumerate(source)}
+            self._catalogs = {self.default: Catalog(self.default, self._slots, tuple(source.values()))}
+            self._fragments = {}
+        for code in app.config.get("I18N_PRELOAD", ()):
+            if code in self.languages:
+                self.catalog(code)
+        app.extensions["i18n"] = self
+
+    def _path(self, code):
+        return os.path.join(self.directory, f"{code}.json")
+
+    def _read(self, code):
+        with open(self._path(code), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _compile(self, code):
+        messages = self._read(code)
+        fallback = self._catalogs[self.default]._messages
+        return Catalog(code, self._slots, tuple(
+            messages.get(key, fallback[slot]) for key, slot in self._slots.items()
+        ))
+
+    def catalog(self, code):
+        """Compiled catalog for ``code``, or the default language's if unsupported."""
+        catalog = self._catalogs.get(code)
+        if catalog is not None:
+            return catalog
+        if code not in self.languages:
+            return self._catalogs[self.default]
+        with self._lock:
+            catalog = self._catalogs.get(code)
+            if catalog is None:
+                catalog = self._catalogs[code] = self._compile(code)
+            return catalog
+
+    def loaded(self):
+        return sorted(self._catalogs)
+
+    def negotiate(self, value):
+        """Supported language code for ``value`` ("TW", "tw-GH" -> "tw"), or None."""
+        if not value:
+            return None
+        value = value.strip().lower().replace("_", "-")
+        if value in self.languages:
+            return value
+        base = value.split("-", 1)[0]
+        return base if base in self.languages else None
+
+    def fragment(self, template, lang):
+        """``template`` rendered once per language and reused.
+
+        Only for markup that depends on nothing but the language: anything
+        that reads ``current_user``, the session or a CSRF token must not go
+        through here.
+        """
+        if not self.cache_fragments:
+            return Markup(render_template(template))
+        key = (template, lang)
+        html = self._fragments.get(key)
+        if html is None:
+            html = Markup(render_template(template))
+            with self._lock:
+                self._fragments[key] = html
+        return html
+
+
+translations = Translations()
@@ -0,0 +1,109 @@
+import logging
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+
+from models import db
+from .metrics import (
+    Gauge, register, http_request_duration, http_requests, http_request_sql_statements,
+    http_request_db_duration, db_slow_queries,
+)
+
+# Per-request timing and SQL accounting. The hooks only do a few clock reads
+# and dict updates per request and per statement, so they stay on in
+# production; METRICS_ENABLED=0 turns them off entirely.
+
+slow_query_log = logging.getLogger("mobi_mama.slow_query")
+
+
+def _endpoint():
+    return request.endpoint or "unmatched"
+
+
+def _role():
+    # current_user comes from the identity cache, so this costs no query
+    if not current_user or not current_user.is_authenticated:
+        return "anonymous"
+    return getattr(current_user, "role", None) or "unknown"
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+
+
+def _finish_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    endpoint = _endpoint()
+    http_request_duration.observe(time.perf_counter() - started, (endpoint, _role()))
+    http_requests.inc(1, (endpoint, str(response.status_code)))
+    http_request_sql_statements.observe(g.get("sql_statements", 0), (endpoint,))
+    http_request_db_duration.observe(g.get("sql_seconds", 0.0), (endpoint,))
+    return response
+
+
+def _instrument_engine(engine, threshold):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        in_request = has_request_context() and "metrics_started" in g
+        if in_request:
+            g.sql_statements += 1
+            g.sql_seconds += elapsed
+        if elapsed >= threshold:
+            endpoint = _endpoint() if in_request else "background"
+            db_slow_queries.inc(1, (endpoint,))
+            slow_query_log.warning(
+                "%.1f ms in %s: %s", elapsed * 1000, endpoint, " ".join(statement.split())[:500]
+            )
+
+
+# ---------------- Scrape-time gauges ----------------
+
+CACHES = ("tip_feed_cache", "ask_mobi_answer_cache", "user_cache", "page_cache")
+
+
+def _cache_stat(key):
+    def collect():
+        for name in CACHES:
+            cache = current_app.extensions.get(name)
+            if cache is not None:
+                yield (name,), cache.stats()[key]
+    return collect
+
+
+def _pool_checked_out():
+    pool = db.engine.pool
+    if hasattr(pool, "checkedout"):
+        yield (), pool.checkedout()
+
+
+def _breakers_open():
+    pool = current_app.extensions.get("ask_mobi_providers")
+    for name, breaker in (pool.snapshot()["providers"] if pool else {}).items():
+        yield (name,), int(breaker["state"] != "closed")
+
+
+register(Gauge("cache_hits", "Hits since start, per in-process cache", ("cache",), _cache_stat("hits")))
+register(Gauge("cache_misses", "Misses since start, per in-process cache", ("cache",), _cache_stat("misses")))
+register(Gauge("db_pool_checked_out", "Database connections currently in use", (), _pool_checked_out))
+register(Gauge("ask_mobi_breaker_open", "1 while a provider's circuit breaker is open or probing",
+               ("provider",), _breakers_open))
+
+
+def init_app(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    with app.app_context():
+        _instrument_engine(db.engine, app.config.get("SLOW_QUERY_THRESHOLD_MS", 200) / 1000)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+
+from werkzeug.test import Client
+
+from models import db
+
+# Worker lifecycle for the preforking server (gunicorn.conf.py): drop
+# connections inherited from the master after fork, warm this worker's
+# caches before it takes traffic, and report readiness until shutdown.
+
+log = logging.getLogger("mobi_mama.lifecycle")
+
+
+class Lifecycle:
+    """Readiness of this worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.draining = False
+        self.warmup_ms = None
+        self.steps = {}
+
+    def init_app(self, app):
+        app.extensions["lifecycle"] = self
+
+    def after_fork(self, app):
+        """Forget the master's pooled connections; the child opens its own."""
+        with app.app_context():
+            db.engine.dispose(close=False)
+        with self._lock:
+            self.ready = False
+            self.draining = False
+
+    def warmup(self, app):
+        """Fill this worker's caches, then mark it ready.
+
+        Each step is timed and a failing step is logged and skipped, so a
+        cold cache never keeps a worker out of rotation.
+        """
+        started = time.perf_counter()
+        steps = {}
+        for name, step in (
+            ("database", self._warm_database),
+            ("translations", self._warm_translations),
+            ("pages", self._warm_pages),
+            ("slots", self._warm_slots),
+            ("ask_mobi", self._warm_ask_mobi),
+        ):
+            step_started = time.perf_counter()
+            try:
+                with app.app_context():
+                    detail = step(app)
+            except Exception as e:
+                log.warning("warmup step %s failed: %s", name, e)
+                detail = f"failed: {e}"
+            steps[name] = {"ms": round((time.perf_counter() - step_started) * 1000, 1), "detail": detail}
+        with self._lock:
+            self.steps = steps
+            self.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.ready = True
+        return steps
+
+    def _warm_database(self, app):
+        # Open as many pooled connections as the worker has threads
+        wanted = max(1, app.config.get("WARMUP_DB_CONNECTIONS", 1))
+        connections = []
+        try:
+            for _ in range(wanted):
+                connection = db.engine.connect()
+                connection.exec_driver_sql("SELECT 1")
+                connections.append(connection)
+        finally:
+            for connection in connections:
+                connection.close()
+        return f"{len(connections)} connection(s)"
+
+    def _warm_translations(self, app):
+        from . import translations
+
+        for code in translations.languages:
+            translations.catalog(code)
+        return ", ".join(translations.loaded())
+
+    def _warm_pages(self, app):
+        # Real requests compile the templates and fill the tip feed, fragment
+        # and page caches exactly as visitors would
+        from . import translations
+
+        client = Client(app)
+        statuses = {}
+        for path in app.config.get("WARMUP_PATHS", ("/",)):
+            for code in translations.languages:
+                response = client.get(path, query_string={"lang": code})
+                statuses[f"{path}?lang={code}"] = response.status_code
+                response.close()
+        return statuses
+
+    def _warm_slots(self, app):
+        # Move the slot horizon on if the daily "flask slots materialize"
+        # has not yet; a single read when it has
+        from . import slots
+
+        with db.engine.begin() as connection:
+            return f"{slots.extend_horizon(connection)} slot(s) created"
+
+    def _warm_ask_mobi(self, app):
+        if not app.config.get("ASK_MOBI_WARMUP", False):
+            return "skipped (ASK_MOBI_WARMUP=0)"
+        from . import ask_mobi_providers
+
+        return ask_mobi_providers.warmup()
+
+    def drain(self):
+        """Stop reporting ready; the server finishes in-flight requests."""
+        with self._lock:
+            self.draining = True
+
+    def shutdown(self, app):
+        from . import purge_runner
+
+        self.drain()
+        # A purge stops after its current batch and resumes in another worker
+        purge_runner.stop()
+        with app.app_context():
+            db.engine.dispose()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "ready": self.ready and not self.draining,
+                "draining": self.draining,
+                "warmup_ms": self.warmup_ms,
+                "steps": self.steps,
+            }
+
+
+lifecycle = Lifecycle()
@@ -0,0 +1,18 @@
+from sqlalchemy.orm import joinedload, load_only
+
+from models import Appointment, Clinic
+
+
+def appointment_listing(query, *columns):
+    """``query`` narrowed to the appointment ``columns`` a listing renders.
+
+    Each row's clinic name comes back in the same SELECT through a join, so
+    a page costs one query however many rows it has. ``id`` and
+    ``created_at`` are always loaded because keyset pagination orders and
+    builds its cursor on them. Touching a column that was not listed costs
+    a query per row, so list everything the template shows.
+    """
+    return query.options(
+        load_only(Appointment.id, Appointment.created_at, *columns),
+        joinedload(Appointment.clinic).load_only(Clinic.name),
+    )
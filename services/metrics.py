@@ -0,0 +1,199 @@
+import bisect
+import threading
+
+# Latency buckets (seconds) sized for LLM round trips on slow links
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 30)
+# Latency buckets (seconds) for page requests and database time
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# SQL statements issued by one request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, safe to observe from any thread.
+
+    With ``labelnames`` each distinct label tuple (passed as ``labels=``)
+    gets its own series.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, description="", buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [bucket counts, count, sum]
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def snapshot(self, labels=()):
+        with self._lock:
+            counts, count, total = self._series.get(labels) or ([0] * (len(self.buckets) + 1), 0, 0.0)
+            cumulative, running = [], 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                running += n
+                cumulative.append((bound, running))
+            return {"buckets": cumulative, "count": count, "sum": total}
+
+    def samples(self):
+        with self._lock:
+            labelsets = list(self._series)
+        for labels in labelsets:
+            snapshot = self.snapshot(labels)
+            for bound, running in snapshot["buckets"]:
+                yield self.name + "_bucket", labels + (_format_bound(bound),), ("le",), running
+            yield self.name + "_count", labels, (), snapshot["count"]
+            yield self.name + "_sum", labels, (), snapshot["sum"]
+
+
+class Counter:
+    """Monotonic counter, optionally labelled like ``Histogram``."""
+
+    type = "counter"
+
+    def __init__(self, name, description="", labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, labels, (), value
+
+
+class Gauge:
+    """Value read at scrape time from ``collect()``, which yields ``(labels, value)``."""
+
+    type = "gauge"
+
+    def __init__(self, name, description="", labelnames=(), collect=None):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.collect = collect or (lambda: ())
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield self.name, tuple(labels), (), value
+
+
+# ---------------- Prometheus text format ----------------
+
+def _format_bound(bound):
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(metrics):
+    """Prometheus text exposition (version 0.0.4) of ``metrics``."""
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, extra_names, value in metric.samples():
+            pairs = zip(metric.labelnames + extra_names, labels)
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in pairs)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- Application metrics ----------------
+
+ask_mobi_ttft = Histogram(
+    "ask_mobi_time_to_first_token_seconds",
+    "Time from a streamed Ask Mobi question to the first answer token",
+)
+
+ask_mobi_provider_latency = Histogram(
+    "ask_mobi_provider_latency_seconds",
+    "Duration of each Ask Mobi provider call, to the last token for streams",
+    labelnames=("provider", "outcome"),
+)
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to build each response, by endpoint and the viewer's role",
+    buckets=REQUEST_BUCKETS,
+    labelnames=("endpoint", "role"),
+)
+
+http_requests = Counter(
+    "http_requests_total",
+    "Responses sent, by endpoint and status code",
+    labelnames=("endpoint", "status"),
+)
+
+http_request_sql_statements = Histogram(
+    "http_request_sql_statements",
+    "SQL statements executed while handling one request",
+    buckets=STATEMENT_BUCKETS,
+    labelnames=("endpoint",),
+)
+
+http_request_db_duration = Histogram(
+    "http_request_db_seconds",
+    "Time spent in the database while handling one request",
+    buckets=REQUEST_BUCKETS,
+    labelnames=("endpoint",),
+)
+
+db_slow_queries = Counter(
+    "db_slow_queries_total",
+    "SQL statements slower than SLOW_QUERY_THRESHOLD_MS",
+    labelnames=("endpoint",),
+)
+
+sms_reminders = Counter(
+    "sms_reminders_total",
+    "Reminder messages handled, by gateway and outcome (sent, duplicate, retry, failed)",
+    labelnames=("gateway", "outcome"),
+)
+
+sms_gateway_latency = Histogram(
+    "sms_gateway_batch_seconds",
+    "Duration of each SMS gateway batch call",
+    buckets=REQUEST_BUCKETS,
+    labelnames=("gateway", "outcome"),
+)
+
+REGISTRY = [
+    http_request_duration,
+    http_requests,
+    http_request_sql_statements,
+    http_request_db_duration,
+    db_slow_queries,
+    ask_mobi_ttft,
+    ask_mobi_provider_latency,
+    sms_reminders,
+    sms_gateway_latency,
+]
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
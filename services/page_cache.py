@@ -0,0 +1,385 @@
+import fcntl
+import functools
+import hashlib
+import json
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+from cachetools import TTLCache
+from flask import current_app, g, request, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import Tip
+from .http_cache import apply_cache_policy
+
+# Anonymous pages and shared fragments are stored as bytes in a backend that
+# may be shared by every worker. Each backend supports get/set/clear/stats;
+# clear() is called on every committed Tip write.
+
+
+# ---------------- Backends ----------------
+
+class MemoryBackend:
+    """Per-process LRU with a TTL; each worker warms its own copy.
+
+    A Tip write clears only the writing worker's copy; the others catch up
+    within PAGE_CACHE_TTL. Use "mmap" or "resp" when that matters.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize=512, ttl=300):
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "maxsize": self._entries.maxsize}
+
+
+class MmapBackend:
+    """Fixed-size hash table in a memory-mapped file shared by all workers.
+
+    The file is a header holding a generation number, then ``slots`` slots
+    of ``slot_size`` bytes. A key maps to one slot, and a newer entry simply
+    replaces whatever was there. clear() bumps the generation, so every
+    worker sees the whole table go stale at once without rewriting it.
+    Slots are guarded with fcntl record locks between processes and a
+    thread lock within one.
+    """
+
+    name = "mmap"
+    MAGIC = b"MMPAGE01"
+    HEADER = struct.Struct("<8sQII")  # magic, generation, slots, slot_size
+    HEADER_SIZE = 4096
+    ENTRY = struct.Struct("<16sQdI")  # key digest, generation, expires at, length
+
+    def __init__(self, path, slots=512, slot_size=65536, ttl=300):
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        size = self.HEADER_SIZE + slots * slot_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.HEADER_SIZE, 0)
+        try:
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+            magic, _, known_slots, known_size = self.HEADER.unpack_from(self._map, 0)
+            if (magic, known_slots, known_size) != (self.MAGIC, slots, slot_size):
+                # New file or a different layout: start over at generation 1
+                self._map[:size] = bytes(size)
+                self.HEADER.pack_into(self._map, 0, self.MAGIC, 1, slots, slot_size)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.HEADER_SIZE, 0)
+
+    def _generation(self):
+        return self.HEADER.unpack_from(self._map, 0)[1]
+
+    def _slot(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        offset = self.HEADER_SIZE + int.from_bytes(digest[:8], "little") % self.slots * self.slot_size
+        return digest, offset
+
+    def get(self, key):
+        digest, offset = self._slot(key)
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_SH, self.slot_size, offset)
+            try:
+                stored, generation, expires, length = self.ENTRY.unpack_from(self._map, offset)
+                if stored != digest or generation != self._generation() or expires < time.time():
+                    return None
+                start = offset + self.ENTRY.size
+                return bytes(self._map[start:start + length])
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+
+    def set(self, key, value):
+        if len(value) > self.slot_size - self.ENTRY.size:
+            return False
+        digest, offset = self._slot(key)
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, offset)
+            try:
+                start = offset + self.ENTRY.size
+                self._map[start:start + len(value)] = value
+                self.ENTRY.pack_into(
+                    self._map, offset, digest, self._generation(), time.time() + self.ttl, len(value)
+                )
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+        return True
+
+    def clear(self):
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.HEADER_SIZE, 0)
+            try:
+                magic, generation, slots, slot_size = self.HEADER.unpack_from(self._map, 0)
+                self.HEADER.pack_into(self._map, 0, magic, generation + 1, slots, slot_size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.HEADER_SIZE, 0)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "slot_size": self.slot_size,
+            "generation": self._generation(),
+        }
+
+
+class RespError(Exception):
+    pass
+
+
+class RespBackend:
+    """Redis-protocol backend: Redis, Valkey or scripts/resp_server.py.
+
+    Speaks just enough RESP for GET/MGET/SET/INCR over one connection per
+    thread, so no client library is needed. Each value is stamped with the
+    generation it was written under and read back with the current
+    generation in one MGET; clear() is a single INCR. A backend that is
+    down counts as a miss.
+    """
+
+    name = "resp"
+
+    def __init__(self, url="redis://127.0.0.1:6379/0", ttl=300, prefix="mobi:page", timeout=0.25):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.timeout = timeout
+        self.errors = 0
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            if self.db:
+                self._command("SELECT", self.db)
+        return conn
+
+    def _command(self, *args):
+        sock, reader = self._connection()
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts += [f"${len(data)}\r\n".encode(), data, b"\r\n"]
+        try:
+            sock.sendall(b"".join(parts))
+            return self._reply(reader)
+        except (OSError, ValueError):
+            self._local.conn = None
+            sock.close()
+            raise
+
+    def _reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ValueError("connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body
+        if kind == b"-":
+            raise RespError(body.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            return [self._reply(reader) for _ in range(int(body))]
+        raise ValueError(f"unexpected reply {line!r}")
+
+    def _safely(self, *args):
+        try:
+            return self._command(*args)
+        except (OSError, ValueError, RespError):
+            self.errors += 1
+            return None
+
+    def get(self, key):
+        reply = self._safely("MGET", f"{self.prefix}:generation", f"{self.prefix}:{key}")
+        if not reply or reply[1] is None:
+            return None
+        stamp, value = reply[1].split(b"\n", 1)
+        return value if stamp == (reply[0] or b"0") else None
+
+    def set(self, key, value):
+        generation = self._safely("GET", f"{self.prefix}:generation") or b"0"
+        return self._safely("SET", f"{self.prefix}:{key}", generation + b"\n" + value, "EX", self.ttl) is not None
+
+    def clear(self):
+        self._safely("INCR", f"{self.prefix}:generation")
+
+    def stats(self):
+        return {"url": f"redis://{self.host}:{self.port}/{self.db}", "errors": self.errors}
+
+
+def make_backend(config):
+    kind = config.get("PAGE_CACHE_BACKEND", "memory")
+    ttl = config.get("PAGE_CACHE_TTL", 300)
+    if kind == "memory":
+        return MemoryBackend(config.get("PAGE_CACHE_SIZE", 512), ttl)
+    if kind == "mmap":
+        return MmapBackend(
+            config["PAGE_CACHE_MMAP_PATH"],
+            config.get("PAGE_CACHE_MMAP_SLOTS", 512),
+            config.get("PAGE_CACHE_MMAP_SLOT_SIZE", 65536),
+            ttl,
+        )
+    if kind == "resp":
+        return RespBackend(config.get("PAGE_CACHE_URL", "redis://127.0.0.1:6379/0"), ttl)
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown PAGE_CACHE_BACKEND {kind!r}")
+
+
+# ---------------- Page cache ----------------
+
+# Response headers replayed from a cached page; Set-Cookie and the cache
+# policy are always produced fresh.
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Content-Language")
+
+
+class PageCache:
+    """Anonymous responses and shared fragments, keyed by endpoint, args and language."""
+
+    def __init__(self):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def init_app(self, app):
+        self.backend = make_backend(app.config)
+        app.extensions["page_cache"] = self
+
+    def _cacheable(self):
+        return (
+            self.backend is not None
+            and request.method == "GET"
+            and not current_user.is_authenticated
+            and "_flashes" not in session
+        )
+
+    def page_key(self):
+        # ?lang= is already folded into g.lang
+        args = sorted((k, v) for k, v in request.args.items(multi=True) if k != "lang")
+        return "page:" + json.dumps([request.endpoint, request.view_args, args, g.lang], sort_keys=True)
+
+    def cached(self, view):
+        """Serve anonymous GETs of ``view`` from the cache; others render as usual."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self._cacheable():
+                return view(*args, **kwargs)
+            key = self.page_key()
+            stored = self.backend.get(key)
+            if stored is not None:
+                self.hits += 1
+                head, body = stored.split(b"\n", 1)
+                response = current_app.response_class(body, headers=json.loads(head))
+                return apply_cache_policy(response.make_conditional(request))
+            self.misses += 1
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                headers = {k: response.headers[k] for k in _KEPT_HEADERS if k in response.headers}
+                if not self.backend.set(key, json.dumps(headers).encode("utf-8") + b"\n" + response.get_data()):
+                    self.skipped += 1
+            return response
+        return wrapper
+
+    def fragment(self, key, render):
+        """Markup for ``key``, rendering with ``render()`` on a miss.
+
+        Shared by every viewer, so ``render`` must not depend on who is
+        logged in.
+        """
+        if self.backend is None:
+            return render()
+        key = f"fragment:{key}"
+        stored = self.backend.get(key)
+        if stored is not None:
+            self.hits += 1
+            return stored.decode("utf-8")
+        self.misses += 1
+        html = render()
+        if not self.backend.set(key, html.encode("utf-8")):
+            self.skipped += 1
+        return html
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        return {
+            "backend": self.backend.name if self.backend else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            **(self.backend.stats() if self.backend else {}),
+        }
+
+
+page_cache = PageCache()
+
+
+# ---------------- Invalidation from Tip writes ----------------
+# Same shape as the tip feed cache: flushes only mark the session, and the
+# cache is cleared after the commit so no page is rebuilt from uncommitted rows.
+
+@event.listens_for(Tip, "after_insert")
+@event.listens_for(Tip, "after_update")
+@event.listens_for(Tip, "after_delete")
+def _tip_written(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        page_cache.clear()
+    else:
+        session.info["tip_pages_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_tip_pages(session):
+    if session.info.pop("tip_pages_dirty", False):
+        page_cache.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tip_pages(session):
+    session.info.pop("tip_pages_dirty", None)
@@ -0,0 +1,69 @@
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import tuple_
+
+# One page of a keyset listing. ``next_cursor`` is None on the last page.
+KeysetPage = namedtuple("KeysetPage", ["items", "next_cursor", "per_page"])
+
+
+def encode_cursor(created_at, row_id):
+    # Rows saved without a created_at get an empty timestamp
+    raw = f"{created_at.isoformat() if created_at else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        return (datetime.fromisoformat(created_at) if created_at else None), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        abort(400, description="Invalid cursor")
+
+
+def page_size(value=None):
+    """Requested page size, clamped to the configured maximum."""
+    default = current_app.config.get("PAGE_SIZE", 50)
+    maximum = current_app.config.get("PAGE_SIZE_MAX", 200)
+    if value is None:
+        value = request.args.get("per_page", type=int)
+    if not value or value < 1:
+        return default
+    return min(value, maximum)
+
+
+def keyset_paginate(query, model, cursor=None, per_page=None):
+    """Newest-first page of ``query`` that seeks past ``cursor``.
+
+    Rows are ordered by ``(created_at, id)`` descending, so each page is an
+    index range scan starting right after the previous page's last row rather
+    than an OFFSET that grows with the page number. Rows without a
+    ``created_at`` sort after all the others.
+    """
+    per_page = page_size(per_page)
+    created_at = model.created_at
+    order = (created_at.desc(), model.id.desc())
+    undated = query.filter(created_at.is_(None))
+    seek = query
+    if cursor:
+        after_at, after_id = decode_cursor(cursor)
+        if after_at is None:
+            seek, undated = undated.filter(model.id < after_id), None
+        else:
+            # A row-value comparison; SQLite plans the equivalent OR as a full
+            # index scan once its values are bound parameters
+            seek = query.filter(tuple_(created_at, model.id) < tuple_(after_at, after_id))
+    rows = seek.order_by(*order).limit(per_page + 1).all()
+    if cursor and undated is not None and len(rows) <= per_page:
+        # The range seek stops at the oldest dated row; the undated ones follow it
+        rows += undated.order_by(*order).limit(per_page + 1 - len(rows)).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return KeysetPage(rows, next_cursor, per_page)
@@ -0,0 +1,299 @@
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.exc import DBAPIError
+
+from models import db, Appointment, Clinic, PurgeJob, Reminder, User
+from . import counters, database, slots
+from .clinic_index import mark_changed
+from .user_cache import user_cache
+
+# Deleting a clinic or a user used to go through the ORM cascade, which loads
+# every appointment into the session and deletes them one by one inside the
+# admin's request. A purge job does it set-based instead:
+#
+#   batch   one transaction: take the job row (the write lock, on SQLite),
+#           pick the next PURGE_BATCH_SIZE appointment ids by index, delete
+#           their reminders, give back their slot places, subtract them from
+#           the dashboard counters, delete them and add them to ``deleted``;
+#   finish  one transaction: sweep any appointment booked meanwhile, then the
+#           clinic's slots and templates or the user, and mark the job done.
+#
+# Each transaction holds the write lock for a few milliseconds and the runner
+# pauses between batches, so bookings elsewhere carry on during a purge.
+# Times are naive UTC.
+
+log = logging.getLogger("mobi_mama.purge")
+
+jobs = PurgeJob.__table__
+appointments = Appointment.__table__
+reminders = Reminder.__table__
+
+ACTIVE = ("pending", "running")
+
+# kind -> (model, appointment column pointing at it, the column after it in
+# that column's index). Batches are taken in index order: ordering by id
+# would sort all of the target's remaining appointments every batch.
+TARGETS = {
+    "clinic": (Clinic, Appointment.clinic_id, Appointment.scheduled_at),
+    "user": (User, Appointment.user_id, Appointment.created_at),
+}
+
+
+class JobLost(Exception):
+    """Another runner took the job over (this one was presumed dead)."""
+
+
+class PurgeRunner:
+    def __init__(self):
+        self.batch_size = 500
+        self.pause = 0.02
+        self.stale_after = 60
+        self.in_process = True
+        self.lock_retries = 5
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stopping = threading.Event()
+
+    def init_app(self, app):
+        config = app.config
+        self.batch_size = config.get("PURGE_BATCH_SIZE", 500)
+        self.pause = config.get("PURGE_PAUSE", 0.02)
+        self.stale_after = config.get("PURGE_STALE_AFTER", 60)
+        self.in_process = config.get("PURGE_IN_PROCESS", True)
+        self.lock_retries = config.get("DB_WRITE_RETRIES", 5)
+        app.extensions["purge"] = self
+
+    # ---------------- Queueing ----------------
+
+    def active_job(self, kind, target_id):
+        return PurgeJob.query.filter(
+            PurgeJob.kind == kind, PurgeJob.target_id == target_id, PurgeJob.status.in_(ACTIVE)
+        ).first()
+
+    def active_targets(self, kind, target_ids):
+        """Which of ``target_ids`` are being purged: {target id: job}."""
+        ids = list(target_ids)
+        if not ids:
+            return {}
+        return {
+            job.target_id: job
+            for job in PurgeJob.query.filter(
+                PurgeJob.kind == kind, PurgeJob.target_id.in_(ids), PurgeJob.status.in_(ACTIVE)
+            )
+        }
+
+    def request(self, kind, target, requested_by=None):
+        """Queue a purge of ``target`` (a Clinic or User) and start it.
+
+        Returns the job; if one is already queued or running for the same
+        target, that one is returned instead.
+        """
+        job = self.active_job(kind, target.id)
+        if job is None:
+            _, column, _ = TARGETS[kind]
+            job = PurgeJob(
+                kind=kind, target_id=target.id, label=target.name if kind == "clinic" else target.username,
+                total=db.session.scalar(select(func.count(Appointment.id)).where(column == target.id)),
+                requested_by=requested_by,
+            )
+            db.session.add(job)
+            db.session.commit()
+        self.start(job.id)
+        return job
+
+    def start(self, job_id):
+        """Work ``job_id`` on this process's purge thread (unless PURGE_IN_PROCESS is off)."""
+        if not self.in_process:
+            return
+        app = current_app._get_current_object()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="purge")
+            self._executor.submit(self._run_in_app, app, job_id)
+
+    def _run_in_app(self, app, job_id):
+        with app.app_context():
+            try:
+                self.run(job_id)
+            except Exception:
+                log.exception("purge job %s failed", job_id)
+            finally:
+                db.session.remove()
+
+    def resume_abandoned(self):
+        """Start every job that is pending or whose runner stopped reporting."""
+        resumable = self._resumable(datetime.utcnow())
+        for job_id in db.session.scalars(select(jobs.c.id).where(resumable).order_by(jobs.c.id)):
+            self.start(job_id)
+
+    def stop(self):
+        """Finish the batch in hand and stop. Its job stays claimed, so another
+        runner resumes it once the heartbeat is PURGE_STALE_AFTER old."""
+        self._stopping.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self._stopping.clear()
+
+    # ---------------- Running ----------------
+
+    def _resumable(self, now):
+        return or_(
+            jobs.c.status == "pending",
+            and_(jobs.c.status == "running",
+                 or_(jobs.c.heartbeat_at.is_(None), jobs.c.heartbeat_at < now - timedelta(seconds=self.stale_after))),
+        )
+
+    def _claim(self, job_id, token):
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, self._resumable(now))
+            .values(status="running", claimed_by=token, heartbeat_at=now,
+                    started_at=func.coalesce(jobs.c.started_at, now), updated_at=now)
+        )
+        db.session.commit()
+        return claimed.rowcount == 1
+
+    def _touch(self, job_id, token):
+        # First statement of every transaction: proves the claim and, on
+        # SQLite, takes the write lock before anything is read
+        now = datetime.utcnow()
+        touched = db.session.execute(
+            update(jobs).where(jobs.c.id == job_id, jobs.c.claimed_by == token)
+            .values(heartbeat_at=now, updated_at=now)
+        )
+        if touched.rowcount != 1:
+            raise JobLost(job_id)
+
+    def _retrying(self, step):
+        """Run one short transaction, again on lock contention."""
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return step()
+            except DBAPIError as e:
+                db.session.rollback()
+                if attempt == self.lock_retries or not database.is_lock_contention(e):
+                    raise
+                time.sleep(0.05 * (2 ** attempt) * (0.5 + random.random()))
+
+    def run(self, job_id):
+        """Claim ``job_id`` and work it to the end in this thread.
+
+        Returns the finished job, or None if another runner holds it or the
+        runner is stopping. Needs an app context.
+        """
+        token = uuid.uuid4().hex
+        if not self._retrying(lambda: self._claim(job_id, token)):
+            return None
+        job = db.session.get(PurgeJob, job_id)
+        kind, target_id = job.kind, job.target_id
+        log.info("purging %s %s (%s appointments)", kind, target_id, job.total)
+        try:
+            while self._retrying(lambda: self._batch(job_id, token, kind, target_id)):
+                if self._stopping.is_set():
+                    log.info("purge job %s paused at shutdown", job_id)
+                    return None
+                time.sleep(self.pause)
+            self._retrying(lambda: self._finish(job_id, token, kind, target_id))
+        except JobLost:
+            db.session.rollback()
+            log.warning("purge job %s was taken over by another runner", job_id)
+            return None
+        except Exception as e:
+            db.session.rollback()
+            db.session.execute(
+                update(jobs).where(jobs.c.id == job_id, jobs.c.claimed_by == token)
+                .values(status="failed", last_error=str(e)[:200], finished_at=datetime.utcnow())
+            )
+            db.session.commit()
+            raise
+        if kind == "user":
+            user_cache.invalidate(target_id)
+        db.session.expire(job)
+        log.info("purged %s %s", kind, target_id)
+        return job
+
+    def _delete_appointments(self, connection, kind, target_id, limit=None):
+        """Delete the target's next ``limit`` appointments (all if None) with
+        their reminders, slot places and counters. Returns how many went."""
+        _, column, order = TARGETS[kind]
+        query = select(appointments.c.id, appointments.c.clinic_id, appointments.c.scheduled_at, appointments.c.slot_id)
+        query = query.where(column == target_id)
+        if limit is not None:
+            query = query.order_by(order).limit(limit)
+        rows = connection.execute(query).mappings().all()
+        if not rows:
+            return 0
+        ids = [row["id"] for row in rows]
+        connection.execute(delete(reminders).where(reminders.c.appointment_id.in_(ids)))
+        slots.release_many(connection, [row["slot_id"] for row in rows])
+        counters.bump_appointments(connection, rows, sign=-1)
+        connection.execute(delete(appointments).where(appointments.c.id.in_(ids)))
+        return len(rows)
+
+    def _batch(self, job_id, token, kind, target_id):
+        self._touch(job_id, token)
+        deleted = self._delete_appointments(db.session.connection(), kind, target_id, self.batch_size)
+        if deleted:
+            db.session.execute(
+                update(jobs).where(jobs.c.id == job_id)
+                .values(deleted=jobs.c.deleted + deleted, batches=jobs.c.batches + 1)
+            )
+        db.session.commit()
+        return deleted
+
+    def _finish(self, job_id, token, kind, target_id):
+        self._touch(job_id, token)
+        model = TARGETS[kind][0]
+        connection = db.session.connection()
+        # Appointments booked since the last batch; a handful at most
+        swept = self._delete_appointments(connection, kind, target_id)
+        table = model.__table__
+        if kind == "clinic":
+            slots.delete_clinic(connection, target_id)
+            if connection.execute(delete(table).where(table.c.id == target_id)).rowcount:
+                counters.bump(connection, "clinics", -1)
+                counters.forget(connection, ("appointments_by_clinic", "appointments_by_clinic_day"), target_id)
+                mark_changed(db.session)
+        else:
+            role = connection.execute(select(table.c.role).where(table.c.id == target_id)).scalar()
+            if connection.execute(delete(table).where(table.c.id == target_id)).rowcount:
+                counters.bump(connection, "users", -1)
+                counters.bump(connection, "users_by_role", -1, role)
+        db.session.execute(
+            update(jobs).where(jobs.c.id == job_id)
+            .values(status="done", deleted=jobs.c.deleted + swept, finished_at=datetime.utcnow(), last_error=None)
+        )
+        db.session.commit()
+
+    # ---------------- Reporting ----------------
+
+    @staticmethod
+    def progress(job):
+        return {
+            "id": job.id,
+            "kind": job.kind,
+            "target_id": job.target_id,
+            "label": job.label,
+            "status": job.status,
+            "total": job.total,
+            "deleted": job.deleted,
+            "batches": job.batches,
+            "percent": job.percent,
+            "error": job.last_error,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+
+purge_runner = PurgeRunner()
@@ -0,0 +1,302 @@
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import and_, bindparam, exists, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Appointment, Clinic, Reminder
+from .metrics import sms_reminders, sms_gateway_latency
+from .sms import GatewayError, SmsResult, TokenBucket, build_gateway
+
+# Appointment reminders, in two steps per run:
+#   plan      walk appointments due within REMINDER_LEAD_HOURS (by the
+#             scheduled_at index) and queue one reminders row each, keyed so
+#             a second plan of the same visit inserts nothing;
+#   dispatch  claim due rows, batch them per clinic and send the batches
+#             from a thread pool through the gateway's rate limit, retrying
+#             failed calls with backoff. Only the calling thread touches the
+#             database; worker threads only talk to the gateway.
+# Times are naive UTC, like scheduled_at (Ghana keeps UTC all year).
+
+log = logging.getLogger("mobi_mama.reminders")
+
+reminders = Reminder.__table__
+
+
+class ReminderScheduler:
+    def __init__(self):
+        self.gateway = None
+        self.bucket = TokenBucket(0)
+        self.workers = 4
+        self.lead_hours = 24
+        self.language = "en"
+        self.plan_chunk = 1000
+        self.write_chunk = 1000
+        self.claim_size = 5000
+        self.claim_timeout = 900
+        self.retries = 2
+        self.backoff = 0.5
+        self.backoff_max = 30.0
+        self.max_attempts = 5
+        self.retry_delay = 300
+        self.last_run = None
+
+    def init_app(self, app):
+        config = app.config
+        self.gateway = build_gateway(config.get("REMINDER_GATEWAY", "log"), config)
+        self.bucket = TokenBucket(self.gateway.rate, config.get("REMINDER_BURST") or max(self.gateway.rate, self.gateway.max_batch))
+        self.workers = config.get("REMINDER_WORKERS", 4)
+        self.lead_hours = config.get("REMINDER_LEAD_HOURS", 24)
+        self.language = config.get("DEFAULT_LANGUAGE", "en")
+        self.claim_size = config.get("REMINDER_CLAIM_SIZE", 5000)
+        self.claim_timeout = config.get("REMINDER_CLAIM_TIMEOUT", 900)
+        self.retries = config.get("REMINDER_RETRIES", 2)
+        self.backoff = config.get("REMINDER_BACKOFF", 0.5)
+        self.backoff_max = config.get("REMINDER_BACKOFF_MAX", 30.0)
+        self.max_attempts = config.get("REMINDER_MAX_ATTEMPTS", 5)
+        self.retry_delay = config.get("REMINDER_RETRY_DELAY", 300)
+        app.extensions["reminders"] = self
+
+    # ---------------- Planning ----------------
+
+    @staticmethod
+    def key(appointment_id, scheduled_at):
+        return f"appt-{appointment_id}-{scheduled_at:%Y%m%d%H%M}"
+
+    def plan(self, now=None):
+        """Queue a reminder for each appointment due within the lead time. Returns how many were new."""
+        from . import translations
+
+        now = now or datetime.utcnow()
+        horizon = now + timedelta(hours=self.lead_hours)
+        template = translations.catalog(self.language)["reminder_sms"]
+        query = (
+            select(Appointment.id, Appointment.clinic_id, Appointment.mother_name, Appointment.phone,
+                   Appointment.scheduled_at, Clinic.name.label("clinic_name"))
+            .join(Clinic, Clinic.id == Appointment.clinic_id)
+            .where(Appointment.scheduled_at > now, Appointment.scheduled_at <= horizon)
+            .order_by(Appointment.scheduled_at, Appointment.id)
+            .limit(self.plan_chunk)
+        )
+        planned, last = 0, None
+        while True:
+            page = query if last is None else query.where(or_(
+                Appointment.scheduled_at > last.scheduled_at,
+                and_(Appointment.scheduled_at == last.scheduled_at, Appointment.id > last.id),
+            ))
+            rows = db.session.execute(page).all()
+            if not rows:
+                return planned
+            planned += self._insert_new([{
+                "idempotency_key": self.key(row.id, row.scheduled_at),
+                "appointment_id": row.id,
+                "clinic_id": row.clinic_id,
+                "scheduled_for": row.scheduled_at,
+                "phone": row.phone,
+                "body": template.format(
+                    name=row.mother_name, clinic=row.clinic_name,
+                    when=row.scheduled_at.strftime("%a %d %b, %H:%M"),
+                )[:320],
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+                "updated_at": now,
+            } for row in rows])
+            db.session.commit()
+            last = rows[-1]
+
+    def _insert_new(self, values):
+        connection = db.session.connection()
+        insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(reminders).on_conflict_do_nothing(index_elements=["idempotency_key"])
+        return connection.execute(stmt, values).rowcount
+
+    # ---------------- Dispatch ----------------
+
+    def dispatch(self, now=None):
+        """Send every reminder that is due. Returns counts by outcome."""
+        now = now or datetime.utcnow()
+        summary = {"sent": 0, "duplicate": 0, "retry": 0, "failed": 0}
+        summary["cancelled"] = self._cancel_stale()
+        self._requeue_abandoned()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="sms") as pool:
+            while True:
+                claimed = self._claim(now)
+                if not claimed:
+                    break
+                futures = [pool.submit(self._send, batch) for batch in self._batches(claimed)]
+                done = []
+                for future in as_completed(futures):
+                    done.extend(future.result())
+                    if len(done) >= self.write_chunk:
+                        self._record(done, summary)
+                        done = []
+                self._record(done, summary)
+        return summary
+
+    def _cancel_stale(self):
+        # The visit was moved or deleted since this row was queued; plan()
+        # queues a new row for a new time
+        current = exists().where(
+            Appointment.id == reminders.c.appointment_id,
+            Appointment.scheduled_at == reminders.c.scheduled_for,
+        )
+        result = db.session.execute(
+            update(reminders)
+            .where(reminders.c.status == "pending", ~current)
+            .values(status="cancelled", updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def _requeue_abandoned(self):
+        # A run that died mid-send leaves rows in 'sending'. Resending them is
+        # safe: the gateway drops keys it has already accepted.
+        cutoff = datetime.utcnow() - timedelta(seconds=self.claim_timeout)
+        db.session.execute(
+            update(reminders)
+            .where(reminders.c.status == "sending", reminders.c.updated_at < cutoff)
+            .values(status="pending", claimed_by=None, updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+    def _claim(self, now):
+        """Mark up to ``claim_size`` due rows as ours, so a concurrent run skips them."""
+        token = uuid.uuid4().hex
+        due = (
+            select(reminders.c.id)
+            .where(reminders.c.status == "pending", reminders.c.next_attempt_at <= now)
+            .order_by(reminders.c.next_attempt_at)
+            .limit(self.claim_size)
+        )
+        db.session.execute(
+            update(reminders)
+            .where(reminders.c.id.in_(due), reminders.c.status == "pending")
+            .values(status="sending", claimed_by=token, updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return db.session.execute(
+            select(reminders.c.id, reminders.c.idempotency_key, reminders.c.clinic_id,
+                   reminders.c.phone, reminders.c.body, reminders.c.attempts)
+            .where(reminders.c.status == "sending", reminders.c.claimed_by == token)
+        ).all()
+
+    def _batches(self, rows):
+        """Rows grouped per clinic, split into gateway-sized batches."""
+        size = self.gateway.max_batch
+        for _, group in groupby(sorted(rows, key=lambda r: r.clinic_id), key=lambda r: r.clinic_id):
+            group = list(group)
+            for i in range(0, len(group), size):
+                yield group[i:i + size]
+
+    def _send(self, batch):
+        """Send one batch, retrying a failed call. Runs on a worker thread; no database access."""
+        messages = [{"key": r.idempotency_key, "to": r.phone, "body": r.body} for r in batch]
+        name = self.gateway.name
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire(len(messages))
+            started = time.monotonic()
+            try:
+                results = self.gateway.send_batch(messages)
+            except GatewayError as e:
+                sms_gateway_latency.observe(time.monotonic() - started, (name, "error"))
+                if not e.retryable or attempt == self.retries:
+                    return [(row, SmsResult(row.idempotency_key, False, None, str(e), e.retryable, False))
+                            for row in batch]
+                time.sleep(self._backoff(attempt, e.retry_after))
+                continue
+            sms_gateway_latency.observe(time.monotonic() - started, (name, "ok"))
+            return list(zip(batch, results))
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return min(self.backoff * 2 ** attempt, self.backoff_max) * random.uniform(0.5, 1.5)
+
+    def _record(self, done, summary):
+        if not done:
+            return
+        now = datetime.utcnow()
+        params = []
+        for row, result in done:
+            attempts = row.attempts + 1
+            if result.ok:
+                outcome, status, next_attempt_at = ("duplicate" if result.duplicate else "sent"), "sent", now
+            elif result.retryable and attempts < self.max_attempts:
+                outcome, status = "retry", "pending"
+                next_attempt_at = now + timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+            else:
+                outcome, status, next_attempt_at = "failed", "failed", now
+            summary[outcome] += 1
+            sms_reminders.inc(labels=(self.gateway.name, outcome))
+            params.append({
+                "b_id": row.id,
+                "b_status": status,
+                "b_next_attempt_at": next_attempt_at,
+                "b_message_id": result.message_id,
+                "b_error": (result.error or "")[:200] or None,
+                "b_sent_at": now if result.ok else None,
+            })
+        db.session.execute(
+            update(reminders)
+            .where(reminders.c.id == bindparam("b_id"))
+            .values(
+                status=bindparam("b_status"),
+                attempts=reminders.c.attempts + 1,
+                next_attempt_at=bindparam("b_next_attempt_at"),
+                claimed_by=None,
+                gateway=self.gateway.name,
+                gateway_message_id=bindparam("b_message_id"),
+                last_error=bindparam("b_error"),
+                sent_at=bindparam("b_sent_at"),
+                updated_at=now,
+            ),
+            params,
+        )
+        db.session.commit()
+
+    # ---------------- Running ----------------
+
+    def run_once(self, now=None):
+        """Plan and dispatch once. Needs an app context."""
+        started = time.monotonic()
+        now = now or datetime.utcnow()
+        planned = self.plan(now)
+        summary = dict(self.dispatch(now), planned=planned)
+        summary["seconds"] = round(time.monotonic() - started, 2)
+        summary["finished_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        self.last_run = summary
+        log.info("reminder run: %s", summary)
+        return summary
+
+    def serve(self, app, interval, stop=None):
+        """Run every ``interval`` seconds until ``stop`` (a threading.Event) is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                with app.app_context():
+                    self.run_once()
+            except Exception:
+                log.exception("reminder run failed")
+            stop.wait(interval)
+
+    def snapshot(self):
+        counts = dict(db.session.query(Reminder.status, func.count()).group_by(Reminder.status).all())
+        return {
+            "gateway": self.gateway.name if self.gateway else None,
+            "rate_per_second": self.bucket.rate,
+            "rate_limited_seconds": round(self.bucket.waited, 1),
+            "workers": self.workers,
+            "by_status": counts,
+            "last_run": self.last_run,
+        }
+
+
+reminder_scheduler = ReminderScheduler()
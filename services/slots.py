@@ -0,0 +1,323 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, case, delete, event, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Clinic, ClinicSlot, SlotOccupancy, Appointment
+
+# Clinic capacity. ClinicSlot rows are weekly templates; slot_occupancy holds
+# one row per dated slot with its capacity and places taken, materialized
+# SLOT_HORIZON_DAYS ahead. Availability reads that table by
+# (clinic_id, day, start_time) and never writes: rows are created when a
+# clinic or template is added, and the horizon is moved on by
+# extend_horizon() from "flask slots materialize" (daily) and worker
+# warmup. Booking takes a place with
+#
+#     UPDATE slot_occupancy SET booked = booked + 1
+#     WHERE id = :slot AND booked < capacity
+#
+# in the same transaction as the appointment INSERT. The database applies
+# that row by row, so concurrent bookings can never push ``booked`` past
+# ``capacity`` and no table lock is needed: a losing request simply updates
+# no row.
+# Times are naive UTC, like scheduled_at (Ghana keeps UTC all year).
+
+slots = SlotOccupancy.__table__
+templates = ClinicSlot.__table__
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+class SlotUnavailable(Exception):
+    """The chosen slot is full, past, or not at the chosen clinic."""
+
+
+def _today():
+    return datetime.utcnow().date()
+
+
+def _config(key, default):
+    return current_app.config.get(key, default)
+
+
+def _insert(connection):
+    return postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+
+
+def slot_time(day, start_time):
+    return f"{day} {start_time}"
+
+
+def label(row):
+    when = datetime.strptime(slot_time(row.day, row.start_time), "%Y-%m-%d %H:%M")
+    return when.strftime("%a %d %b, %H:%M")
+
+
+# ---------------- Materializing ----------------
+
+def horizon_end(today=None):
+    """The last day slots are materialized through."""
+    return (today or _today()) + timedelta(days=_config("SLOT_HORIZON_DAYS", 28) - 1)
+
+
+def materialize(connection, clinic_ids=None, first_day=None, days=None):
+    """Create the dated slot rows for ``days`` from ``first_day`` (today).
+
+    Existing rows are left alone, so this is safe to repeat and to race.
+    Returns the number of rows created.
+    """
+    first_day = first_day or _today()
+    days = days or _config("SLOT_HORIZON_DAYS", 28)
+    query = select(templates)
+    if clinic_ids is not None:
+        query = query.where(templates.c.clinic_id.in_(list(clinic_ids)))
+    by_weekday = {}
+    for template in connection.execute(query):
+        by_weekday.setdefault(template.weekday, []).append(template)
+
+    rows = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for template in by_weekday.get(day.weekday(), ()):
+            rows.append({
+                "clinic_id": template.clinic_id, "template_id": template.id, "day": day.isoformat(),
+                "start_time": template.start_time, "duration_minutes": template.duration_minutes,
+                "capacity": template.capacity, "booked": 0,
+            })
+    created = 0
+    stmt = _insert(connection)(slots).on_conflict_do_nothing(index_elements=["clinic_id", "day", "start_time"])
+    for i in range(0, len(rows), 1000):
+        created += connection.execute(stmt, rows[i:i + 1000]).rowcount
+    return created
+
+
+def behind(connection, today=None):
+    """Ids of clinics with templates whose dated slots stop short of the horizon.
+
+    Every template recurs weekly, so a clinic is current when its last
+    dated slot falls in the horizon's final week.
+    """
+    last_day = select(func.max(slots.c.day)).where(slots.c.clinic_id == templates.c.clinic_id).scalar_subquery()
+    final_week = (horizon_end(today) - timedelta(days=6)).isoformat()
+    return connection.execute(
+        select(templates.c.clinic_id).distinct().where(or_(last_day.is_(None), last_day < final_week))
+    ).scalars().all()
+
+
+def extend_horizon(connection, today=None):
+    """Materialize slots through the horizon for the clinics behind it.
+
+    Just one read when every clinic is current, so it is cheap to run
+    from each worker's warmup as well as daily from cron. Returns the
+    number of rows created.
+    """
+    clinic_ids = behind(connection, today)
+    return materialize(connection, clinic_ids, today) if clinic_ids else 0
+
+
+# ---------------- Availability ----------------
+
+def _upcoming(clinic_id, now):
+    now = now or datetime.utcnow()
+    today, clock = now.date().isoformat(), now.strftime("%H:%M")
+    return and_(
+        slots.c.clinic_id == clinic_id,
+        or_(slots.c.day > today, and_(slots.c.day == today, slots.c.start_time > clock)),
+    )
+
+
+def next_free(clinic_id, limit=None, now=None):
+    """The next ``limit`` slots at ``clinic_id`` with a place left, soonest first."""
+    limit = limit or _config("SLOT_CHOICES", 12)
+    return db.session.execute(
+        select(slots.c.id, slots.c.day, slots.c.start_time, slots.c.capacity, slots.c.booked)
+        .where(_upcoming(clinic_id, now), slots.c.booked < slots.c.capacity)
+        .order_by(slots.c.day, slots.c.start_time)
+        .limit(limit)
+    ).all()
+
+
+def choices(clinic_id, current=None, keep_label=None):
+    """(slot id, label) pairs for a booking form's time select.
+
+    ``current`` (an appointment's slot) is listed even when full; with
+    ``keep_label`` a 0 choice keeps an appointment's free-text date.
+    """
+    options = []
+    if keep_label:
+        options.append((0, keep_label))
+    if current is not None:
+        row = db.session.execute(
+            select(slots.c.id, slots.c.day, slots.c.start_time).where(slots.c.id == current)
+        ).first()
+        if row is not None:
+            options.append((row.id, f"{label(row)} (current)"))
+    if clinic_id:
+        options.extend(
+            (row.id, f"{label(row)} ({row.capacity - row.booked} left)")
+            for row in next_free(clinic_id) if row.id != current
+        )
+    return options
+
+
+def occupancy(clinic_id, days=7):
+    """Booked and total places per day for the next ``days`` days."""
+    first = _today()
+    last = first + timedelta(days=days - 1)
+    totals = {(first + timedelta(days=i)).isoformat(): [0, 0] for i in range(days)}
+    for row in db.session.execute(
+        select(slots.c.day, slots.c.booked, slots.c.capacity)
+        .where(slots.c.clinic_id == clinic_id, slots.c.day.between(first.isoformat(), last.isoformat()))
+    ):
+        totals[row.day][0] += row.booked
+        totals[row.day][1] += row.capacity
+    return [(day, booked, capacity) for day, (booked, capacity) in totals.items()]
+
+
+# ---------------- Booking ----------------
+
+def _claim(clinic_id, slot_id, now=None):
+    """Take one place in ``slot_id``; raises SlotUnavailable if none is left."""
+    if not slot_id:
+        raise SlotUnavailable("Please choose a time.")
+    claimed = db.session.execute(
+        update(slots)
+        .where(slots.c.id == slot_id, _upcoming(clinic_id, now), slots.c.booked < slots.c.capacity)
+        .values(booked=slots.c.booked + 1)
+    )
+    if claimed.rowcount != 1:
+        raise SlotUnavailable("That time is no longer available. Please choose another.")
+    return db.session.execute(select(slots.c.day, slots.c.start_time).where(slots.c.id == slot_id)).one()
+
+
+def _release(connection, slot_id):
+    connection.execute(
+        update(slots).where(slots.c.id == slot_id, slots.c.booked > 0).values(booked=slots.c.booked - 1)
+    )
+
+
+def release_many(connection, slot_ids):
+    """Give back one place per entry in ``slot_ids``, one UPDATE per slot.
+    For set-based appointment deletes, which bypass the ORM events."""
+    held = Counter(slot_id for slot_id in slot_ids if slot_id)
+    if not held:
+        return
+    connection.execute(
+        update(slots)
+        .where(slots.c.id == bindparam("slot"))
+        .values(booked=case((slots.c.booked > bindparam("places"), slots.c.booked - bindparam("places")), else_=0)),
+        [{"slot": slot_id, "places": places} for slot_id, places in held.items()],
+    )
+
+
+def book(appointment, clinic_id, slot_id):
+    """Give ``appointment`` a place in ``slot_id`` and add it to the session.
+
+    The caller commits; rolling back also gives the place back.
+    """
+    row = _claim(clinic_id, slot_id)
+    appointment.clinic_id = clinic_id
+    appointment.slot_id = slot_id
+    appointment.date = slot_time(row.day, row.start_time)
+    db.session.add(appointment)
+    return appointment
+
+
+def move(appointment, clinic_id, slot_id):
+    """Move ``appointment`` to another slot, or keep its time when ``slot_id`` is 0."""
+    if not slot_id:
+        if appointment.slot_id and clinic_id != appointment.clinic_id:
+            raise SlotUnavailable("Please choose a time at the new clinic.")
+        appointment.clinic_id = clinic_id
+        return appointment
+    if slot_id == appointment.slot_id:
+        return appointment
+    row = _claim(clinic_id, slot_id)
+    if appointment.slot_id:
+        _release(db.session.connection(), appointment.slot_id)
+    appointment.clinic_id = clinic_id
+    appointment.slot_id = slot_id
+    appointment.date = slot_time(row.day, row.start_time)
+    return appointment
+
+
+# ---------------- Templates ----------------
+
+def add_template(clinic_id, weekday, start_time, capacity, duration_minutes=60):
+    template = ClinicSlot(clinic_id=clinic_id, weekday=weekday, start_time=start_time,
+                          capacity=capacity, duration_minutes=duration_minutes)
+    db.session.add(template)
+    db.session.flush()
+    materialize(db.session.connection(), [clinic_id])
+    return template
+
+
+def set_capacity(template, capacity):
+    """Change a template's capacity for every future dated slot too.
+
+    Lowering it below a slot's bookings keeps those visits; the slot just
+    takes no more.
+    """
+    template.capacity = capacity
+    db.session.execute(
+        update(slots)
+        .where(slots.c.template_id == template.id, slots.c.day >= _today().isoformat())
+        .values(capacity=capacity)
+    )
+
+
+def remove_template(template):
+    """Drop a template and its future slots that nobody has booked.
+
+    The slots it keeps (booked ones and past days) are detached from it:
+    template ids can be reused, and SQLite does not apply ``ON DELETE SET
+    NULL`` with foreign keys off.
+    """
+    db.session.execute(
+        delete(slots).where(slots.c.template_id == template.id, slots.c.day >= _today().isoformat(),
+                            slots.c.booked == 0)
+    )
+    db.session.execute(update(slots).where(slots.c.template_id == template.id).values(template_id=None))
+    db.session.delete(template)
+
+
+def add_default_templates(connection, clinic_ids):
+    """Give new clinics the SLOT_DEFAULT_* weekly template and its dated
+    slots. Use this from bulk Core inserts that bypass ORM events (imports)."""
+    rows = [
+        {"clinic_id": clinic_id, "weekday": weekday, "start_time": start_time,
+         "duration_minutes": _config("SLOT_DEFAULT_MINUTES", 60), "capacity": _config("SLOT_DEFAULT_CAPACITY", 6)}
+        for clinic_id in clinic_ids
+        for weekday in _config("SLOT_DEFAULT_WEEKDAYS", (0, 1, 2, 3, 4))
+        for start_time in _config("SLOT_DEFAULT_TIMES", ("09:00",))
+    ]
+    if rows:
+        connection.execute(templates.insert(), rows)
+        materialize(connection, clinic_ids)
+
+
+# ---------------- ORM events ----------------
+
+@event.listens_for(Clinic, "after_insert")
+def _clinic_inserted(mapper, connection, target):
+    add_default_templates(connection, [target.id])
+
+
+def delete_clinic(connection, clinic_id):
+    """Drop a clinic's dated slots and templates, once its appointments are gone."""
+    connection.execute(delete(slots).where(slots.c.clinic_id == clinic_id))
+    connection.execute(delete(templates).where(templates.c.clinic_id == clinic_id))
+
+
+@event.listens_for(Clinic, "after_delete")
+def _clinic_deleted(mapper, connection, target):
+    # Its appointments were deleted first (Clinic.appointments cascade)
+    delete_clinic(connection, target.id)
+
+
+@event.listens_for(Appointment, "after_delete")
+def _appointment_deleted(mapper, connection, target):
+    if target.slot_id:
+        _release(connection, target.slot_id)
@@ -0,0 +1,209 @@
+import http.client
+import json
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+log = logging.getLogger("mobi_mama.sms")
+
+
+class GatewayError(Exception):
+    """A whole batch failed. ``retry_after`` (seconds) is set when the gateway asked us to slow down."""
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+# Outcome of one message in a batch. ``duplicate`` means the gateway had already
+# accepted this idempotency key, so the reminder went out on an earlier attempt.
+SmsResult = namedtuple("SmsResult", "key ok message_id error retryable duplicate")
+
+
+# ---------------- Rate limiting ----------------
+
+class TokenBucket:
+    """Messages per second allowed through a gateway, shared by every sending thread.
+
+    Holds up to ``burst`` tokens; ``acquire(n)`` blocks until ``n`` are
+    available. A ``rate`` of 0 or less disables the limit.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0  # seconds callers spent blocked, for tuning
+
+    def acquire(self, n=1):
+        if self.rate <= 0:
+            return
+        n = min(n, self.burst)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+                self.waited += wait
+            time.sleep(wait)
+
+
+# ---------------- Gateways ----------------
+# A gateway sends one batch of messages, each a dict with "key" (the
+# idempotency key), "to" and "body", and returns one SmsResult per message.
+# It raises GatewayError when the batch as a whole failed. ``max_batch`` caps
+# the messages per call and ``rate`` is the provider's messages-per-second
+# allowance.
+
+class LogGateway:
+    """Development stand-in: logs each message and reports it sent."""
+
+    name = "log"
+
+    def __init__(self, rate=0, max_batch=100):
+        self.rate = rate
+        self.max_batch = max_batch
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        results = []
+        for message in messages:
+            with self._lock:
+                duplicate = message["key"] in self._seen
+                self._seen.add(message["key"])
+            if not duplicate:
+                log.info("SMS to %s: %s", message["to"], message["body"])
+            results.append(SmsResult(message["key"], True, message["key"], None, False, duplicate))
+        return results
+
+
+class HttpGateway:
+    """JSON-over-HTTP SMS provider (or scripts/sms_gateway.py locally).
+
+    POSTs ``{"messages": [{"to", "body", "idempotency_key"}]}`` and expects
+    ``{"results": [{"idempotency_key", "status", "id", "error"}]}`` with a
+    status of "accepted", "duplicate" or "rejected". 429 and 5xx fail the
+    batch as retryable, honouring Retry-After. Each sending thread keeps its
+    own keep-alive connection.
+    """
+
+    name = "http"
+
+    def __init__(self, url, token=None, timeout=10.0, rate=0, max_batch=100):
+        parts = urlsplit(url)
+        self.url = url
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        self.token = token
+        self.timeout = timeout
+        self.rate = rate
+        self.max_batch = max_batch
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = self._local.connection = factory(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def _reset(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def send_batch(self, messages):
+        payload = json.dumps({"messages": [
+            {"to": m["to"], "body": m["body"], "idempotency_key": m["key"]} for m in messages
+        ]}).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        try:
+            connection = self._connection()
+            connection.request("POST", self.path, body=payload, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # The gateway may have accepted the batch before the reply was
+            # lost; resending is safe because it dedupes on the keys
+            self._reset()
+            raise GatewayError(f"{self.name}: {e.__class__.__name__}: {e}")
+
+        if response.status == 429 or response.status >= 500:
+            raise GatewayError(
+                f"{self.name}: HTTP {response.status}",
+                retry_after=retry_after_seconds(response.getheader("Retry-After")),
+            )
+        if response.status >= 400:
+            raise GatewayError(f"{self.name}: HTTP {response.status}: {body[:100]!r}", retryable=False)
+
+        try:
+            by_key = {r.get("idempotency_key"): r for r in json.loads(body).get("results", ())}
+        except (ValueError, AttributeError, TypeError) as e:
+            # Unreadable reply to a 2xx: resend, the gateway dedupes on the keys
+            raise GatewayError(f"{self.name}: unreadable reply: {e}; {body[:100]!r}")
+        results = []
+        for message in messages:
+            r = by_key.get(message["key"])
+            if r is None:
+                results.append(SmsResult(message["key"], False, None, "missing from gateway reply", True, False))
+                continue
+            status = r.get("status")
+            ok = status in ("accepted", "duplicate")
+            results.append(SmsResult(
+                message["key"], ok, r.get("id"), None if ok else (r.get("error") or status),
+                bool(r.get("retryable", False)), status == "duplicate",
+            ))
+        return results
+
+
+def retry_after_seconds(value, now=None):
+    """A Retry-After header (delay in seconds or an HTTP-date) as seconds, or None if unreadable."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return max(seconds, 0.0) if math.isfinite(seconds) else None
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - (now or datetime.now(timezone.utc))).total_seconds(), 0.0)
+
+
+def build_gateway(name, config):
+    rate = config.get("REMINDER_RATE", 0)
+    max_batch = config.get("REMINDER_BATCH_SIZE", 100)
+    if name == "log":
+        return LogGateway(rate=rate, max_batch=max_batch)
+    if name == "http":
+        return HttpGateway(
+            config["REMINDER_GATEWAY_URL"],
+            token=config.get("REMINDER_GATEWAY_TOKEN"),
+            timeout=config.get("REMINDER_GATEWAY_TIMEOUT", 10.0),
+            rate=rate,
+            max_batch=max_batch,
+        )
+    raise ValueError(f"Unknown SMS gateway: {name}")
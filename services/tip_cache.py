@@ -0,0 +1,147 @@
+import threading
+from collections import namedtuple
+
+from cachetools import TTLCache
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from models import Tip
+
+# Plain snapshot of a tip row, safe to share between requests and threads.
+TipRow = namedtuple(
+    "TipRow",
+    ["id", "title", "content", "language", "audio_filename", "created_at", "updated_at"],
+)
+
+# One cached language: the rows and the rendered tips section.
+TipFeed = namedtuple("TipFeed", ["tips", "html"])
+
+ALL_LANGUAGES = "*"
+
+
+def snapshot(tip):
+    return TipRow(
+        tip.id, tip.title, tip.content, tip.language,
+        tip.audio_filename, tip.created_at, tip.updated_at,
+    )
+
+
+class TipFeedCache:
+    """Bounded, TTL'd cache of the public tip feed, keyed by language."""
+
+    def __init__(self, maxsize=16, ttl=300):
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Bumped by every invalidate(); a load that started before one must
+        # not store what it read
+        self.generation = 0
+
+    def init_app(self, app):
+        with self._lock:
+            self._entries = TTLCache(
+                maxsize=app.config.get("TIP_CACHE_MAX_LANGUAGES", 16),
+                ttl=app.config.get("TIP_CACHE_TTL", 300),
+            )
+        app.extensions["tip_feed_cache"] = self
+
+    def get(self, lang):
+        with self._lock:
+            feed = self._entries.get(lang)
+            if feed is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return feed
+
+    def set(self, lang, tips, html, generation=None):
+        """Cache and return the feed for ``lang``. With ``generation`` (read
+        before loading ``tips``) nothing is stored if a write invalidated
+        the cache since."""
+        feed = TipFeed(tuple(tips), html)
+        with self._lock:
+            if generation is None or generation == self.generation:
+                self._entries[lang] = feed
+        return feed
+
+    def get_or_load(self, lang, render):
+        """Return the cached feed for ``lang``, loading and rendering it on a miss.
+
+        ``render`` receives the tip rows and returns the tips section markup.
+        """
+        feed = self.get(lang)
+        if feed is not None:
+            return feed
+        generation = self.generation
+        tips = [
+            snapshot(tip)
+            for tip in Tip.query.filter_by(language=lang).order_by(Tip.created_at.desc())
+        ]
+        return self.set(lang, tips, render(tips), generation)
+
+    def invalidate(self, lang=None):
+        with self._lock:
+            if lang is None or lang == ALL_LANGUAGES:
+                self._entries.clear()
+            else:
+                self._entries.pop(lang, None)
+            self.invalidations += 1
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "maxsize": self._entries.maxsize,
+                "ttl": self._entries.ttl,
+            }
+
+
+tip_feed_cache = TipFeedCache()
+
+
+# ---------------- Invalidation from Tip writes ----------------
+# Flush events only record which languages changed; the cache is dropped once
+# the transaction commits so readers never re-cache uncommitted rows.
+
+def _mark_dirty(target, *langs):
+    session = object_session(target)
+    if session is None:
+        tip_feed_cache.invalidate()
+        return
+    session.info.setdefault("dirty_tip_languages", set()).update(langs)
+
+
+@event.listens_for(Tip, "after_insert")
+@event.listens_for(Tip, "after_delete")
+def _tip_inserted_or_deleted(mapper, connection, target):
+    _mark_dirty(target, target.language)
+
+
+@event.listens_for(Tip, "after_update")
+def _tip_updated(mapper, connection, target):
+    history = inspect(target).attrs.language.history
+    langs = set(history.deleted or ()) | set(history.unchanged or ()) | set(history.added or ())
+    _mark_dirty(target, *(langs or {ALL_LANGUAGES}))
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_dirty_languages(session):
+    langs = session.info.pop("dirty_tip_languages", None)
+    if not langs:
+        return
+    if ALL_LANGUAGES in langs:
+        tip_feed_cache.invalidate()
+    else:
+        for lang in langs:
+            tip_feed_cache.invalidate(lang)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty_languages(session):
+    session.info.pop("dirty_tip_languages", None)
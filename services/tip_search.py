@@ -0,0 +1,130 @@
+import re
+from collections import namedtuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+from models import db, Tip
+
+# Full-text search over tip titles and bodies. On SQLite this is an FTS5
+# index (external content over ``tips``) kept in sync by triggers, so ORM
+# writes, bulk Core inserts and raw SQL all update it. Other databases fall
+# back to a LIKE scan with the same interface.
+
+FTS_TABLE = "tips_fts"
+
+CREATE_STATEMENTS = (
+    # title is column 0, content column 1; language is stored for filtering only
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, language UNINDEXED,
+        content='tips', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS tips_fts_ai AFTER INSERT ON tips BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content, language)
+        VALUES (new.id, new.title, new.content, new.language);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tips_fts_ad AFTER DELETE ON tips BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, language)
+        VALUES ('delete', old.id, old.title, old.content, old.language);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tips_fts_au AFTER UPDATE OF title, content, language ON tips BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, language)
+        VALUES ('delete', old.id, old.title, old.content, old.language);
+        INSERT INTO {FTS_TABLE}(rowid, title, content, language)
+        VALUES (new.id, new.title, new.content, new.language);
+    END""",
+)
+
+# Snippet markers that cannot appear in tip text; swapped for <mark> after escaping
+_OPEN, _CLOSE = "\x02", "\x03"
+
+# Rank first, then build snippets for the page of winners only: SQLite
+# evaluates result columns before sorting, and snippet() is the costly part.
+# Title matches count ten times as much as body matches.
+_SEARCH_SQL = text(f"""
+    WITH best AS (
+        SELECT rowid AS id, rank
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH :query AND rank MATCH 'bm25(10.0, 1.0)'
+          AND (:language IS NULL OR language = :language)
+        ORDER BY rank
+        LIMIT :limit
+    )
+    SELECT t.id, t.title, t.language,
+           snippet({FTS_TABLE}, 1, :open, :close, '…', :tokens) AS snippet,
+           best.rank
+    FROM {FTS_TABLE}
+    JOIN best ON best.id = {FTS_TABLE}.rowid
+    JOIN tips AS t ON t.id = best.id
+    WHERE {FTS_TABLE} MATCH :query
+    ORDER BY best.rank
+""")
+
+SearchHit = namedtuple("SearchHit", "id title language snippet rank")
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def is_supported(connection):
+    return connection.dialect.name == "sqlite"
+
+
+def ensure_index(connection):
+    """Create the FTS table and triggers if missing, indexing existing tips."""
+    if not is_supported(connection):
+        return False
+    existed = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+    for statement in CREATE_STATEMENTS:
+        connection.execute(text(statement))
+    if not existed:
+        rebuild(connection)
+    return True
+
+
+def rebuild(connection):
+    """Re-read every tip into the index."""
+    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def match_query(terms):
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation typed by users are
+    treated as plain text rather than query syntax.
+    """
+    words = _WORD.findall(terms.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def highlight(snippet):
+    return Markup(str(escape(snippet)).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>"))
+
+
+def search(terms, language=None, limit=20, snippet_tokens=16):
+    """Best matches for ``terms``, most relevant first."""
+    query = match_query(terms or "")
+    if not query:
+        return []
+    connection = db.session.connection()
+    if not is_supported(connection):
+        return _like_search(terms, language, limit)
+    rows = connection.execute(_SEARCH_SQL, {
+        "query": query, "language": language, "limit": limit,
+        "open": _OPEN, "close": _CLOSE, "tokens": snippet_tokens,
+    })
+    return [SearchHit(row.id, row.title, row.language, highlight(row.snippet), row.rank) for row in rows]
+
+
+def _like_search(terms, language, limit):
+    query = Tip.query
+    for word in _WORD.findall(terms):
+        pattern = f"%{word}%"
+        query = query.filter(db.or_(Tip.title.ilike(pattern), Tip.content.ilike(pattern)))
+    if language:
+        query = query.filter(Tip.language == language)
+    tips = query.order_by(Tip.created_at.desc()).limit(limit).all()
+    return [SearchHit(tip.id, tip.title, tip.language, escape(tip.content[:160]), None) for tip in tips]
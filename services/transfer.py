@@ -0,0 +1,253 @@
+import codecs
+import csv
+import io
+import json
+
+from sqlalchemy import insert, select
+
+from models import db, User, Clinic, Appointment, parse_appointment_date
+from . import counters, slots
+from .clinic_index import mark_changed
+
+# Bulk data in and out of the admin panel. Exports select plain columns with
+# yield_per, so only one batch of rows is held in memory at a time. Imports
+# validate each row and insert the valid ones with executemany, one
+# transaction per batch.
+
+
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+
+EXPORTS = {
+    "users": (User.id, User.username, User.role, User.created_at),  # never the password
+    "clinics": (
+        Clinic.id, Clinic.name, Clinic.address, Clinic.phone, Clinic.latitude, Clinic.longitude, Clinic.created_at,
+    ),
+    "appointments": (
+        Appointment.id, Appointment.mother_name, Appointment.phone, Appointment.clinic_id,
+        Appointment.user_id, Appointment.date, Appointment.scheduled_at, Appointment.notes,
+        Appointment.created_at,
+    ),
+}
+
+
+# ---------------- Export ----------------
+
+def export_rows(kind, batch_size=1000, where=()):
+    """Yield ``(header, row, row, ...)`` for ``kind`` in id order."""
+    columns = EXPORTS[kind]
+    yield [column.key for column in columns]
+    query = select(*columns).where(*where).order_by(columns[0]).execution_options(yield_per=batch_size)
+    for row in db.session.execute(query):
+        yield [_timestamp(value) if hasattr(value, "isoformat") else value for value in row]
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def stream_jsonl(rows):
+    rows = iter(rows)
+    header = next(rows)
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), ensure_ascii=False) + "\n"
+
+
+# Full Content-Type values; pass them as ``content_type=``, since
+# ``mimetype=`` would append a second charset
+FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+    "jsonl": (stream_jsonl, "application/x-ndjson; charset=utf-8"),
+}
+
+
+# ---------------- Import ----------------
+
+class ImportReport:
+    """Outcome of one import: how many rows went in and what was wrong with the rest."""
+
+    def __init__(self, max_errors=200):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []  # (line number, message), capped at max_errors
+        self.max_errors = max_errors
+
+    def reject(self, line, messages):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, "; ".join(messages)))
+
+    @property
+    def truncated(self):
+        return self.rejected > len(self.errors)
+
+    def as_dict(self):
+        return {
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "errors": [{"line": line, "error": message} for line, message in self.errors],
+            "truncated": self.truncated,
+        }
+
+
+def read_records(stream, fmt):
+    """Yield ``(line number, dict)`` from an uploaded CSV or JSONL byte stream."""
+    text = codecs.getreader("utf-8-sig")(stream, errors="replace")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, e
+                continue
+            yield number, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+
+def _text(record, field, errors, required=True, max_length=None):
+    value = record.get(field)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        errors.append(f"{field} is required")
+    elif max_length and len(value) > max_length:
+        errors.append(f"{field} is longer than {max_length} characters")
+    return value or None
+
+
+def _optional_int(record, field, errors):
+    value = record.get(field)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        errors.append(f"{field} must be a whole number")
+        return None
+
+
+def _optional_float(record, field, errors, low, high):
+    value = record.get(field)
+    if value in (None, ""):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        errors.append(f"{field} must be a number")
+        return None
+    if not low <= value <= high:
+        errors.append(f"{field} must be between {low} and {high}")
+        return None
+    return value
+
+
+def _clinic_row(record, errors, known):
+    row = {
+        "name": _text(record, "name", errors, max_length=200),
+        "address": _text(record, "address", errors, max_length=300),
+        "phone": _text(record, "phone", errors, max_length=40),
+        "latitude": _optional_float(record, "latitude", errors, -90, 90),
+        "longitude": _optional_float(record, "longitude", errors, -180, 180),
+    }
+    if (row["latitude"] is None) != (row["longitude"] is None):
+        errors.append("latitude and longitude go together")
+    return row
+
+
+def _appointment_row(record, errors, known):
+    row = {
+        "mother_name": _text(record, "mother_name", errors, max_length=120),
+        "phone": _text(record, "phone", errors, max_length=40),
+        "clinic_id": _optional_int(record, "clinic_id", errors),
+        "user_id": _optional_int(record, "user_id", errors),
+        "date": _text(record, "date", errors, max_length=50),
+        "notes": _text(record, "notes", errors, required=False),
+    }
+    if record.get("clinic_id") in (None, ""):
+        errors.append("clinic_id is required")
+    elif row["clinic_id"] is not None and row["clinic_id"] not in known["clinics"]:
+        errors.append(f"clinic {row['clinic_id']} does not exist")
+    if row["user_id"] is not None and row["user_id"] not in known["users"]:
+        errors.append(f"user {row['user_id']} does not exist")
+    # The ORM keeps scheduled_at in sync with date; Core inserts have to do it here
+    row["scheduled_at"] = parse_appointment_date(row["date"])
+    if row["date"] and row["scheduled_at"] is None:
+        errors.append(f"date {row['date']!r} is not a recognised date")
+    return row
+
+
+def _clinics_inserted(connection, rows, ids):
+    counters.bump(connection, "clinics", len(rows))
+    slots.add_default_templates(connection, ids)
+    mark_changed(db.session)
+
+
+def _appointments_inserted(connection, rows, ids):
+    counters.bump_appointments(connection, rows)
+
+
+IMPORTS = {
+    "clinics": (Clinic.__table__, _clinic_row, _clinics_inserted),
+    "appointments": (Appointment.__table__, _appointment_row, _appointments_inserted),
+}
+
+# Fields an upload may carry, for the import form
+IMPORT_COLUMNS = {
+    "clinics": ("name", "address", "phone", "latitude", "longitude"),
+    "appointments": ("mother_name", "phone", "clinic_id", "date", "user_id", "notes"),
+}
+
+
+def _known_ids():
+    # Referenced ids, loaded once per import instead of once per row
+    return {
+        "clinics": set(db.session.scalars(select(Clinic.id))),
+        "users": set(db.session.scalars(select(User.id))),
+    }
+
+
+def import_records(kind, records, batch_size=500, max_errors=200):
+    """Validate ``records`` and insert the valid ones in batches.
+
+    Each batch is a single executemany INSERT plus its counter updates,
+    committed together. Invalid rows are skipped and reported by line.
+    """
+    table, to_row, after_insert = IMPORTS[kind]
+    known = _known_ids() if kind == "appointments" else None
+    report = ImportReport(max_errors)
+    batch = []
+
+    def flush():
+        connection = db.session.connection()
+        ids = connection.execute(insert(table).returning(table.c.id), batch).scalars().all()
+        after_insert(connection, batch, ids)
+        db.session.commit()
+        report.inserted += len(batch)
+        batch.clear()
+
+    for line, record in records:
+        if isinstance(record, Exception):
+            report.reject(line, [f"invalid JSON: {record}"])
+            continue
+        errors = []
+        row = to_row(record, errors, known)
+        if errors:
+            report.reject(line, errors)
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return report
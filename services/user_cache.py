@@ -0,0 +1,134 @@
+import threading
+
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, User
+
+
+class UserIdentity:
+    """Who is logged in, without an ORM object or a session.
+
+    Provides what Flask-Login and the templates read from ``current_user``.
+    Call ``load()`` for the full ``User`` row when it is really needed.
+    """
+
+    __slots__ = ("id", "username", "role")
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def get_id(self):
+        return str(self.id)
+
+    def load(self):
+        return db.session.get(User, self.id)
+
+    def __eq__(self, other):
+        return isinstance(other, (UserIdentity, User)) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<UserIdentity {self.username} ({self.role})>"
+
+
+class UserCache:
+    """Bounded, short-TTL cache of user identities for the login loader."""
+
+    def __init__(self, maxsize=4096, ttl=30):
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidate(); a load that started before one must
+        # not store the identity it read
+        self.generation = 0
+
+    def init_app(self, app):
+        with self._lock:
+            self._entries = TTLCache(
+                maxsize=app.config.get("USER_CACHE_SIZE", 4096),
+                ttl=app.config.get("USER_CACHE_TTL", 30),
+            )
+        self.enabled = app.config.get("USER_CACHE_ENABLED", True)
+        app.extensions["user_cache"] = self
+
+    def get(self, user_id):
+        """Identity for ``user_id``, or None if the user doesn't exist."""
+        if self.enabled:
+            with self._lock:
+                identity = self._entries.get(user_id)
+                if identity is not None:
+                    self.hits += 1
+                    return identity
+                self.misses += 1
+                generation = self.generation
+
+        row = db.session.execute(
+            db.select(User.id, User.username, User.role).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        identity = UserIdentity(row.id, row.username, row.role)
+        if self.enabled:
+            with self._lock:
+                if generation == self.generation:
+                    self._entries[user_id] = identity
+        return identity
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(user_id), None)
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "maxsize": self._entries.maxsize,
+                "ttl": self._entries.ttl,
+            }
+
+
+user_cache = UserCache()
+
+
+# ---------------- Invalidation from User writes ----------------
+# Renames, role changes and deletes made anywhere drop the cached identity
+# once the transaction commits.
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        user_cache.invalidate(target.id)
+    else:
+        session.info.setdefault("dirty_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_dirty_users(session):
+    for user_id in session.info.pop("dirty_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty_users(session):
+    session.info.pop("dirty_user_ids", None)
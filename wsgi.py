@@ -0,0 +1,10 @@
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+# MOBI_ENV defaults to "production" here (WAL and pool tuning); the
+# development server in app.py keeps the plain settings.
+import os
+
+os.environ.setdefault("MOBI_ENV", "production")
+
+from app import create_app
+
+app = create_app()